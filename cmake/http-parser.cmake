@@ -31,6 +31,9 @@ ExternalProject_Add(http-parser
     ${CMAKE_COMMAND} -E copy_directory
     ${CMAKE_BINARY_DIR}/${DEPS_HTTPPARSER}/${CONFIG_TYPE}/
     ${CMAKE_BINARY_DIR}/lib/
+  CMAKE_CACHE_ARGS
+    -DCMAKE_C_COMPILER_LAUNCHER:STRING=${CMAKE_C_COMPILER_LAUNCHER}
+    ${IOTJS_DEPS_CACHE_ARGS}
   CMAKE_ARGS
     -DCMAKE_TOOLCHAIN_FILE=${CMAKE_TOOLCHAIN_FILE}
     -DCMAKE_BUILD_TYPE=${CMAKE_BUILD_TYPE}
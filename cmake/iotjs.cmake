@@ -18,6 +18,20 @@ include(${CMAKE_CURRENT_LIST_DIR}/JSONParser.cmake)
 
 set(IOTJS_SOURCE_DIR ${CMAKE_SOURCE_DIR}/src)
 
+# The generated sources are written into the build directory, so the
+# builds of different configurations can run at the same time.
+set(IOTJS_GENERATED_DIR ${CMAKE_BINARY_DIR}/generated)
+file(MAKE_DIRECTORY ${IOTJS_GENERATED_DIR})
+
+# Remove the files which were generated into the source directory by older
+# versions, they would shadow the generated headers.
+foreach(generated_file iotjs_js.c iotjs_js.h iotjs_js_modules.bin
+                       iotjs_magic_strings.in iotjs_module_inl.h
+                       iotjs_string_ext.inl.h)
+  file(REMOVE ${IOTJS_SOURCE_DIR}/${generated_file})
+endforeach()
+file(REMOVE_RECURSE ${IOTJS_SOURCE_DIR}/iotjs_js)
+
 # Platform configuration
 # Look for files under src/platform/<system>/
 string(TOLOWER ${CMAKE_SYSTEM_NAME} IOTJS_SYSTEM_OS)
@@ -79,6 +93,37 @@ function(addModuleDependencies module varResult)
   set(${varResult} ${moduleDefines} PARENT_SCOPE)
 endfunction()
 
+# Check that the module configuration generated by tools/module_resolver.py
+# belongs to the current configuration (called from the generated file).
+function(iotjs_check_modules_cmake varResult)
+  set(valid ON)
+  get_filename_component(profile ${IOTJS_PROFILE} ABSOLUTE)
+  if(NOT "${profile}" STREQUAL "${IOTJS_MODULES_CMAKE_PROFILE}"
+     OR NOT "${IOTJS_SYSTEM_OS}" STREQUAL "${IOTJS_MODULES_CMAKE_SYSTEM_OS}")
+    set(valid OFF)
+  endif()
+
+  set(module_dirs)
+  foreach(module_descriptor ${EXTERNAL_MODULES})
+    get_filename_component(module_dir ${module_descriptor} ABSOLUTE)
+    list(APPEND module_dirs ${module_dir})
+  endforeach()
+  if(NOT "${module_dirs}" STREQUAL "${IOTJS_MODULES_CMAKE_EXTERNAL_MODULES}")
+    set(valid OFF)
+  endif()
+
+  foreach(input ${IOTJS_MODULES_CMAKE_INPUTS})
+    if(NOT EXISTS ${input} OR ${input} IS_NEWER_THAN ${IOTJS_MODULES_CMAKE})
+      set(valid OFF)
+    endif()
+  endforeach()
+
+  if(NOT valid)
+    message(STATUS "${IOTJS_MODULES_CMAKE} is out of date, ignoring it")
+  endif()
+  set(${varResult} ${valid} PARENT_SCOPE)
+endfunction()
+
 # Set the default profile if not specified
 set(IOTJS_PROFILE "${CMAKE_SOURCE_DIR}/profiles/default.profile"
     CACHE STRING "Path to profile.")
@@ -87,223 +132,259 @@ if(NOT IS_ABSOLUTE ${IOTJS_PROFILE})
   set(IOTJS_PROFILE "${CMAKE_SOURCE_DIR}/${IOTJS_PROFILE}")
 endif()
 
-# Enable the modules defined by the profile
-if(EXISTS ${IOTJS_PROFILE})
-  file(READ "${IOTJS_PROFILE}" PROFILE_SETTINGS)
-  string(REGEX REPLACE "^#.*$" "" PROFILE_SETTINGS "${PROFILE_SETTINGS}")
-  string(REGEX REPLACE "[\r|\n]" ";" PROFILE_SETTINGS "${PROFILE_SETTINGS}")
-
-  foreach(module_define ${PROFILE_SETTINGS})
-    set(${module_define} ON CACHE BOOL "ON/OFF")
-  endforeach()
-else()
-  message(FATAL_ERROR "Profile file: '${IOTJS_PROFILE}' doesn't exist!")
+# Use the module configuration resolved by tools/module_resolver.py if it
+# was generated for the current profile, platform and modules.json files,
+# otherwise parse the JSON files here.
+set(IOTJS_MODULES_CMAKE_VALID OFF)
+if(NOT "${IOTJS_MODULES_CMAKE}" STREQUAL "" AND EXISTS ${IOTJS_MODULES_CMAKE})
+  include(${IOTJS_MODULES_CMAKE})
 endif()
 
-set(IOTJS_MODULES)
-set(MODULES_INCLUDE_DIR)
-
-# Add the basic descriptor file (src/modules.json)
-list(APPEND EXTERNAL_MODULES ${IOTJS_SOURCE_DIR})
-
-set(iotjs_module_idx 0)
-foreach(module_descriptor ${EXTERNAL_MODULES})
-  get_filename_component(MODULE_DIR ${module_descriptor} ABSOLUTE)
-
-  if(NOT EXISTS "${MODULE_DIR}/modules.json")
-    message(FATAL_ERROR "The modules.json file doesn't exist in ${MODULE_DIR}")
+if(IOTJS_MODULES_CMAKE_VALID)
+  message("Using module configuration: ${IOTJS_MODULES_CMAKE}")
+  set_property(DIRECTORY APPEND PROPERTY
+               CMAKE_CONFIGURE_DEPENDS ${IOTJS_MODULES_CMAKE_INPUTS})
+else()
+  # Enable the modules defined by the profile
+  if(EXISTS ${IOTJS_PROFILE})
+    file(READ "${IOTJS_PROFILE}" PROFILE_SETTINGS)
+    string(REGEX REPLACE "^#.*$" "" PROFILE_SETTINGS "${PROFILE_SETTINGS}")
+    string(REGEX REPLACE "[\r|\n]" ";" PROFILE_SETTINGS "${PROFILE_SETTINGS}")
+
+    foreach(module_define ${PROFILE_SETTINGS})
+      set(${module_define} ON CACHE BOOL "ON/OFF")
+    endforeach()
+  else()
+    message(FATAL_ERROR "Profile file: '${IOTJS_PROFILE}' doesn't exist!")
   endif()
 
-  list(APPEND MODULES_INCLUDE_DIR ${MODULE_DIR})
-  list(APPEND IOTJS_MODULES_JSONS "${iotjs_module_idx}")
-  set(CURR_JSON "IOTJS_MODULES_JSON_${iotjs_module_idx}")
-  set(${CURR_JSON}_PATH ${MODULE_DIR})
+  set(IOTJS_MODULES)
+  set(MODULES_INCLUDE_DIR)
 
-  file(READ "${MODULE_DIR}/modules.json" IOTJS_MODULES_JSON_FILE)
-  sbeParseJson(${CURR_JSON} IOTJS_MODULES_JSON_FILE)
-  getListOfVars("${CURR_JSON}.modules." "([A-Za-z0-9_]+)[A-Za-z0-9_.]*"
-                _IOTJS_MODULES)
-  list(APPEND IOTJS_MODULES ${_IOTJS_MODULES})
+  # Add the basic descriptor file (src/modules.json)
+  list(APPEND EXTERNAL_MODULES ${IOTJS_SOURCE_DIR})
 
-  foreach(module ${_IOTJS_MODULES})
-    string(TOUPPER ${module} MODULE)
-    set(IOTJS_MODULE_${MODULE}_JSON ${CURR_JSON})
-  endforeach()
+  set(iotjs_module_idx 0)
+  foreach(module_descriptor ${EXTERNAL_MODULES})
+    get_filename_component(MODULE_DIR ${module_descriptor} ABSOLUTE)
 
-  math(EXPR iotjs_module_idx "${iotjs_module_idx} + 1")
-endforeach(module_descriptor)
+    if(NOT EXISTS "${MODULE_DIR}/modules.json")
+      message(FATAL_ERROR
+              "The modules.json file doesn't exist in ${MODULE_DIR}")
+    endif()
 
-list(REMOVE_DUPLICATES IOTJS_MODULES)
+    list(APPEND MODULES_INCLUDE_DIR ${MODULE_DIR})
+    list(APPEND IOTJS_MODULES_JSONS "${iotjs_module_idx}")
+    set(CURR_JSON "IOTJS_MODULES_JSON_${iotjs_module_idx}")
+    set(${CURR_JSON}_PATH ${MODULE_DIR})
 
-# Turn off the other modules
-foreach(module ${IOTJS_MODULES})
-  string(TOUPPER ${module} MODULE)
-  set(ENABLE_MODULE_${MODULE} OFF CACHE BOOL "ON/OFF")
-endforeach()
+    file(READ "${MODULE_DIR}/modules.json" IOTJS_MODULES_JSON_FILE)
+    sbeParseJson(${CURR_JSON} IOTJS_MODULES_JSON_FILE)
+    getListOfVars("${CURR_JSON}.modules." "([A-Za-z0-9_]+)[A-Za-z0-9_.]*"
+                  _IOTJS_MODULES)
+    list(APPEND IOTJS_MODULES ${_IOTJS_MODULES})
 
-# Resolve the dependencies and set the ENABLE_MODULE_[NAME] variables
-foreach(module ${IOTJS_MODULES})
-  string(TOUPPER ${module} MODULE)
-  if(${ENABLE_MODULE_${MODULE}})
-    addModuleDependencies(${module} deps)
-    foreach(module_define ${deps})
-      set(${module_define} ON)
+    foreach(module ${_IOTJS_MODULES})
+      string(TOUPPER ${module} MODULE)
+      set(IOTJS_MODULE_${MODULE}_JSON ${CURR_JSON})
     endforeach()
-    unset(deps)
-  endif()
-endforeach()
 
-set(IOTJS_JS_MODULES)
-set(IOTJS_JS_MODULE_SRC)
-set(IOTJS_NATIVE_MODULES)
-set(IOTJS_NATIVE_MODULE_SRC)
-set(IOTJS_MODULE_DEFINES)
+    math(EXPR iotjs_module_idx "${iotjs_module_idx} + 1")
+  endforeach(module_descriptor)
 
-message("IoT.js module configuration:")
-getListOfVars("ENABLE_MODULE_" "([A-Za-z0-9_]+)" IOTJS_ENABLED_MODULES)
-foreach(MODULE ${IOTJS_ENABLED_MODULES})
-  set(MODULE_DEFINE_VAR "ENABLE_MODULE_${MODULE}")
-  message(STATUS "${MODULE_DEFINE_VAR} = ${${MODULE_DEFINE_VAR}}")
-  # Set the defines for build
-  if(${MODULE_DEFINE_VAR})
-    list(APPEND IOTJS_MODULE_DEFINES "-D${MODULE_DEFINE_VAR}=1")
-  else()
-    list(APPEND IOTJS_MODULE_DEFINES "-D${MODULE_DEFINE_VAR}=0")
-  endif()
-endforeach()
+  list(REMOVE_DUPLICATES IOTJS_MODULES)
 
-set(EXTRA_CMAKE_FILES)
+  # Turn off the other modules
+  foreach(module ${IOTJS_MODULES})
+    string(TOUPPER ${module} MODULE)
+    set(ENABLE_MODULE_${MODULE} OFF CACHE BOOL "ON/OFF")
+  endforeach()
 
-# Collect the files of enabled modules
-foreach(MODULE ${IOTJS_ENABLED_MODULES})
-  if(${ENABLE_MODULE_${MODULE}})
-    string(TOLOWER ${MODULE} module)
-    set(IOTJS_MODULES_JSON ${IOTJS_MODULE_${MODULE}_JSON})
-    set(MODULE_BASE_DIR ${${IOTJS_MODULES_JSON}_PATH})
-    set(MODULE_PREFIX ${IOTJS_MODULES_JSON}.modules.${module}.)
-
-    # Add js source
-    set(MODULE_JS_FILE ${${MODULE_PREFIX}js_file})
-    if(NOT "${MODULE_JS_FILE}" STREQUAL "")
-      set(JS_PATH "${MODULE_BASE_DIR}/${MODULE_JS_FILE}")
-      if(EXISTS "${JS_PATH}")
-        list(APPEND IOTJS_JS_MODULES "${module}=${JS_PATH}")
-        list(APPEND IOTJS_JS_MODULE_SRC ${JS_PATH})
-      else()
-        message(FATAL_ERROR "JS file doesn't exist: ${JS_PATH}")
-      endif()
+  # Resolve the dependencies and set the ENABLE_MODULE_[NAME] variables
+  foreach(module ${IOTJS_MODULES})
+    string(TOUPPER ${module} MODULE)
+    if(${ENABLE_MODULE_${MODULE}})
+      addModuleDependencies(${module} deps)
+      foreach(module_define ${deps})
+        set(${module_define} ON)
+      endforeach()
+      unset(deps)
     endif()
+  endforeach()
 
-    # Check extra cmake file
-    set(EXTRA_CMAKE_FILE ${${MODULE_PREFIX}cmakefile})
-    if(NOT "${EXTRA_CMAKE_FILE}" STREQUAL "")
-      set(EXTRA_CMAKE_FILE_PATH "${MODULE_BASE_DIR}/${EXTRA_CMAKE_FILE}")
-      if(EXISTS "${EXTRA_CMAKE_FILE_PATH}")
-        list(APPEND EXTRA_CMAKE_FILES "${EXTRA_CMAKE_FILE_PATH}")
-      else()
-        message(FATAL_ERROR
-                "CMake file doesn't exists: ${EXTRA_CMAKE_FILE_PATH}")
-      endif()
+  set(IOTJS_JS_MODULES)
+  set(IOTJS_JS_MODULE_SRC)
+  set(IOTJS_NATIVE_MODULES)
+  set(IOTJS_NATIVE_MODULE_SRC)
+  set(IOTJS_MODULE_DEFINES)
+
+  getListOfVars("ENABLE_MODULE_" "([A-Za-z0-9_]+)" IOTJS_ENABLED_MODULES)
+  foreach(MODULE ${IOTJS_ENABLED_MODULES})
+    set(MODULE_DEFINE_VAR "ENABLE_MODULE_${MODULE}")
+    # Set the defines for build
+    if(${MODULE_DEFINE_VAR})
+      list(APPEND IOTJS_MODULE_DEFINES "-D${MODULE_DEFINE_VAR}=1")
+    else()
+      list(APPEND IOTJS_MODULE_DEFINES "-D${MODULE_DEFINE_VAR}=0")
     endif()
+  endforeach()
 
-    # Add platform-related native source
-    if(NOT "${${MODULE_PREFIX}native_files}" STREQUAL ""
-       AND NOT "${${MODULE_PREFIX}init}" STREQUAL "")
-      list(APPEND IOTJS_NATIVE_MODULES "${MODULE}")
-    endif()
+  set(EXTRA_CMAKE_FILES)
+
+  # Collect the files of enabled modules
+  foreach(MODULE ${IOTJS_ENABLED_MODULES})
+    if(${ENABLE_MODULE_${MODULE}})
+      string(TOLOWER ${MODULE} module)
+      set(IOTJS_MODULES_JSON ${IOTJS_MODULE_${MODULE}_JSON})
+      set(MODULE_BASE_DIR ${${IOTJS_MODULES_JSON}_PATH})
+      set(MODULE_PREFIX ${IOTJS_MODULES_JSON}.modules.${module}.)
+
+      # Add js source
+      set(MODULE_JS_FILE ${${MODULE_PREFIX}js_file})
+      if(NOT "${MODULE_JS_FILE}" STREQUAL "")
+        set(JS_PATH "${MODULE_BASE_DIR}/${MODULE_JS_FILE}")
+        if(EXISTS "${JS_PATH}")
+          list(APPEND IOTJS_JS_MODULES "${module}=${JS_PATH}")
+          list(APPEND IOTJS_JS_MODULE_SRC ${JS_PATH})
+        else()
+          message(FATAL_ERROR "JS file doesn't exist: ${JS_PATH}")
+        endif()
+      endif()
 
-    # Add common native source
-    foreach(idx ${${MODULE_PREFIX}native_files})
-      set(MODULE_C_FILE
-          ${${MODULE_PREFIX}native_files_${idx}})
-      set(MODULE_C_FILE "${MODULE_BASE_DIR}/${MODULE_C_FILE}")
-      if(EXISTS "${MODULE_C_FILE}")
-        list(APPEND IOTJS_NATIVE_MODULE_SRC ${MODULE_C_FILE})
-      else()
-        message(FATAL_ERROR "C file doesn't exist: ${MODULE_C_FILE}")
+      # Check extra cmake file
+      set(EXTRA_CMAKE_FILE ${${MODULE_PREFIX}cmakefile})
+      if(NOT "${EXTRA_CMAKE_FILE}" STREQUAL "")
+        set(EXTRA_CMAKE_FILE_PATH "${MODULE_BASE_DIR}/${EXTRA_CMAKE_FILE}")
+        if(EXISTS "${EXTRA_CMAKE_FILE_PATH}")
+          list(APPEND EXTRA_CMAKE_FILES "${EXTRA_CMAKE_FILE_PATH}")
+        else()
+          message(FATAL_ERROR
+                  "CMake file doesn't exists: ${EXTRA_CMAKE_FILE_PATH}")
+        endif()
       endif()
-    endforeach()
 
-    # Add external libraries
-    foreach(idx ${${MODULE_PREFIX}external_libs})
-      list(APPEND EXTERNAL_LIBS
-          ${${MODULE_PREFIX}external_libs_${idx}})
-    endforeach()
+      # Add platform-related native source
+      if(NOT "${${MODULE_PREFIX}native_files}" STREQUAL ""
+         AND NOT "${${MODULE_PREFIX}init}" STREQUAL "")
+        list(APPEND IOTJS_NATIVE_MODULES "${MODULE}")
+        set(IOTJS_MODULE_${MODULE}_INIT ${${MODULE_PREFIX}init})
+      endif()
 
-    getListOfVars("${MODULE_PREFIX}" "([A-Za-z0-9_]+[A-Za-z])[A-Za-z0-9_.]*"
-                  MODULE_KEYS)
-    list(FIND MODULE_KEYS "platforms" PLATFORMS_KEY)
-
-    set(PLATFORMS_PREFIX ${MODULE_PREFIX}platforms.)
-    if(${PLATFORMS_KEY} GREATER -1)
-      getListOfVars("${PLATFORMS_PREFIX}"
-                    "([A-Za-z0-9_]+[A-Za-z])[A-Za-z0-9_.]*" MODULE_PLATFORMS)
-      list(FIND MODULE_PLATFORMS ${IOTJS_SYSTEM_OS} PLATFORM_NATIVES)
-
-      # Add plaform-dependant information
-      if(${PLATFORM_NATIVES} GREATER -1)
-        # native source if exists...
-        foreach(idx ${${PLATFORMS_PREFIX}${IOTJS_SYSTEM_OS}.native_files})
-          set(MODULE_PLATFORM_FILE
-              ${${PLATFORMS_PREFIX}${IOTJS_SYSTEM_OS}.native_files_${idx}})
-          set(MODULE_PLATFORM_FILE "${MODULE_BASE_DIR}/${MODULE_PLATFORM_FILE}")
-          if(EXISTS "${MODULE_PLATFORM_FILE}")
-            list(APPEND IOTJS_NATIVE_MODULE_SRC ${MODULE_PLATFORM_FILE})
-          else()
-            message(FATAL_ERROR "C file doesn't exist: ${MODULE_PLATFORM_FILE}")
-          endif()
-        endforeach()
-
-        # external libraries....
-        foreach(idx ${${PLATFORMS_PREFIX}${IOTJS_SYSTEM_OS}.external_libs})
-          list(APPEND EXTERNAL_LIBS
-              ${${PLATFORMS_PREFIX}${IOTJS_SYSTEM_OS}.external_libs_${idx}})
-        endforeach()
-      # ...otherwise from 'undefined' section.
-      else()
-        # add native files
-        foreach(idx ${${PLATFORMS_PREFIX}undefined.native_files})
-          set(MODULE_UNDEFINED_FILE
-              "${${MODULE_PREFIX}undefined.native_files_${idx}}")
-          set(MODULE_UNDEFINED_FILE
-              "${MODULE_BASE_DIR}/${MODULE_UNDEFINED_FILE}")
-          if(EXISTS "${MODULE_UNDEFINED_FILE}")
-            list(APPEND IOTJS_NATIVE_MODULE_SRC ${MODULE_UNDEFINED_FILE})
-          else()
-            message(FATAL_ERROR "${MODULE_UNDEFINED_FILE} does not exists.")
-          endif()
-        endforeach()
-
-        # external libraries....
-        foreach(idx ${${PLATFORMS_PREFIX}undefined.external_libs})
-          list(APPEND EXTERNAL_LIBS
-              ${${PLATFORMS_PREFIX}undefined.external_libs_${idx}})
-        endforeach()
+      # Add common native source
+      foreach(idx ${${MODULE_PREFIX}native_files})
+        set(MODULE_C_FILE
+            ${${MODULE_PREFIX}native_files_${idx}})
+        set(MODULE_C_FILE "${MODULE_BASE_DIR}/${MODULE_C_FILE}")
+        if(EXISTS "${MODULE_C_FILE}")
+          list(APPEND IOTJS_NATIVE_MODULE_SRC ${MODULE_C_FILE})
+        else()
+          message(FATAL_ERROR "C file doesn't exist: ${MODULE_C_FILE}")
+        endif()
+      endforeach()
+
+      # Add external libraries
+      foreach(idx ${${MODULE_PREFIX}external_libs})
+        list(APPEND EXTERNAL_LIBS
+            ${${MODULE_PREFIX}external_libs_${idx}})
+      endforeach()
+
+      getListOfVars("${MODULE_PREFIX}" "([A-Za-z0-9_]+[A-Za-z])[A-Za-z0-9_.]*"
+                    MODULE_KEYS)
+      list(FIND MODULE_KEYS "platforms" PLATFORMS_KEY)
+
+      set(PLATFORMS_PREFIX ${MODULE_PREFIX}platforms.)
+      if(${PLATFORMS_KEY} GREATER -1)
+        getListOfVars("${PLATFORMS_PREFIX}"
+                      "([A-Za-z0-9_]+[A-Za-z])[A-Za-z0-9_.]*" MODULE_PLATFORMS)
+        list(FIND MODULE_PLATFORMS ${IOTJS_SYSTEM_OS} PLATFORM_NATIVES)
+
+        # Add plaform-dependant information
+        if(${PLATFORM_NATIVES} GREATER -1)
+          # native source if exists...
+          foreach(idx ${${PLATFORMS_PREFIX}${IOTJS_SYSTEM_OS}.native_files})
+            set(MODULE_PLATFORM_FILE
+                ${${PLATFORMS_PREFIX}${IOTJS_SYSTEM_OS}.native_files_${idx}})
+            set(MODULE_PLATFORM_FILE
+                "${MODULE_BASE_DIR}/${MODULE_PLATFORM_FILE}")
+            if(EXISTS "${MODULE_PLATFORM_FILE}")
+              list(APPEND IOTJS_NATIVE_MODULE_SRC ${MODULE_PLATFORM_FILE})
+            else()
+              message(FATAL_ERROR
+                      "C file doesn't exist: ${MODULE_PLATFORM_FILE}")
+            endif()
+          endforeach()
+
+          # external libraries....
+          foreach(idx ${${PLATFORMS_PREFIX}${IOTJS_SYSTEM_OS}.external_libs})
+            list(APPEND EXTERNAL_LIBS
+                ${${PLATFORMS_PREFIX}${IOTJS_SYSTEM_OS}.external_libs_${idx}})
+          endforeach()
+        # ...otherwise from 'undefined' section.
+        else()
+          # add native files
+          foreach(idx ${${PLATFORMS_PREFIX}undefined.native_files})
+            set(MODULE_UNDEFINED_FILE
+                "${${PLATFORMS_PREFIX}undefined.native_files_${idx}}")
+            set(MODULE_UNDEFINED_FILE
+                "${MODULE_BASE_DIR}/${MODULE_UNDEFINED_FILE}")
+            if(EXISTS "${MODULE_UNDEFINED_FILE}")
+              list(APPEND IOTJS_NATIVE_MODULE_SRC ${MODULE_UNDEFINED_FILE})
+            else()
+              message(FATAL_ERROR "${MODULE_UNDEFINED_FILE} does not exists.")
+            endif()
+          endforeach()
+
+          # external libraries....
+          foreach(idx ${${PLATFORMS_PREFIX}undefined.external_libs})
+            list(APPEND EXTERNAL_LIBS
+                ${${PLATFORMS_PREFIX}undefined.external_libs_${idx}})
+          endforeach()
+        endif()
       endif()
     endif()
+  endforeach(MODULE)
+
+  if(IOTJS_NATIVE_MODULE_SRC)
+    list(REMOVE_DUPLICATES IOTJS_NATIVE_MODULE_SRC)
   endif()
-endforeach(MODULE)
+endif()
+
+message("IoT.js module configuration:")
+foreach(MODULE ${IOTJS_ENABLED_MODULES})
+  message(STATUS "ENABLE_MODULE_${MODULE} = ${ENABLE_MODULE_${MODULE}}")
+endforeach()
 
 list(APPEND IOTJS_JS_MODULES "iotjs=${IOTJS_SOURCE_DIR}/js/iotjs.js")
 
-# Generate src/iotjs_module_inl.h
-# Build up init function prototypes
-set(IOTJS_MODULE_INITIALIZERS "")
+# Sort the native modules by name, iotjs_module_get() looks them up with a
+# binary search in the generated table.
+set(IOTJS_NATIVE_MODULE_NAMES)
 foreach(MODULE ${IOTJS_NATIVE_MODULES})
-  set(IOTJS_MODULES_JSON ${IOTJS_MODULE_${MODULE}_JSON})
   string(TOLOWER ${MODULE} module)
+  list(APPEND IOTJS_NATIVE_MODULE_NAMES ${module})
+endforeach()
+list(SORT IOTJS_NATIVE_MODULE_NAMES)
+set(IOTJS_NATIVE_MODULES)
+foreach(module ${IOTJS_NATIVE_MODULE_NAMES})
+  string(TOUPPER ${module} MODULE)
+  list(APPEND IOTJS_NATIVE_MODULES ${MODULE})
+endforeach()
+unset(IOTJS_NATIVE_MODULE_NAMES)
 
+# Generate iotjs_module_inl.h
+# Build up init function prototypes
+set(IOTJS_MODULE_INITIALIZERS "")
+foreach(MODULE ${IOTJS_NATIVE_MODULES})
   set(IOTJS_MODULE_INITIALIZERS "${IOTJS_MODULE_INITIALIZERS}
-extern jerry_value_t ${${IOTJS_MODULES_JSON}.modules.${module}.init}(void);")
+extern jerry_value_t ${IOTJS_MODULE_${MODULE}_INIT}(void);")
 endforeach()
 
 # Build up module entries
 set(IOTJS_MODULE_ENTRIES "")
 set(IOTJS_MODULE_OBJECTS "")
 foreach(MODULE ${IOTJS_NATIVE_MODULES})
-  set(IOTJS_MODULES_JSON ${IOTJS_MODULE_${MODULE}_JSON})
   string(TOLOWER ${MODULE} module)
-  set(INIT_FUNC ${${IOTJS_MODULES_JSON}.modules.${module}.init})
+  set(INIT_FUNC ${IOTJS_MODULE_${MODULE}_INIT})
 
   set(IOTJS_MODULE_ENTRIES  "${IOTJS_MODULE_ENTRIES}
   { \"${module}\", ${INIT_FUNC} },")
@@ -311,7 +392,7 @@ foreach(MODULE ${IOTJS_NATIVE_MODULES})
     { 0 },")
 endforeach()
 
-# Build up the contents of src/iotjs_module_inl.h
+# Build up the contents of iotjs_module_inl.h
 list(LENGTH IOTJS_NATIVE_MODULES IOTJS_MODULE_COUNT)
 set(IOTJS_MODULE_INL_H "/* File generated via iotjs.cmake */
 ${IOTJS_MODULE_INITIALIZERS}
@@ -328,7 +409,7 @@ ${IOTJS_MODULE_OBJECTS}
 };
 ")
 
-file(WRITE ${IOTJS_SOURCE_DIR}/iotjs_module_inl.h "${IOTJS_MODULE_INL_H}")
+file(WRITE ${IOTJS_GENERATED_DIR}/iotjs_module_inl.h "${IOTJS_MODULE_INL_H}")
 
 # Cleanup
 unset(IOTJS_MODULE_INL_H)
@@ -342,6 +423,7 @@ endforeach()
 foreach(module ${IOTJS_MODULES})
   string(TOUPPER ${module} MODULE)
   unset(IOTJS_MODULE_${MODULE}_JSON)
+  unset(IOTJS_MODULE_${MODULE}_INIT)
 endforeach()
 
 # Common compile flags
@@ -351,9 +433,70 @@ if(NOT USING_MSVC)
   iotjs_add_compile_flags(-Wsign-conversion -std=gnu99)
 endif()
 
+set(JS2C_SNAPSHOT_CACHE_DIR "${CMAKE_BINARY_DIR}/js2c-cache"
+    CACHE STRING "Directory of the persistent js2c snapshot cache.")
+
 if(ENABLE_SNAPSHOT)
-  set(JS2C_SNAPSHOT_ARG --snapshot-tool=${JERRY_HOST_SNAPSHOT})
+  set(JS2C_SNAPSHOT_ARG --snapshot-tool=${JERRY_HOST_SNAPSHOT}
+                        --snapshot-cache=${JS2C_SNAPSHOT_CACHE_DIR})
   iotjs_add_compile_flags(-DENABLE_SNAPSHOT)
+
+  # Link the merged snapshot as a binary blob instead of a hex C array
+  if(ENABLE_SNAPSHOT_BLOB)
+    if(USING_MSVC)
+      message(FATAL_ERROR "Snapshot blob mode requires a GNU toolchain")
+    endif()
+    # The blob is referenced relative to the working directory of the
+    # compiler, so the generated source does not depend on the build
+    # directory.
+    list(APPEND JS2C_SNAPSHOT_ARG --blob
+         --blob-base=${CMAKE_CURRENT_BINARY_DIR})
+    set(JS2C_BLOB_OUTPUT ${IOTJS_GENERATED_DIR}/iotjs_js_modules.bin)
+    set_source_files_properties(${IOTJS_GENERATED_DIR}/iotjs_js.c PROPERTIES
+                                OBJECT_DEPENDS ${JS2C_BLOB_OUTPUT})
+  endif()
+endif()
+
+# Limit the ROM used by the external magic strings
+if(NOT "${JS2C_MAGIC_STRING_BUDGET}" STREQUAL "")
+  list(APPEND JS2C_SNAPSHOT_ARG
+       --magic-string-budget=${JS2C_MAGIC_STRING_BUDGET}
+       --magic-string-report=${CMAKE_BINARY_DIR}/magic_strings.txt)
+endif()
+
+# Embed only the JS modules reachable from the application
+if(NOT "${IOTJS_APP_ENTRY}" STREQUAL "")
+  get_filename_component(IOTJS_APP_ENTRY ${IOTJS_APP_ENTRY} ABSOLUTE)
+  set(JS2C_APP_ARG --app-entry=${IOTJS_APP_ENTRY})
+endif()
+
+# Embed the application files into the snapshot
+if(NOT "${IOTJS_APP_DIR}" STREQUAL "")
+  if(NOT ENABLE_SNAPSHOT)
+    message(FATAL_ERROR "Application bundling requires the snapshot mode")
+  endif()
+  get_filename_component(IOTJS_APP_DIR ${IOTJS_APP_DIR} ABSOLUTE)
+  list(APPEND JS2C_APP_ARG --bundle-app=${IOTJS_APP_DIR})
+  file(GLOB_RECURSE IOTJS_APP_SRC ${IOTJS_APP_DIR}/*.js)
+endif()
+
+# Write the size report of the JS modules
+if(ENABLE_JS2C_REPORT)
+  set(JS2C_REPORT_ARG --report=json
+                      --report-output=${CMAKE_BINARY_DIR}/js2c_report.json)
+endif()
+
+# The set of the embedded modules is only known by js2c if the modules are
+# filtered by the application, so no per module files are generated then.
+if(NOT ENABLE_SNAPSHOT AND "${IOTJS_APP_ENTRY}" STREQUAL "")
+  # Generate a separate translation unit for every JS module, so a change
+  # in one module only recompiles that module.
+  set(JS2C_SPLIT_ARG --split)
+  foreach(js_module ${IOTJS_JS_MODULES})
+    string(REGEX REPLACE "=.*$" "" js_module_name ${js_module})
+    list(APPEND JS2C_SPLIT_OUTPUT
+         ${IOTJS_GENERATED_DIR}/iotjs_js/iotjs_js_${js_module_name}.c)
+  endforeach()
 endif()
 
 # Run js2c
@@ -368,21 +511,45 @@ else()
   set(JS2C_PREPROCESS_ARGS -E -dD)
 endif()
 
+# js2c keeps the timestamp of the unchanged files, so an always touched
+# stamp file is the output of the command and the generated files are its
+# byproducts. Otherwise the build would run js2c again and again, because
+# the unchanged files are older than the inputs.
+set(JS2C_OUTPUT ${IOTJS_GENERATED_DIR}/iotjs_js.c
+                ${IOTJS_GENERATED_DIR}/iotjs_js.h
+                ${JS2C_BLOB_OUTPUT} ${JS2C_SPLIT_OUTPUT})
+set(JS2C_STAMP ${IOTJS_GENERATED_DIR}/js2c.stamp)
+if(CMAKE_VERSION VERSION_LESS 3.2)
+  # No BYPRODUCTS support: touch the generated files instead
+  set(JS2C_OUTPUT_ARGS OUTPUT ${JS2C_STAMP} ${JS2C_OUTPUT})
+  set(JS2C_TOUCH_ARGS ${JS2C_STAMP} ${JS2C_OUTPUT})
+else()
+  set(JS2C_OUTPUT_ARGS OUTPUT ${JS2C_STAMP} BYPRODUCTS ${JS2C_OUTPUT})
+  set(JS2C_TOUCH_ARGS ${JS2C_STAMP})
+endif()
+
 string (REPLACE ";" "," IOTJS_JS_MODULES_STR "${IOTJS_JS_MODULES}")
 add_custom_command(
-  OUTPUT ${IOTJS_SOURCE_DIR}/iotjs_js.c ${IOTJS_SOURCE_DIR}/iotjs_js.h
+  ${JS2C_OUTPUT_ARGS}
   COMMAND ${CMAKE_C_COMPILER} ${JS2C_PREPROCESS_ARGS} ${IOTJS_MODULE_DEFINES}
             ${IOTJS_SOURCE_DIR}/iotjs_magic_strings.h
-          > ${IOTJS_SOURCE_DIR}/iotjs_magic_strings.in
+          > ${IOTJS_GENERATED_DIR}/iotjs_magic_strings.in
   COMMAND python ${ROOT_DIR}/tools/js2c.py
   ARGS --buildtype=${JS2C_RUN_MODE}
        --modules "${IOTJS_JS_MODULES_STR}"
+       --output-dir=${IOTJS_GENERATED_DIR}
        ${JS2C_SNAPSHOT_ARG}
+       ${JS2C_SPLIT_ARG}
+       ${JS2C_REPORT_ARG}
+       ${JS2C_APP_ARG}
   COMMAND ${CMAKE_COMMAND} -E remove
-            -f ${IOTJS_SOURCE_DIR}/iotjs_magic_strings.in
+            -f ${IOTJS_GENERATED_DIR}/iotjs_magic_strings.in
+  COMMAND ${CMAKE_COMMAND} -E touch ${JS2C_TOUCH_ARGS}
   DEPENDS ${ROOT_DIR}/tools/js2c.py
           jerry-snapshot
           ${IOTJS_JS_MODULE_SRC}
+          ${IOTJS_APP_ENTRY}
+          ${IOTJS_APP_SRC}
 )
 
 # Load all external module cmake files
@@ -415,8 +582,10 @@ endforeach()
 # Collect all sources into LIB_IOTJS_SRC
 file(GLOB LIB_IOTJS_SRC ${IOTJS_SOURCE_DIR}/*.c)
 list(APPEND LIB_IOTJS_SRC
-  ${IOTJS_SOURCE_DIR}/iotjs_js.c
-  ${IOTJS_SOURCE_DIR}/iotjs_js.h
+  ${IOTJS_GENERATED_DIR}/iotjs_js.c
+  ${IOTJS_GENERATED_DIR}/iotjs_js.h
+  ${JS2C_STAMP}
+  ${JS2C_SPLIT_OUTPUT}
   ${IOTJS_NATIVE_MODULE_SRC}
   ${IOTJS_PLATFORM_SRC}
 )
@@ -427,6 +596,7 @@ separate_arguments(EXTERNAL_LIBS)
 set(IOTJS_INCLUDE_DIRS
   ${EXTERNAL_INCLUDE_DIR}
   ${ROOT_DIR}/include
+  ${IOTJS_GENERATED_DIR}
   ${IOTJS_SOURCE_DIR}
   ${MODULES_INCLUDE_DIR}
   ${PLATFORM_OS_DIR}
@@ -456,6 +626,11 @@ message(STATUS "CMAKE_C_FLAGS            ${CMAKE_C_FLAGS}")
 message(STATUS "CMAKE_TOOLCHAIN_FILE     ${CMAKE_TOOLCHAIN_FILE}")
 message(STATUS "ENABLE_LTO               ${ENABLE_LTO}")
 message(STATUS "ENABLE_SNAPSHOT          ${ENABLE_SNAPSHOT}")
+message(STATUS "ENABLE_SNAPSHOT_BLOB     ${ENABLE_SNAPSHOT_BLOB}")
+message(STATUS "ENABLE_JS2C_REPORT       ${ENABLE_JS2C_REPORT}")
+message(STATUS "IOTJS_APP_ENTRY          ${IOTJS_APP_ENTRY}")
+message(STATUS "IOTJS_APP_DIR            ${IOTJS_APP_DIR}")
+message(STATUS "JS2C_MAGIC_STRING_BUDGET ${JS2C_MAGIC_STRING_BUDGET}")
 message(STATUS "EXTERNAL_INCLUDE_DIR     ${EXTERNAL_INCLUDE_DIR}")
 message(STATUS "EXTERNAL_LIBC_INTERFACE  ${EXTERNAL_LIBC_INTERFACE}")
 message(STATUS "EXTERNAL_LIBS            ${EXTERNAL_LIBS}")
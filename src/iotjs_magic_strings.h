@@ -63,6 +63,7 @@
 #endif
 #define IOTJS_MAGIC_STRING_BUFFER "Buffer"
 #define IOTJS_MAGIC_STRING_BUILTIN_MODULES "builtin_modules"
+#define IOTJS_MAGIC_STRING_BUNDLED_MODULES "bundled_modules"
 #if ENABLE_MODULE_I2C || ENABLE_MODULE_SPI
 #define IOTJS_MAGIC_STRING_BUS "bus"
 #endif
@@ -89,6 +90,7 @@
 #define IOTJS_MAGIC_STRING_CODE "code"
 #define IOTJS_MAGIC_STRING_COMPARE "compare"
 #define IOTJS_MAGIC_STRING_COMPILE "compile"
+#define IOTJS_MAGIC_STRING_COMPILEBUNDLED "compileBundled"
 #define IOTJS_MAGIC_STRING_COMPILEMODULE "compileModule"
 #define IOTJS_MAGIC_STRING_CONFIG "config"
 #define IOTJS_MAGIC_STRING_CONNECT "connect"
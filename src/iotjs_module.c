@@ -37,14 +37,27 @@ void iotjs_module_list_cleanup(void) {
 }
 
 jerry_value_t iotjs_module_get(const char* name) {
-  for (unsigned i = 0; i < iotjs_module_count; i++) {
-    if (!strcmp(name, iotjs_module_ro_data[i].name)) {
+  // iotjs_module_ro_data is sorted by name (see cmake/iotjs.cmake)
+  unsigned low = 0;
+  unsigned high = iotjs_module_count;
+
+  while (low < high) {
+    unsigned i = low + (high - low) / 2;
+    int cmp = strcmp(name, iotjs_module_ro_data[i].name);
+
+    if (cmp == 0) {
       if (iotjs_module_rw_data[i].jmodule == 0) {
         iotjs_module_rw_data[i].jmodule = iotjs_module_ro_data[i].fn_register();
       }
 
       return iotjs_module_rw_data[i].jmodule;
     }
+
+    if (cmp < 0) {
+      high = i;
+    } else {
+      low = i + 1;
+    }
   }
 
   return jerry_create_undefined();
@@ -141,6 +141,50 @@ if (process.env.IOTJS_EXTRA_MODULE_PATH) {
   });
 }
 
+// Application files embedded into the snapshot by js2c. Their paths are
+// relative to the working directory.
+var bundledModules = Builtin.bundled_modules || {};
+var bundleRoot = null;
+if (cwd && Object.keys(bundledModules).length > 0) {
+  bundleRoot = path.normalizePath(cwd);
+  if (bundleRoot.slice(-1) !== '/') {
+    bundleRoot += '/';
+  }
+}
+
+function bundledFile(key) {
+  return bundledModules.hasOwnProperty(key) ? bundledModules[key] : false;
+}
+
+function bundlePath(modulePath) {
+  if (!bundleRoot) {
+    return false;
+  }
+
+  try {
+    modulePath = path.normalizePath(modulePath);
+  } catch (e) {
+    // The path is above the root, it is left to the normal resolver.
+    return false;
+  }
+  if (modulePath.indexOf(bundleRoot) !== 0) {
+    return false;
+  }
+
+  return modulePath.substr(bundleRoot.length);
+}
+
+function tryBundled(modulePath, ext) {
+  var key = bundlePath(modulePath);
+  if (key === false) {
+    return false;
+  }
+
+  // id[.ext], or the main file of the directory
+  var file = bundledFile(key) || bundledFile(key + ext);
+  return file ? bundleRoot + file : false;
+}
+
 function tryPath(modulePath, ext) {
   return Module.tryPath(modulePath) ||
          Module.tryPath(modulePath + ext);
@@ -175,6 +219,11 @@ Module.resolveFilepath = function(id, directories) {
     var filepath,
         ext = '.js';
 
+    // embedded id[.ext] or directory
+    if ((filepath = tryBundled(modulePath, ext))) {
+      return filepath;
+    }
+
     // id[.ext]
     if ((filepath = tryPath(modulePath, ext))) {
       return filepath;
@@ -227,6 +276,12 @@ Module.resolveModPath = function(id, parent) {
 };
 
 
+Module.bundledKey = function(filepath) {
+  var key = bundlePath(filepath);
+  return key !== false && bundledFile(key) ? key : false;
+};
+
+
 Module.tryPath = function(path) {
   try {
     var stats = fs.statSync(path);
@@ -266,9 +321,14 @@ Module.load = function(id, parent) {
   Module.cache[modPath] = module;
 
   var ext = modPath.substr(modPath.lastIndexOf('.') + 1);
+  var bundledKey = Module.bundledKey(modPath);
   var source;
 
-  if (ext === 'js') {
+  if (bundledKey !== false) {
+    var fn = Builtin.compileBundled(bundledFile(bundledKey));
+    fn.call(module.exports, module.exports, module.require.bind(module),
+            module);
+  } else if (ext === 'js') {
     source = Builtin.readSource(modPath);
     module.compile(modPath, source);
   } else if (ext === 'json') {
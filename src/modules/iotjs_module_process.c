@@ -34,6 +34,35 @@ static jerry_value_t WrapEval(const char* name, size_t name_len,
 }
 
 
+// Look up an entry of a js2c generated table by name. The tables are sorted
+// by name, which is the first member of the entries. Returns the index of
+// the terminating entry if the name is not found.
+static unsigned FindJsTableEntry(const void* table, size_t entry_size,
+                                 unsigned count, const char* name) {
+  unsigned low = 0;
+  unsigned high = count;
+
+  while (low < high) {
+    unsigned i = low + (high - low) / 2;
+    const char* entry_name =
+        *(const char* const*)((const char*)table + i * entry_size);
+    int cmp = strcmp(name, entry_name);
+
+    if (cmp == 0) {
+      return i;
+    }
+
+    if (cmp < 0) {
+      high = i;
+    } else {
+      low = i + 1;
+    }
+  }
+
+  return count;
+}
+
+
 JS_FUNCTION(Compile) {
   DJS_CHECK_ARGS(2, string, string);
 
@@ -123,14 +152,8 @@ JS_FUNCTION(CompileModule) {
   jerry_release_value(jid);
   const char* name = iotjs_string_data(&id);
 
-  int i = 0;
-  while (js_modules[i].name != NULL) {
-    if (!strcmp(js_modules[i].name, name)) {
-      break;
-    }
-
-    i++;
-  }
+  unsigned i = FindJsTableEntry(js_modules, sizeof(js_modules[0]),
+                                JS_MODULES_COUNT, name);
 
   jerry_value_t native_module_jval = iotjs_module_get(name);
 
@@ -173,6 +196,36 @@ JS_FUNCTION(CompileModule) {
 }
 
 
+// Compile an application file embedded by js2c (see tools/js2c.py
+// --bundle-app). Returns the module wrapper function like Compile.
+JS_FUNCTION(CompileBundled) {
+  DJS_CHECK_ARGS(1, string);
+
+  iotjs_string_t file = JS_GET_ARG(0, string);
+  const char* filename = iotjs_string_data(&file);
+
+  unsigned i = FindJsTableEntry(js_app_modules, sizeof(js_app_modules[0]),
+                                JS_APP_MODULES_COUNT, filename);
+
+  jerry_value_t jres;
+  if (js_app_modules[i].path == NULL) {
+    jres = JS_CREATE_ERROR(COMMON, "Unknown bundled module");
+  } else {
+#ifdef ENABLE_SNAPSHOT
+    jres = jerry_exec_snapshot((const uint32_t*)iotjs_js_modules_s,
+                               iotjs_js_modules_l, js_app_modules[i].idx,
+                               JERRY_SNAPSHOT_EXEC_ALLOW_STATIC);
+#else
+    jres = JS_CREATE_ERROR(COMMON, "Bundled modules require snapshot mode");
+#endif
+  }
+
+  iotjs_string_destroy(&file);
+
+  return jres;
+}
+
+
 JS_FUNCTION(ReadSource) {
   DJS_CHECK_ARGS(1, string);
 
@@ -337,6 +390,13 @@ static void SetBuiltinModules(jerry_value_t builtin_modules) {
   }
 }
 
+static void SetBundledModules(jerry_value_t bundled_modules) {
+  for (unsigned i = 0; js_app_modules[i].path; i++) {
+    iotjs_jval_set_property_string_raw(bundled_modules, js_app_modules[i].path,
+                                       js_app_modules[i].file);
+  }
+}
+
 static void SetProcessPrivate(jerry_value_t process, bool wait_source) {
   jerry_value_t private = jerry_create_object();
   iotjs_jval_set_property_jval(process, IOTJS_MAGIC_STRING_PRIVATE, private);
@@ -345,6 +405,15 @@ static void SetProcessPrivate(jerry_value_t process, bool wait_source) {
   iotjs_jval_set_method(private, IOTJS_MAGIC_STRING_COMPILEMODULE,
                         CompileModule);
   iotjs_jval_set_method(private, IOTJS_MAGIC_STRING_READSOURCE, ReadSource);
+  iotjs_jval_set_method(private, IOTJS_MAGIC_STRING_COMPILEBUNDLED,
+                        CompileBundled);
+
+  // Application files embedded into the snapshot (path -> file)
+  jerry_value_t bundled_modules = jerry_create_object();
+  SetBundledModules(bundled_modules);
+  iotjs_jval_set_property_jval(private, IOTJS_MAGIC_STRING_BUNDLED_MODULES,
+                               bundled_modules);
+  jerry_release_value(bundled_modules);
 
 #ifdef JERRY_DEBUGGER
   // debugger
@@ -22,23 +22,37 @@ except:
     basestring = str
 
 import argparse
+import collections
+import hashlib
 import json
+import multiprocessing
+import subprocess
 import sys
 import re
 import os
+import threading
+import time
 
 from common_py import path
 from common_py.system.filesystem import FileSystem as fs
 from common_py.system.executor import Executor as ex
 from common_py.system.executor import Terminal
 from common_py.system.platform import Platform
+from build_trace import BuildTrace, TRACE_DIR_ENV
+from module_resolver import ModuleError, resolve_modules, system_os, write_cmake
 
 platform = Platform()
 
 # Initialize build options.
-def init_options():
+OPT_LEVELS = ['O2', 'Os', 'O3']
+
+
+def init_options(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
     # Check config options.
-    arg_config = list(filter(lambda x: x.startswith('--config='), sys.argv))
+    arg_config = list(filter(lambda x: x.startswith('--config='), args))
     config_path = path.BUILD_CONFIG_PATH
 
     if arg_config:
@@ -69,7 +83,7 @@ def init_options():
                 argv.append('--%s=%s' % (opt_key, val))
 
     # Apply command line argument to argv.
-    argv = argv + sys.argv[1:]
+    argv = argv + args
 
     # Prepare argument parser.
     parser = argparse.ArgumentParser(description='Building tool for IoT.js '
@@ -77,6 +91,19 @@ def init_options():
 
     iotjs_group = parser.add_argument_group('Arguments of IoT.js',
         'The following arguments are related to the IoT.js framework.')
+    iotjs_group.add_argument('--bench-rounds',
+        type=int, default=3, metavar='N',
+        help='Runs of the workload with every binary compared by --pgo and '
+             '--opt-matrix, the fastest counts (default: %(default)s)')
+    iotjs_group.add_argument('--bench-workload',
+        default=None, metavar='DIR',
+        help='Directory of the JS files used as workload by --pgo and '
+             '--opt-matrix (default: the run_pass tests)')
+    iotjs_group.add_argument('--build-trace',
+        action='store_true', default=False,
+        help='Record the time of the build phases and of every compile, link '
+             'and custom command into build_trace.json (chrome://tracing) '
+             'and build_trace.txt in the build directory')
     iotjs_group.add_argument('--buildtype',
         choices=['debug', 'release'], default='debug',
         help='Specify the build type (default: %(default)s).')
@@ -96,6 +123,11 @@ def init_options():
         help='Specify additional compile flags (can be used multiple times)')
     iotjs_group.add_argument('--clean', action='store_true', default=False,
         help='Clean build directory before build (default: %(default)s)')
+    iotjs_group.add_argument('--compiler-cache',
+        nargs='?', const='auto', default=None,
+        choices=['auto', 'ccache', 'sccache'],
+        help='Run the compiler through ccache or sccache (default: the one '
+             'which is found first)')
     iotjs_group.add_argument('--config', default=path.BUILD_CONFIG_PATH,
         help='Specify the config file (default: %(default)s)',
         dest='config_path')
@@ -114,9 +146,29 @@ def init_options():
         action='store', default=set(), type=lambda x: set(x.split(',')),
         help='Specify the path of modules.json files which should be processed '
              '(format: path1,path2,...)')
+    iotjs_group.add_argument('--force-configure',
+        action='store_true', default=False,
+        help='Run cmake even if the configuration did not change since the '
+             'last build')
+    iotjs_group.add_argument('--generator',
+        choices=['make', 'ninja'], default='make',
+        help='Specify the build tool used by cmake (default: %(default)s)')
+    iotjs_group.add_argument('-j', '--jobs',
+        type=int, default=None, metavar='N',
+        help='Number of parallel build jobs, shared by the configurations '
+             'of a --matrix build (default: the number of CPUs, limited by '
+             'the available memory)')
     iotjs_group.add_argument('--link-flag',
         action='append', default=[],
         help='Specify additional linker flags (can be used multiple times)')
+    iotjs_group.add_argument('--matrix',
+        default=None, metavar='FILE',
+        help='Build the configurations listed in the given JSON file '
+             'concurrently, sharing the host tools between them')
+    iotjs_group.add_argument('--max-load',
+        type=float, default=None, metavar='LOAD',
+        help='Do not start new build jobs while the load average is above '
+             'the given value')
     iotjs_group.add_argument('--no-check-valgrind',
         action='store_true', default=False,
         help='Disable test execution with valgrind after build')
@@ -129,14 +181,61 @@ def init_options():
     iotjs_group.add_argument('--no-snapshot',
         action='store_true', default=False,
         help='Disable snapshot generation for IoT.js')
+    iotjs_group.add_argument('--snapshot-blob',
+        action='store_true', default=False,
+        help='Link the snapshot of the JS modules as a binary blob instead '
+             'of compiling it as a C array (requires a GNU toolchain)')
+    iotjs_group.add_argument('--app-entry',
+        default=None, metavar='FILE',
+        help='Embed only the JS modules reachable through the require() '
+             'calls of the given application entry point')
+    iotjs_group.add_argument('--bundle-app',
+        default=None, metavar='DIR',
+        help='Embed the JS files of the application in the given directory '
+             'into the snapshot (reachable from --app-entry if specified)')
+    iotjs_group.add_argument('--js2c-report',
+        action='store_true', default=False,
+        help='Write the size report of the embedded JS modules to '
+             'js2c_report.json in the build directory')
+    iotjs_group.add_argument('--lto',
+        action='store_true', default=False,
+        help='Build every component (IoT.js, JerryScript, libtuv and the '
+             'other dependencies) with link time optimization')
+    iotjs_group.add_argument('--magic-string-budget',
+        type=int, default=None, metavar='BYTES',
+        help='Limit the ROM used by the external magic strings to the given '
+             'number of bytes (default: no limit)')
     iotjs_group.add_argument('--nuttx-home', default=None, dest='sysroot',
         help='Specify the NuttX base directory (required for NuttX build)')
+    iotjs_group.add_argument('--opt-level',
+        choices=OPT_LEVELS, default=None,
+        help='Specify the optimization level of every component, it '
+             'replaces the level of the build type')
+    iotjs_group.add_argument('--opt-matrix',
+        action='store_true', default=False,
+        help='Build a variant for every --opt-level concurrently and '
+             'compare their size, startup time and workload runtime')
+    iotjs_group.add_argument('--pgo',
+        action='store_true', default=False,
+        help='Build with profile-guided optimization: build an instrumented '
+             'binary, run the --bench-workload with it and rebuild with the '
+             'recorded profile (requires GCC and a target which runs on the '
+             'host)')
     iotjs_group.add_argument('--profile',
         help='Specify the module profile file for IoT.js')
     iotjs_group.add_argument('--run-test',
         nargs='?', default=False, const="quiet", choices=["full", "quiet"],
         help='Execute tests after build, optional argument specifies '
              'the level of output for the testrunner')
+    iotjs_group.add_argument('--size-budget',
+        default=None, metavar='FILE',
+        help='Fail the build if a module or component exceeds its flash '
+             'size limit in the given JSON file (implies --size-report)')
+    iotjs_group.add_argument('--size-report',
+        action='store_true', default=False,
+        help='Attribute the size of the binary to the IoT.js modules and '
+             'components and write it to size_report.json in the build '
+             'directory (requires a GNU toolchain)')
     iotjs_group.add_argument('--sysroot', action='store',
         help='The location of the development tree root directory (sysroot). '
              'Must be compatible with used toolchain.')
@@ -176,6 +275,9 @@ def init_options():
     jerry_group.add_argument('--jerry-heap-section',
         action='store', default=None,
         help='Specify the name of the JerryScript heap section')
+    jerry_group.add_argument('--jerry-host-snapshot',
+        default=None, metavar='FILE',
+        help='Use the given host jerry-snapshot tool instead of building it')
     jerry_group.add_argument('--jerry-lto',
         action='store_true', default=False,
         help='Build JerryScript with LTO enabled')
@@ -240,6 +342,16 @@ def adjust_options(options):
     cmake_path = fs.join(path.PROJECT_ROOT, 'cmake', 'config', '%s.cmake')
     options.cmake_toolchain_file = cmake_path % options.target_tuple
 
+    if options.size_budget:
+        options.size_report = True
+        options.size_budget = fs.abspath(options.size_budget)
+
+    # Pick the number of build jobs if it is not defined.
+    if options.no_parallel_build:
+        options.jobs = 1
+    elif not options.jobs:
+        options.jobs = default_jobs()
+
     # Set the default value of '--js-backtrace' if it is not defined.
     if not options.js_backtrace:
         if options.buildtype == 'debug':
@@ -247,14 +359,87 @@ def adjust_options(options):
         else:
             options.js_backtrace = "OFF"
 
+    # Find the executable of '--compiler-cache'.
+    options.compiler_launcher = None
+    if options.compiler_cache:
+        candidates = [options.compiler_cache]
+        if options.compiler_cache == 'auto':
+            candidates = COMPILER_CACHES
+        for candidate in candidates:
+            options.compiler_launcher = find_program(candidate)
+            if options.compiler_launcher:
+                break
+        else:
+            ex.fail('Compiler cache not found: %s' % ', '.join(candidates))
+
+
+COMPILER_CACHES = ['ccache', 'sccache']
+
+
+def find_program(name):
+    """ Return the path of the executable from the PATH or None. """
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        program = fs.join(directory, name)
+        if os.path.isfile(program) and os.access(program, os.X_OK):
+            return program
+    return None
+
+
+def setup_compiler_cache(options):
+    """ Let ccache reuse the objects of other build directories and reset
+        the statistics of the cache.
+    """
+    if fs.basename(options.compiler_launcher).startswith('ccache'):
+        # The absolute paths under the base directory (the sources and the
+        # build directory) are hashed relative to the working directory.
+        base_dir = os.path.dirname(os.path.commonprefix(
+            [path.PROJECT_ROOT + os.sep, options.build_root + os.sep]))
+        if base_dir != os.sep:
+            os.environ.setdefault('CCACHE_BASEDIR', base_dir)
+        os.environ.setdefault('CCACHE_NOHASHDIR', '1')
+
+    ex.run_cmd(options.compiler_launcher, ['--zero-stats'], quiet=True)
+
+
+def print_compiler_cache_stats(options):
+    print_progress('Compiler cache statistics')
+    ex.run_cmd(options.compiler_launcher, ['--show-stats'], quiet=True)
+
 
 def print_progress(msg):
     print('==> %s\n' % msg)
 
 
+def outdated_submodules():
+    """ The paths of the submodules which are not checked out at the
+        commits recorded in the repository.
+    """
+    try:
+        output = ex.check_run_cmd_output('git', ['submodule', 'status'],
+                                         quiet=True)
+    except subprocess.CalledProcessError as e:
+        ex.fail('Failed to read the status of the submodules: %s' % e)
+    # The first character is ' ' for a checked out submodule, '-' for an
+    # uninitialized one, '+' for a different commit and 'U' for conflicts.
+    return [line[1:].split()[1]
+            for line in output.decode('utf-8').splitlines()
+            if line and line[0] != ' ']
+
+
 def init_submodule():
-    ex.check_run_cmd('git', ['submodule', 'init'])
-    ex.check_run_cmd('git', ['submodule', 'update'])
+    submodules = outdated_submodules()
+    if not submodules:
+        print('Submodules are up to date')
+        return
+
+    # Fetch only the recorded commits, all submodules at once.
+    update_args = ['submodule', 'update', '--init']
+    shallow_args = ['--depth=1', '--jobs=%d' % len(submodules)]
+    if ex.run_cmd('git', update_args + shallow_args + ['--'] + submodules):
+        # Older git versions or servers which do not serve the recorded
+        # commits directly need the whole history.
+        print('Shallow update failed, fetch the whole history')
+        ex.check_run_cmd('git', update_args + ['--'] + outdated_submodules())
 
 
 def build_cmake_args(options):
@@ -286,19 +471,116 @@ def build_cmake_args(options):
     elif options.target_os == 'windows':
         cmake_args.append("-GVisual Studio 15 2017")
 
+    if options.generator == 'ninja' and options.target_os != 'windows':
+        cmake_args.append('-GNinja')
+
     include_dirs.extend(options.external_include_dir)
     cmake_args.append("-DEXTERNAL_INCLUDE_DIR='%s'" % (' '.join(include_dirs)))
 
     return cmake_args
 
 
-def run_make(options, build_home, *args):
-    make_opt = ['-C', build_home]
-    make_opt.extend(args)
-    if not options.no_parallel_build:
-        make_opt.append('-j')
+# Estimated peak memory of a compile job in MB. Compiling the snapshot hex
+# array of iotjs_js.c takes the most (see --snapshot-blob).
+JOB_MEMORY_MB = 768
+
+
+def available_memory_mb():
+    """ The memory available for new processes in MB or None if unknown. """
+    try:
+        with open('/proc/meminfo', 'r') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except IOError:
+        pass
+
+    try:
+        return (os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+                // (1024 * 1024))
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_jobs():
+    """ One job per CPU, but not more than fit into the available memory. """
+    jobs = multiprocessing.cpu_count()
+    memory = available_memory_mb()
+    if memory is not None:
+        jobs = min(jobs, memory // JOB_MEMORY_MB)
+    return max(1, jobs)
+
+
+def jobserver_active():
+    """ Whether make is run under a jobserver, e.g. of a --matrix build or
+        of an outer make. The jobserver is given in MAKEFLAGS as the R,W
+        file descriptors (--jobserver-fds or --jobserver-auth) or as the
+        fifo:PATH named pipe of make 4.4 (--jobserver-auth).
+    """
+    auth = None
+    for flag in os.environ.get('MAKEFLAGS', '').split():
+        for prefix in ['--jobserver-auth=', '--jobserver-fds=']:
+            if flag.startswith(prefix):
+                auth = flag[len(prefix):]
+
+    if auth is None:
+        return False
+    if auth.startswith('fifo:'):
+        return fs.exists(auth[len('fifo:'):])
+    # The descriptors are closed if make did not treat us as a sub-make.
+    try:
+        for fd in auth.split(','):
+            os.fstat(int(fd))
+    except (ValueError, OSError):
+        return False
+    return True
+
+
+def run_build(options, build_home, *targets):
+    """ Run the build tool of the cmake generator in the build directory. """
+    jobserver = jobserver_active()
+    if options.generator == 'ninja':
+        cmd = 'ninja'
+        build_opt = ['-C', build_home, '-j%d' % options.jobs]
+    else:
+        cmd = 'make'
+        build_opt = ['-C', build_home]
+        # The job slots are taken from the inherited jobserver (of a
+        # --matrix build or an outer make), an explicit -j would make make
+        # leave it.
+        if not jobserver or options.no_parallel_build:
+            build_opt.append('-j%d' % options.jobs)
+
+    if options.max_load:
+        build_opt.append('-l%g' % options.max_load)
+    build_opt.extend(targets)
+
+    ex.check_run_cmd(cmd, build_opt, keep_fds=jobserver)
+
+
+def cmake_cache_value(options, name):
+    """ The value of an entry of the CMake cache of the build or None. """
+    cache_path = fs.join(options.build_root, 'CMakeCache.txt')
+    if not fs.exists(cache_path):
+        return None
+    with open(cache_path, 'r') as cache:
+        for line in cache:
+            if line.startswith(name + ':'):
+                return line.strip().split('=', 1)[1]
+    return None
+
+
+def check_generator(options):
+    """ CMake can not switch the generator of a configured build directory. """
+    if options.target_os == 'windows':
+        return
 
-    ex.check_run_cmd('make', make_opt)
+    generator = 'Ninja' if options.generator == 'ninja' else 'Unix Makefiles'
+    configured = cmake_cache_value(options, 'CMAKE_GENERATOR')
+    if configured and configured != generator:
+        ex.fail('%s was configured with the "%s" generator, use --clean to '
+                'switch to %s'
+                % (options.build_root, configured, options.generator))
 
 
 def get_on_off(boolean_value):
@@ -308,7 +590,62 @@ def get_on_off(boolean_value):
     return 'OFF'
 
 
-def build_iotjs(options):
+def resolve_module_config(options):
+    """ Resolve the enabled modules with tools/module_resolver.py, CMake
+        includes the result instead of parsing the modules.json files.
+        Return the path of the result and the files it was resolved from.
+    """
+    print_progress('Resolve modules')
+
+    profile = options.profile or fs.join('profiles', 'default.profile')
+    output = fs.join(options.build_root, 'iotjs_modules.cmake')
+    fs.maybe_make_directory(options.build_root)
+    try:
+        config, result = resolve_modules(
+            profile, system_os(options.cmake_toolchain_file),
+            list(options.external_modules), options.cmake_param)
+    except (ModuleError, IOError, ValueError) as e:
+        ex.fail('Unable to resolve the modules: %s' % e)
+
+    write_cmake(config, result, output, profile)
+    return output, config.inputs
+
+
+def configure_hash(options, cmake_opt, inputs):
+    """ Hash of the cmake arguments and of the content of the toolchain
+        file, the profile and the module descriptors.
+    """
+    digest = hashlib.sha1()
+    for opt in cmake_opt:
+        digest.update(('%s\n' % opt).encode('utf-8'))
+    for input_path in [options.cmake_toolchain_file] + inputs:
+        digest.update(('%s\n' % input_path).encode('utf-8'))
+        with open(input_path, 'rb') as input_file:
+            digest.update(input_file.read())
+    return digest.hexdigest()
+
+
+def is_configured(options, stamp_path, configure_digest):
+    """ Whether the build directory was configured with the same hash. The
+        build tool still re-runs cmake itself if a CMakeLists.txt or an
+        included cmake file changed.
+    """
+    if options.force_configure or not fs.exists(stamp_path):
+        return False
+
+    build_files = ['CMakeCache.txt']
+    if options.target_os != 'windows':
+        build_files.append('build.ninja' if options.generator == 'ninja'
+                           else 'Makefile')
+    for file_name in build_files:
+        if not fs.exists(fs.join(options.build_root, file_name)):
+            return False
+
+    with open(stamp_path, 'r') as stamp_file:
+        return stamp_file.read().strip() == configure_digest
+
+
+def build_iotjs(options, trace):
     print_progress('Build IoT.js')
 
     # Set IoT.js cmake options.
@@ -320,8 +657,16 @@ def build_iotjs(options):
         '-DTARGET_ARCH=%s' % options.target_arch,
         '-DTARGET_OS=%s' % options.target_os,
         '-DTARGET_BOARD=%s' % options.target_board,
-        '-DENABLE_LTO=%s' % get_on_off(options.jerry_lto), # --jerry-lto
+        # --jerry-lto, --lto
+        '-DENABLE_LTO=%s' % get_on_off(options.jerry_lto or options.lto),
+        '-DIOTJS_LTO=%s' % get_on_off(options.lto),
+        # --opt-level
+        '-DIOTJS_OPT_LEVEL=%s' % (options.opt_level or ''),
         '-DENABLE_SNAPSHOT=%s' % get_on_off(not options.no_snapshot),
+        # --snapshot-blob
+        '-DENABLE_SNAPSHOT_BLOB=%s' % get_on_off(options.snapshot_blob),
+        # --js2c-report
+        '-DENABLE_JS2C_REPORT=%s' % get_on_off(options.js2c_report),
         '-DBUILD_LIB_ONLY=%s' % get_on_off(options.buildlib), # --buildlib
         '-DCREATE_SHARED_LIB=%s' % get_on_off(options.create_shared_lib),
         # --jerry-memstat
@@ -345,11 +690,31 @@ def build_iotjs(options):
             cmake_opt.append("-DEXTRA_JERRY_CMAKE_PARAMS='%s'" %
                              "-DFEATURE_CPOINTER_32_BIT=ON")
 
+    # --app-entry
+    if options.app_entry:
+        cmake_opt.append("-DIOTJS_APP_ENTRY='%s'" %
+                         fs.abspath(options.app_entry))
+
+    # --bundle-app
+    if options.bundle_app:
+        cmake_opt.append("-DIOTJS_APP_DIR='%s'" %
+                         fs.abspath(options.bundle_app))
+
+    # --magic-string-budget
+    if options.magic_string_budget is not None:
+        cmake_opt.append('-DJS2C_MAGIC_STRING_BUDGET=%d' %
+                         options.magic_string_budget)
+
     # --jerry-heap-section
     if options.jerry_heap_section:
         cmake_opt.append("-DJERRY_HEAP_SECTION_ATTR='%s'" %
                          options.jerry_heap_section)
 
+    # --jerry-host-snapshot
+    if options.jerry_host_snapshot:
+        cmake_opt.append("-DJERRY_HOST_SNAPSHOT_TOOL='%s'" %
+                         fs.abspath(options.jerry_host_snapshot))
+
     # --jerry-debugger
     if options.jerry_debugger:
         cmake_opt.append("-DFEATURE_DEBUGGER=ON")
@@ -378,16 +743,479 @@ def build_iotjs(options):
     if options.profile:
         cmake_opt.append("-DIOTJS_PROFILE='%s'" % options.profile)
 
+    # --compiler-cache
+    cmake_opt.append('-DCMAKE_C_COMPILER_LAUNCHER=%s' %
+                     (options.compiler_launcher or ''))
+
+    # --build-trace
+    trace_launcher = ''
+    if options.build_trace:
+        trace_launcher = fs.join(path.TOOLS_ROOT, 'build_trace.py')
+    cmake_opt.append('-DIOTJS_BUILD_TRACE=%s' % trace_launcher)
+
+    # The module configuration resolved for --profile and --external-modules
+    with trace.phase('resolve modules'):
+        modules_cmake, module_inputs = resolve_module_config(options)
+    cmake_opt.append("-DIOTJS_MODULES_CMAKE='%s'" % modules_cmake)
+
     # Add common cmake options.
     cmake_opt.extend(build_cmake_args(options))
 
-    # Run cmake.
-    ex.check_run_cmd('cmake', cmake_opt)
+    # Run cmake, unless the build directory is configured the same way.
+    check_generator(options)
+    stamp_path = fs.join(options.build_root, 'configure.stamp')
+    configure_digest = configure_hash(options, cmake_opt, module_inputs)
+    if is_configured(options, stamp_path, configure_digest):
+        print('Configuration is up to date, skip cmake '
+              '(use --force-configure to run it)')
+    else:
+        if fs.exists(stamp_path):
+            fs.remove(stamp_path)
+        with trace.phase('configure'):
+            ex.check_run_cmd('cmake', cmake_opt)
+        with open(stamp_path, 'w') as stamp_file:
+            stamp_file.write(configure_digest + '\n')
 
     if options.target_os == 'windows':
         print("\nPlease open the iot.js solution file in Visual Studio!")
     else:
-        run_make(options, options.build_root)
+        if options.compiler_launcher:
+            setup_compiler_cache(options)
+        with trace.phase('build'):
+            run_build(options, options.build_root)
+        if options.compiler_launcher:
+            print_compiler_cache_stats(options)
+
+
+def start_build_trace(options):
+    """ Point the launcher of --build-trace to an empty event directory. """
+    trace_dir = fs.join(options.build_root, 'build_trace')
+    if not options.build_trace:
+        os.environ.pop(TRACE_DIR_ENV, None)
+        return trace_dir
+
+    fs.rmtree(trace_dir)
+    fs.maybe_make_directory(trace_dir)
+    os.environ[TRACE_DIR_ENV] = trace_dir
+    return trace_dir
+
+
+def write_build_trace(options, trace, trace_dir):
+    json_path = fs.join(options.build_root, 'build_trace.json')
+    summary_path = fs.join(options.build_root, 'build_trace.txt')
+    trace.write(trace_dir, json_path, summary_path)
+    with open(summary_path, 'r') as summary_file:
+        print(summary_file.read())
+    print('Build trace: %s (open it in chrome://tracing)' % json_path)
+
+
+def run_size_report(options):
+    """ Attribute the size of the binary (from the linker map of the
+        executable or from libiotjs.a) to the modules and components.
+    """
+    print_progress('Size report')
+    cmd = fs.join(path.TOOLS_ROOT, 'size_report.py')
+    args = [
+        '--output=%s' % fs.join(options.build_root, 'size_report.json'),
+        '--external-modules=%s' % ','.join(
+            fs.join(path.PROJECT_ROOT, module_dir)
+            for module_dir in options.external_modules if module_dir),
+    ]
+    if options.buildlib:
+        # The size tool of the toolchain is next to its archiver.
+        archiver = cmake_cache_value(options, 'CMAKE_AR') or 'ar'
+        if archiver.endswith('ar'):
+            args.append('--size-tool=%s' % (archiver[:-2] + 'size'))
+        args.append(fs.join(options.build_root, 'lib', 'libiotjs.a'))
+    elif options.target_os in ['darwin', 'windows']:
+        ex.fail('--size-report requires the map file of the GNU linker')
+    else:
+        args.append('--map=%s' % fs.join(options.build_root, 'iotjs.map'))
+    if options.size_budget:
+        args.append('--budget=%s' % options.size_budget)
+
+    if ex.run_cmd(cmd, args) != 0:
+        ex.fail('Failed to check the size of the binary')
+
+
+# Parameters of the host snapshot tool, see hostjerry in cmake/jerry.cmake.
+HOST_JERRY_CMAKE_ARGS = [
+    '-DCMAKE_BUILD_TYPE=Release',
+    '-DENABLE_ALL_IN_ONE=ON',
+    '-DJERRY_CMDLINE=OFF',
+    '-DJERRY_CMDLINE_SNAPSHOT=ON',
+    '-DJERRY_EXT=ON',
+    '-DFEATURE_LOGGING=ON',
+    '-DFEATURE_SNAPSHOT_SAVE=ON',
+    '-DFEATURE_SYSTEM_ALLOCATOR=OFF',
+]
+
+
+def host_snapshot_params(options):
+    """ The JerryScript parameters of a configuration which change the
+        snapshot format. The configurations with the same parameters share
+        the host snapshot tool.
+    """
+    params = ['-DFEATURE_PROFILE=%s' % options.jerry_profile]
+    if options.jerry_cmake_param:
+        params.extend(options.jerry_cmake_param)
+    elif options.jerry_heaplimit and options.jerry_heaplimit > 512:
+        params.append('-DFEATURE_CPOINTER_32_BIT=ON')
+    return params
+
+
+def build_host_snapshot_tool(options, params):
+    key = hashlib.sha1(' '.join(params).encode('utf-8')).hexdigest()[:8]
+    build_home = fs.join(path.PROJECT_ROOT, options.builddir, 'host',
+                         'jerry-snapshot-%s' % key)
+    print_progress('Build host jerry-snapshot (%s)' % ' '.join(params))
+    if options.clean:
+        fs.rmtree(build_home)
+
+    cmake_opt = [
+        '-B%s' % build_home,
+        '-H%s' % path.JERRY_ROOT,
+        '-DCMAKE_INSTALL_PREFIX=%s' % build_home,
+    ]
+    if options.generator == 'ninja':
+        cmake_opt.append('-GNinja')
+    ex.check_run_cmd('cmake', cmake_opt + HOST_JERRY_CMAKE_ARGS + params)
+    run_build(options, build_home, 'install')
+    return fs.join(build_home, 'bin', 'jerry-snapshot')
+
+
+def load_matrix(matrix_path):
+    """ Return the {name: build.py arguments} configurations of a matrix
+        file, keeping their order.
+    """
+    with open(matrix_path, 'r') as matrix_file:
+        matrix = json.load(matrix_file,
+                           object_pairs_hook=collections.OrderedDict)
+
+    if not isinstance(matrix, dict) or not all(
+            isinstance(args, list) for args in matrix.values()):
+        ex.fail('%s: expected an object of argument lists' % matrix_path)
+    return matrix
+
+
+def matrix_base_args(args):
+    """ The arguments of a --matrix build which are passed to every
+        configuration.
+    """
+    base_args = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in ['--matrix', '-j', '--jobs', '--opt-level']:
+            skip = True
+        elif (arg.startswith('--matrix=') or arg.startswith('--jobs=')
+              or arg.startswith('--opt-level=') or arg == '--opt-matrix'
+              or re.match(r'^-j\d+$', arg)):
+            pass
+        else:
+            base_args.append(arg)
+    return base_args
+
+
+def print_matrix_summary(results):
+    print('| {0:<24} | {1:^6} | {2:>9} | {3}'.format(
+          'Configuration', 'Status', 'Time (s)', 'Log'))
+    print('| {0} | {1} | {2} | {3}'.format('-' * 24, '-' * 6, '-' * 9, '-' * 3))
+    for name, status, duration, log_path in results:
+        print('| {0:<24} | {1:^6} | {2:>9.1f} | {3}'.format(
+              name, status, duration, log_path))
+
+
+def run_matrix(options, args, matrix=None):
+    """ Build every configuration of the matrix (by default the matrix
+        file) in its own build directory. The configurations run
+        concurrently and share the job slots of a make jobserver (or divide
+        them with ninja), so at most options.jobs compile jobs run at the
+        same time.
+    """
+    if matrix is None:
+        matrix = load_matrix(options.matrix)
+    jobs = options.jobs
+    base_args = matrix_base_args(args)
+    results = []
+    # Every make holds one implicit job slot, the rest is in the pipe.
+    concurrency = min(jobs, len(matrix))
+
+    # Build the host tools once for the configurations sharing them.
+    host_tools = {}
+    config_args = collections.OrderedDict()
+    for name, matrix_args in matrix.items():
+        config = init_options(base_args + matrix_args)
+        adjust_options(config)
+        extra_args = ['--builddir=%s' % fs.join(options.builddir, name),
+                      '--no-init-submodule']
+        if options.generator == 'ninja':
+            # Ninja does not use the jobserver, the jobs are divided.
+            extra_args.append('--jobs=%d' % max(1, jobs // concurrency))
+        if not config.jerry_host_snapshot:
+            params = host_snapshot_params(config)
+            key = ' '.join(params)
+            if key not in host_tools:
+                start = time.time()
+                host_tools[key] = build_host_snapshot_tool(options, params)
+                results.append(('host jerry-snapshot', 'ok',
+                                time.time() - start, '-'))
+            extra_args.append('--jerry-host-snapshot=%s' % host_tools[key])
+        config_args[name] = base_args + matrix_args + extra_args
+
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b'+' * (jobs - concurrency))
+    for fd in [read_fd, write_fd]:
+        if hasattr(os, 'set_inheritable'):
+            os.set_inheritable(fd, True)
+    env = dict(os.environ)
+    env['MAKEFLAGS'] = '-j%d --jobserver-fds=%d,%d' % (jobs, read_fd,
+                                                       write_fd)
+
+    pending = list(config_args.items())
+    running = {}
+    while pending or running:
+        while pending and len(running) < concurrency:
+            name, config = pending.pop(0)
+            log_dir = fs.join(path.PROJECT_ROOT, options.builddir, name)
+            fs.maybe_make_directory(log_dir)
+            log_path = fs.join(log_dir, 'build.log')
+            log_file = open(log_path, 'w')
+            print_progress('Build %s' % name)
+            process = subprocess.Popen(
+                [sys.executable, fs.join(path.TOOLS_ROOT, 'build.py')]
+                + config, stdout=log_file, stderr=subprocess.STDOUT,
+                env=env, close_fds=False)
+            running[process] = (name, time.time(), log_file, log_path)
+
+        time.sleep(0.1)
+        for process in list(running):
+            if process.poll() is None:
+                continue
+            name, start, log_file, log_path = running.pop(process)
+            log_file.close()
+            status = 'ok' if process.returncode == 0 else 'FAILED'
+            print_progress('%s: %s' % (name, status))
+            results.append((name, status, time.time() - start, log_path))
+
+    os.close(read_fd)
+    os.close(write_fd)
+
+    print_matrix_summary(results)
+    failed = [name for name, status, _, _ in results if status != 'ok']
+    if failed:
+        ex.fail('Failed configurations: %s' % ', '.join(failed))
+
+
+def runs_on_host(options):
+    """ Whether the built binary can be run on the build host. """
+    return (options.host_tuple == options.target_tuple or
+            (options.host_tuple == 'x86_64-linux' and
+             options.target_tuple == 'i686-linux') or
+            (options.host_tuple == 'x86_64-linux' and
+             options.target_tuple == 'x86_64-mock'))
+
+
+# Per file limit of the --bench-workload in seconds.
+BENCH_TIMEOUT = 120
+
+
+def bench_workload(options, iotjs):
+    """ Return the (working directory, JS file) pairs of the workload. By
+        default the run_pass tests which are not skipped for the build.
+    """
+    if options.bench_workload:
+        workload_dir = fs.abspath(options.bench_workload)
+        return [(workload_dir, fs.join(workload_dir, file_name))
+                for file_name in sorted(fs.listdir(workload_dir))
+                if file_name.endswith('.js')]
+
+    build_info = json.loads(ex.check_run_cmd_output(
+        iotjs, [path.BUILD_INFO_PATH], quiet=True))
+    with open(fs.join(path.TEST_ROOT, 'testsets.json')) as testsets_file:
+        tests = json.load(testsets_file)['run_pass']
+
+    workload = []
+    for test in tests:
+        skip = set(test.get('skip', []))
+        if skip & set(['all', options.target_os, build_info['stability']]):
+            continue
+        if not set(test.get('required-modules', [])).issubset(
+                build_info['builtins']):
+            continue
+        if not set(test.get('required-features', [])).issubset(
+                build_info['features']):
+            continue
+        workload.append((path.TEST_ROOT,
+                         fs.join(path.RUN_PASS_DIR, test['name'])))
+    return workload
+
+
+def run_workload(iotjs, workload):
+    """ Run every file of the workload and return their exit codes and
+        run times.
+    """
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        for cwd, js_file in workload:
+            process = subprocess.Popen([iotjs, js_file], cwd=cwd,
+                                       stdout=devnull,
+                                       stderr=subprocess.STDOUT)
+            timer = threading.Timer(BENCH_TIMEOUT, process.kill)
+            start = time.time()
+            timer.start()
+            process.wait()
+            timer.cancel()
+            results.append((process.returncode, time.time() - start))
+    return results
+
+
+def time_workload(iotjs, workload, passed, rounds):
+    """ The fastest total run time of the passed files of the workload. """
+    return min(sum(runtime for ok, (_, runtime)
+                   in zip(passed, run_workload(iotjs, workload)) if ok)
+               for _ in range(max(1, rounds)))
+
+
+def remove_profiles(build_root):
+    for dir_path, _, file_names in os.walk(build_root):
+        for file_name in file_names:
+            if file_name.endswith('.gcda'):
+                fs.remove(fs.join(dir_path, file_name))
+
+
+def has_profiles(build_root):
+    return any(file_name.endswith('.gcda')
+               for _, _, file_names in os.walk(build_root)
+               for file_name in file_names)
+
+
+def build_pgo(options, trace):
+    """ Build IoT.js with profile-guided optimization. The instrumented and
+        the optimized build use the same build directory, so GCC finds the
+        profile of every object next to it. A build without profile is
+        kept for the speedup report.
+    """
+    if not runs_on_host(options) or options.buildlib:
+        ex.fail('--pgo requires an executable which runs on the host')
+
+    iotjs = fs.join(options.build_root, 'bin', 'iotjs')
+    pgo_dir = fs.join(options.build_root, 'pgo')
+    baseline = fs.join(pgo_dir, 'iotjs-baseline')
+    compile_flags = list(options.compile_flag)
+    link_flags = list(options.link_flag)
+
+    def build_step(name, compile_extra, link_extra):
+        print_progress('PGO: %s' % name)
+        options.compile_flag = compile_flags + compile_extra
+        options.link_flag = link_flags + link_extra
+        build_iotjs(options, trace)
+
+    build_step('baseline build', [], [])
+    fs.maybe_make_directory(pgo_dir)
+    fs.copy(iotjs, baseline)
+
+    remove_profiles(options.build_root)
+    build_step('instrumented build', ['-fprofile-generate'],
+               ['-fprofile-generate'])
+
+    print_progress('PGO: training run')
+    workload = bench_workload(options, iotjs)
+    if not workload:
+        ex.fail('The --pgo workload is empty')
+    with trace.phase('pgo training'):
+        run_workload(iotjs, workload)
+    if not has_profiles(options.build_root):
+        ex.fail('No profile was written by the training run, --pgo requires '
+                'GCC')
+
+    # Code which was not run by the workload is optimized as usual.
+    build_step('optimized build',
+               ['-fprofile-use', '-fprofile-correction',
+                '-Wno-missing-profile'],
+               ['-fprofile-use'])
+
+    print_progress('PGO: measure the workload')
+    # Only the files which pass with the baseline are compared.
+    passed = [returncode == 0
+              for returncode, _ in run_workload(baseline, workload)]
+    timings = {}
+    for binary in [baseline, iotjs]:
+        timings[binary] = time_workload(binary, workload, passed,
+                                        options.bench_rounds)
+
+    print('| {0:<10} | {1:>8} |'.format('Build', 'Time (s)'))
+    print('| {0} | {1} |'.format('-' * 10, '-' * 8))
+    print('| {0:<10} | {1:>8.2f} |'.format('baseline', timings[baseline]))
+    print('| {0:<10} | {1:>8.2f} |'.format('pgo', timings[iotjs]))
+    if timings[iotjs]:
+        print('\nSpeedup of %d workload file(s): %.2fx'
+              % (sum(passed), timings[baseline] / timings[iotjs]))
+
+
+def binary_sizes(binary):
+    """ The .text, .data and .bss size of the binary or None. """
+    output = ex.run_cmd_output('size', [binary], quiet=True)
+    try:
+        # Berkeley format: text data bss dec hex filename
+        return [int(size)
+                for size in output.decode('utf-8').splitlines()[1].split()[:3]]
+    except (IndexError, ValueError):
+        return None
+
+
+def run_opt_matrix(options, args):
+    """ Build the --opt-level variants concurrently and print a table of
+        their size, startup time and workload runtime.
+    """
+    matrix = collections.OrderedDict(
+        (level, ['--opt-level=%s' % level]) for level in OPT_LEVELS)
+    run_matrix(options, args, matrix)
+
+    binaries = collections.OrderedDict(
+        (level, fs.join(path.PROJECT_ROOT, options.builddir, level,
+                        options.target_tuple, options.buildtype, 'bin',
+                        'iotjs'))
+        for level in OPT_LEVELS)
+    results = collections.OrderedDict(
+        (level, binary_sizes(binary)) for level, binary in binaries.items())
+
+    timings = {}
+    if runs_on_host(options) and not options.buildlib:
+        print_progress('Measure the variants')
+        startup_dir = fs.join(path.PROJECT_ROOT, options.builddir)
+        startup = [(startup_dir, fs.join(startup_dir, 'startup.js'))]
+        with open(startup[0][1], 'w') as startup_file:
+            startup_file.write('\n')
+
+        workload = bench_workload(options, list(binaries.values())[0])
+        # Only the files which pass with every variant are compared.
+        passed = [True] * len(workload)
+        for binary in binaries.values():
+            passed = [ok and returncode == 0 for ok, (returncode, _)
+                      in zip(passed, run_workload(binary, workload))]
+        for level, binary in binaries.items():
+            timings[level] = (
+                time_workload(binary, startup, [True], options.bench_rounds),
+                time_workload(binary, workload, passed, options.bench_rounds))
+        fs.remove(startup[0][1])
+
+    print('\n| {0:<7} | {1:>9} | {2:>7} | {3:>7} | {4:>12} | {5:>12} |'
+          .format('Variant', '.text', '.data', '.bss', 'Startup (ms)',
+                  'Workload (s)'))
+    print('| {0} | {1} | {2} | {3} | {4} | {5} |'.format(
+          '-' * 7, '-' * 9, '-' * 7, '-' * 7, '-' * 12, '-' * 12))
+    for level, sizes in results.items():
+        sizes = sizes or ['-'] * 3
+        if level in timings:
+            startup_time = '%.1f' % (timings[level][0] * 1000)
+            workload_time = '%.2f' % timings[level][1]
+        else:
+            startup_time = workload_time = '-'
+        print('| {0:<7} | {1:>9} | {2:>7} | {3:>7} | {4:>12} | {5:>12} |'
+              .format(level, sizes[0], sizes[1], sizes[2], startup_time,
+                      workload_time))
 
 
 def run_checktest(options):
@@ -395,18 +1223,33 @@ def run_checktest(options):
     iotjs = fs.join(options.build_root, 'bin', 'iotjs')
 
     cmd = fs.join(path.TOOLS_ROOT, 'testrunner.py')
-    args = [iotjs, "--platform=%s" % options.target_os]
+    args = [iotjs, "--platform=%s" % options.target_os,
+            "--jobs=%d" % options.jobs]
 
     if options.run_test == "quiet":
         args.append('--quiet')
 
+    # --jerry-memstat
+    if options.jerry_memstat:
+        args.append('--mem-stats')
+
+    # The history is shared by the configurations of the build directory
+    # and survives --clean.
+    args.append('--history=%s' % fs.join(path.PROJECT_ROOT, options.builddir,
+                                         'test_history.db'))
+
+    def results_args(name):
+        return ['--json-output=%s.json' % fs.join(options.build_root, name),
+                '--junit-output=%s.xml' % fs.join(options.build_root, name)]
+
     fs.chdir(path.PROJECT_ROOT)
-    code = ex.run_cmd(cmd, args)
+    code = ex.run_cmd(cmd, args + results_args('test_results'))
     if code != 0:
         ex.fail('Failed to pass unit tests')
 
     if not options.no_check_valgrind:
-        code = ex.run_cmd(cmd, ['--valgrind'] + args)
+        code = ex.run_cmd(cmd, ['--valgrind'] + args +
+                          results_args('test_results_valgrind'))
         if code != 0:
             ex.fail('Failed to pass unit tests in valgrind environment')
 
@@ -416,21 +1259,44 @@ if __name__ == '__main__':
     options = init_options()
     adjust_options(options)
 
+    if options.matrix or options.opt_matrix:
+        if not options.no_init_submodule:
+            print_progress('Initialize submodule')
+            init_submodule()
+        if options.opt_matrix:
+            run_opt_matrix(options, sys.argv[1:])
+        else:
+            run_matrix(options, sys.argv[1:])
+        Terminal.pprint("\nIoT.js Build Succeeded!!\n", Terminal.green)
+        sys.exit(0)
+
+    trace = BuildTrace()
+
     if options.clean:
         print_progress('Clear build directories')
         test_build_root = fs.join(path.TEST_ROOT,
                                   'dynamicmodule',
                                   'build',
                                   options.target_os)
-        fs.rmtree(test_build_root)
-        fs.rmtree(options.build_root)
+        with trace.phase('clean'):
+            fs.rmtree(test_build_root)
+            fs.rmtree(options.build_root)
 
     # Perform init-submodule.
     if not options.no_init_submodule:
         print_progress('Initialize submodule')
-        init_submodule()
+        with trace.phase('init submodule'):
+            init_submodule()
 
-    build_iotjs(options)
+    trace_dir = start_build_trace(options)
+    if options.pgo:
+        build_pgo(options, trace)
+    else:
+        build_iotjs(options, trace)
+    if options.build_trace:
+        write_build_trace(options, trace, trace_dir)
+    if options.size_report:
+        run_size_report(options)
 
     Terminal.pprint("\nIoT.js Build Succeeded!!\n", Terminal.green)
 
@@ -439,11 +1305,7 @@ if __name__ == '__main__':
         print_progress('Run tests')
         if options.buildlib:
             print("Skip unit tests - build target is library\n")
-        elif (options.host_tuple == options.target_tuple or
-              (options.host_tuple == 'x86_64-linux' and
-               options.target_tuple == 'i686-linux') or
-              (options.host_tuple == 'x86_64-linux' and
-               options.target_tuple == 'x86_64-mock')):
+        elif runs_on_host(options):
              run_checktest(options)
         else:
             print("Skip unit tests - target-host pair is not allowed\n")
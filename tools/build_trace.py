@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Build time tracing of tools/build.py --build-trace.
+#
+#  CMake runs the compile, link and custom commands (js2c, the build steps
+# of the dependencies) through this script as a launcher:
+#
+#   build_trace.py <command> <arguments>...
+#
+# The command is run and its wall-clock and CPU time is appended to the
+# events file of the directory given by the IOTJS_BUILD_TRACE_DIR
+# environment variable. Without the variable the command is only run.
+# build.py merges the events with its own phases into a chrome://tracing
+# JSON file and a text summary.
+
+from __future__ import print_function
+
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+TRACE_DIR_ENV = 'IOTJS_BUILD_TRACE_DIR'
+EVENTS_FILE = 'events.jsonl'
+
+SOURCE_EXTENSIONS = ('.c', '.cc', '.cpp', '.S', '.s')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _children_cpu_time():
+    # Only used by the launcher, which does not run on Windows.
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def describe_command(cmd, build_root):
+    """ Return the category and the name of a launched command. """
+    if '-c' in cmd:
+        sources = [arg for arg in cmd if arg.endswith(SOURCE_EXTENSIONS)]
+        if sources:
+            return 'compile', os.path.relpath(os.path.abspath(sources[-1]),
+                                              PROJECT_ROOT)
+
+    program = os.path.basename(cmd[0])
+    archives = [arg for arg in cmd[1:] if arg.endswith('.a')]
+    if program.endswith(('ar', 'ranlib')) and archives:
+        output = archives[0]
+    elif '-o' in cmd[:-1] and not program.startswith('python'):
+        output = cmd[cmd.index('-o') + 1]
+    else:
+        output = None
+    if output:
+        return 'link', os.path.relpath(os.path.abspath(output), build_root)
+
+    scripts = [os.path.basename(arg) for arg in cmd if arg.endswith('.py')]
+    if scripts:
+        name = scripts[0]
+    elif len(cmd) > 2 and cmd[1] == '-E':
+        # The bookkeeping steps of CMake, like the stamps of the
+        # dependencies.
+        name = ' '.join([program] + cmd[1:3])
+    else:
+        name = program
+    return 'custom', '%s (%s)' % (name, os.path.relpath(os.getcwd(),
+                                                        build_root))
+
+
+def component(event):
+    """ The part of the build an event belongs to: the dependency whose
+        build directory it ran in or iotjs.
+    """
+    parts = event['dir'].split(os.sep)
+    if len(parts) >= 2 and parts[0] == 'deps':
+        return parts[1]
+    return 'iotjs'
+
+
+def launch(cmd):
+    """ Run the command and record it if tracing is enabled. """
+    trace_dir = os.environ.get(TRACE_DIR_ENV)
+    if not trace_dir:
+        return subprocess.call(cmd, close_fds=False)
+
+    start = time.time()
+    cpu_start = _children_cpu_time()
+    # The file descriptors are kept, a launched sub-make needs the
+    # jobserver pipe.
+    returncode = subprocess.call(cmd, close_fds=False)
+    end = time.time()
+
+    build_root = os.path.dirname(trace_dir)
+    category, name = describe_command(cmd, build_root)
+    event = {
+        'cat': category,
+        'name': name,
+        'dir': os.path.relpath(os.getcwd(), build_root),
+        'start': start,
+        'dur': end - start,
+        'cpu': _children_cpu_time() - cpu_start,
+        'status': returncode,
+    }
+    # A single small append is not interleaved with the concurrent ones.
+    fd = os.open(os.path.join(trace_dir, EVENTS_FILE),
+                 os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (json.dumps(event) + '\n').encode('utf-8'))
+    finally:
+        os.close(fd)
+    return returncode
+
+
+def read_events(trace_dir):
+    events_path = os.path.join(trace_dir, EVENTS_FILE)
+    if not os.path.exists(events_path):
+        return []
+    with open(events_path, 'r') as events_file:
+        return [json.loads(line) for line in events_file if line.strip()]
+
+
+class BuildTrace(object):
+    """ The phases of a build.py run, measured with phase(). """
+
+    def __init__(self):
+        self.phases = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.time()
+        times = os.times()
+        try:
+            yield
+        finally:
+            end_times = os.times()
+            cpu = sum(end_times[:4]) - sum(times[:4])
+            self.phases.append({
+                'cat': 'phase',
+                'name': name,
+                'start': start,
+                'dur': time.time() - start,
+                'cpu': cpu,
+            })
+
+    def write(self, trace_dir, json_path, summary_path):
+        """ Write the phases and the launched commands recorded in the
+            trace directory as a chrome://tracing file and a text summary.
+        """
+        events = read_events(trace_dir)
+        write_chrome_trace(self.phases, events, json_path)
+        with open(summary_path, 'w') as summary_file:
+            summary_file.write(format_summary(self.phases, events))
+
+
+def _assign_lanes(events):
+    """ Pack the overlapping commands into as few lanes as possible, the
+        lanes are shown as threads by chrome://tracing.
+    """
+    lane_ends = []
+    lanes = []
+    for event in sorted(events, key=lambda e: e['start']):
+        for lane, end in enumerate(lane_ends):
+            if end <= event['start']:
+                break
+        else:
+            lane = len(lane_ends)
+            lane_ends.append(0)
+        lane_ends[lane] = event['start'] + event['dur']
+        lanes.append((lane + 1, event))
+    return lanes
+
+
+def write_chrome_trace(phases, events, json_path):
+    if not phases and not events:
+        return
+    origin = min(e['start'] for e in phases + events)
+
+    def trace_event(event, tid):
+        args = {'cpu (s)': round(event['cpu'], 3)}
+        if 'dir' in event:
+            args['dir'] = event['dir']
+        return {
+            'name': event['name'],
+            'cat': event['cat'],
+            'ph': 'X',
+            'pid': 1,
+            'tid': tid,
+            'ts': int((event['start'] - origin) * 1e6),
+            'dur': int(event['dur'] * 1e6),
+            'args': args,
+        }
+
+    trace_events = [trace_event(phase, 0) for phase in phases]
+    lanes = _assign_lanes(events)
+    trace_events.extend(trace_event(event, lane) for lane, event in lanes)
+    trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1,
+                         'tid': 0, 'args': {'name': 'build.py'}})
+    for lane in sorted(set(lane for lane, _ in lanes)):
+        trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1,
+                             'tid': lane, 'args': {'name': 'job %d' % lane}})
+
+    with open(json_path, 'w') as json_file:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'},
+                  json_file)
+
+
+def _table(title, rows, headers):
+    lines = [title, '']
+    widths = [max([len(headers[idx])] + [len(row[idx]) for row in rows])
+              for idx in range(len(headers))]
+    line_format = '  '.join('{%d:<%d}' % (idx, width) if idx == 0 else
+                            '{%d:>%d}' % (idx, width)
+                            for idx, width in enumerate(widths))
+    lines.append(line_format.format(*headers))
+    lines.extend(line_format.format(*row) for row in rows)
+    lines.append('')
+    return lines
+
+
+def format_summary(phases, events, limit=30):
+    lines = _table('Phases', [
+        (phase['name'], '%.2f' % phase['dur'], '%.2f' % phase['cpu'])
+        for phase in phases], ('Phase', 'Wall (s)', 'CPU (s)'))
+
+    components = {}
+    for event in events:
+        key = (component(event), event['cat'])
+        count, dur, cpu = components.get(key, (0, 0.0, 0.0))
+        components[key] = (count + 1, dur + event['dur'], cpu + event['cpu'])
+    lines.extend(_table('Commands by component', [
+        (name, cat, str(count), '%.2f' % dur, '%.2f' % cpu)
+        for (name, cat), (count, dur, cpu) in sorted(
+            components.items(), key=lambda item: -item[1][1])],
+        ('Component', 'Kind', 'Count', 'Wall (s)', 'CPU (s)')))
+
+    slowest = sorted(events, key=lambda e: -e['dur'])[:limit]
+    lines.extend(_table('Slowest commands', [
+        (event['name'], event['cat'], '%.2f' % event['dur'],
+         '%.2f' % event['cpu']) for event in slowest],
+        ('Command', 'Kind', 'Wall (s)', 'CPU (s)')))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('usage: %s <command> [<arguments>...]' % sys.argv[0])
+        sys.exit(1)
+    sys.exit(launch(sys.argv[1:]))
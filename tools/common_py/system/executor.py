@@ -60,11 +60,14 @@ class Executor(object):
         exit(1)
 
     @staticmethod
-    def run_cmd(cmd, args=[], quiet=False):
+    def run_cmd(cmd, args=[], quiet=False, keep_fds=False):
         if not quiet:
             Executor.print_cmd_line(cmd, args)
+        # keep_fds: inherit the open file descriptors (e.g. the pipe of a
+        # make jobserver).
+        kwargs = {'close_fds': False} if keep_fds else {}
         try:
-            return subprocess.call([cmd] + args)
+            return subprocess.call([cmd] + args, **kwargs)
         except OSError as e:
             Executor.fail("[Failed - %s] %s" % (cmd, e.strerror))
 
@@ -90,8 +93,8 @@ class Executor(object):
             Executor.fail("[Failed - %s] %s" % (cmd, e.strerror))
 
     @staticmethod
-    def check_run_cmd(cmd, args=[], quiet=False):
-        retcode = Executor.run_cmd(cmd, args, quiet)
+    def check_run_cmd(cmd, args=[], quiet=False, keep_fds=False):
+        retcode = Executor.run_cmd(cmd, args, quiet, keep_fds)
         if retcode != 0:
             Executor.fail("[Failed - %d] %s" % (retcode,
                                                 Executor.cmd_line(cmd, args)))
@@ -14,17 +14,34 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-#  This file converts src/js/*.js to a C-array in src/iotjs_js.[h|c] file.
-# And this file also generates magic string list in src/iotjs_string_ext.inl.h
-# file to reduce JerryScript heap usage.
+#  This file converts src/js/*.js to a C-array in iotjs_js.[h|c] file.
+# And this file also generates magic string list in iotjs_string_ext.inl.h
+# file to reduce JerryScript heap usage. The files are written into the
+# directory given by --output-dir (the generated/ directory of the build).
 
+import hashlib
+import multiprocessing
 import os
 import re
 import subprocess
 import struct
+import tempfile
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 
 from common_py.system.filesystem import FileSystem as fs
 from common_py import path
+from js_minifier import minify, MinifyError
+from magic_strings import select_magic_strings, write_report
+from js2c_report import Report
+from require_graph import app_bundle, shake_modules, RequireError
 
 
 def normalize_str(text):
@@ -38,23 +55,6 @@ def regroup(l, n):
     return [l[i:i+n] for i in range(0, len(l), n)]
 
 
-def remove_comments(code):
-    pattern = r'(\".*?\"|\'.*?\')|(/\*.*?\*/|//[^\r\n]*$)'
-    regex = re.compile(pattern, re.MULTILINE | re.DOTALL)
-
-    def _replacer(match):
-        if match.group(2) is not None:
-            return ""
-        else:
-            return match.group(1)
-
-    return regex.sub(_replacer, code)
-
-
-def remove_whitespaces(code):
-    return re.sub('\n+', '\n', re.sub('\n +', '\n', code))
-
-
 LICENSE = '''
 /* Copyright 2015-present Samsung Electronics Co., Ltd. and other contributors
  *
@@ -127,6 +127,37 @@ const uint8_t {NAME}_s[] = {{
 }};
 '''
 
+# The blob is linked in by the assembler instead of being parsed by the
+# C compiler as a hex array. The sha1 makes sure that the object file is
+# rebuilt (and not taken from a compiler cache) when the blob changes.
+MODULE_VARIABLES_BLOB_C = '''
+#define SIZE_{NAME_UPPER} {SIZE}
+const size_t {NAME}_l = SIZE_{NAME_UPPER};
+const char {NAME}_n[] = "{NAME}";
+
+/* {NAME}_s: {BLOB_NAME} (sha1: {SHA1}) */
+#define BLOB_STR_(x) #x
+#define BLOB_STR(x) BLOB_STR_(x)
+#define BLOB_SYM BLOB_STR(__USER_LABEL_PREFIX__) "{NAME}_s"
+#if defined(__APPLE__)
+__asm__(".section __TEXT,__const\\n"
+        ".globl " BLOB_SYM "\\n"
+        ".p2align 4\\n"
+        BLOB_SYM ":\\n"
+        ".incbin \\"{BLOB_PATH}\\"\\n"
+        ".text\\n");
+#else
+__asm__(".pushsection .rodata\\n"
+        ".globl " BLOB_SYM "\\n"
+        ".type " BLOB_SYM ", %object\\n"
+        ".size " BLOB_SYM ", {SIZE}\\n"
+        ".balign 16\\n"
+        BLOB_SYM ":\\n"
+        ".incbin \\"{BLOB_PATH}\\"\\n"
+        ".popsection\\n");
+#endif
+'''
+
 NATIVE_STRUCT_H = '''
 typedef struct {
   const char* name;
@@ -137,12 +168,41 @@ typedef struct {
 extern const iotjs_js_module_t js_modules[];
 '''
 
+MODULE_SIZE_C = '''#define SIZE_{NAME_UPPER} {SIZE}
+'''
+
 NATIVE_STRUCT_C = '''
 const iotjs_js_module_t js_modules[] = {{
 {MODULES}
 }};
 '''
 
+# Number of the entries of the tables, both are sorted by name so that the
+# runtime can look up the modules with a binary search.
+TABLE_COUNT_H = '''
+#define JS_MODULES_COUNT {COUNT}
+#define JS_APP_MODULES_COUNT {APP_COUNT}
+'''
+
+# Application files embedded into the snapshot. Directories which resolve
+# to an embedded file (package.json main or index.js) have an entry too,
+# the file points to the loaded file then.
+APP_STRUCT_H = '''
+typedef struct {
+  const char* path;
+  const char* file;
+  const uint32_t idx;
+} iotjs_js_app_module_t;
+
+extern const iotjs_js_app_module_t js_app_modules[];
+'''
+
+APP_STRUCT_C = '''
+const iotjs_js_app_module_t js_app_modules[] = {{
+{MODULES}
+}};
+'''
+
 
 def hex_format(ch):
     if isinstance(ch, str):
@@ -162,8 +222,112 @@ def format_code(code, indent):
     return "\n".join(lines)
 
 
-def merge_snapshots(snapshot_infos, snapshot_tool):
-    output_path = fs.join(path.SRC_ROOT, 'js','merged.modules')
+def write_if_changed(file_path, content):
+    """ Write the content (text or bytes) into the given file unless the
+        file already has the same content. Keeping the timestamp of an
+        unchanged file prevents needless recompilation.
+    """
+    mode = 'b' if isinstance(content, bytes) else ''
+    if fs.isfile(file_path):
+        with open(file_path, 'r' + mode) as fin:
+            if fin.read() == content:
+                return False
+
+    with open(file_path, 'w' + mode) as fout:
+        fout.write(content)
+
+    return True
+
+
+def c_string(text):
+    """ Escape the text for a C string literal (without the quotes). """
+    text = repr(text)
+    # Strip the quotes (and the u prefix of python2)
+    text = text[text.index(text[-1]) + 1:-1]
+    return text.replace('"', '\\"')
+
+
+def format_blob(name, code, blob_path, blob_base=None):
+    """ Write the code into the given binary file and return the C code
+        which links it in as the {name}_s array. The file is referenced
+        relative to blob_base (the working directory of the compiler) if
+        given, so the C code does not depend on the build directory.
+    """
+    write_if_changed(blob_path, code)
+    if blob_base:
+        blob_path = os.path.relpath(blob_path, blob_base)
+
+    return MODULE_VARIABLES_BLOB_C.format(NAME=name,
+                                          NAME_UPPER=name.upper(),
+                                          SIZE=len(code),
+                                          BLOB_NAME=fs.basename(blob_path),
+                                          BLOB_PATH=blob_path.replace('\\',
+                                                                      '/'),
+                                          SHA1=hashlib.sha1(code).hexdigest())
+
+
+def measure_command(cmd):
+    """ Run the command and return its exit code, wall time (seconds)
+        and peak resident set size (as reported by the OS, KB on Linux).
+    """
+    start = time.time()
+    process = subprocess.Popen(cmd)
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = status
+    return status, time.time() - start, rusage.ru_maxrss
+
+
+def report_blob_savings(code, compiler):
+    """ Generate and compile the merged snapshot both as a hex array and
+        as a binary blob, then print what the blob mode saves.
+    """
+    if not hasattr(os, 'wait4'):
+        print('Blob savings report is not supported on this platform')
+        return
+
+    name = 'iotjs_js_modules'
+    header = '#include <stddef.h>\n#include <stdint.h>\n'
+    work_dir = tempfile.mkdtemp(prefix='js2c-')
+    results = {}
+    try:
+        for mode in ['hex', 'blob']:
+            source_path = fs.join(work_dir, '%s.c' % mode)
+            start = time.time()
+            if mode == 'hex':
+                content = MODULE_VARIABLES_C.format(NAME=name,
+                                                    NAME_UPPER=name.upper(),
+                                                    SIZE=len(code),
+                                                    CODE=format_code(code, 1))
+            else:
+                content = format_blob(name, code,
+                                      fs.join(work_dir, name + '.bin'))
+            with open(source_path, 'w') as fsource:
+                fsource.write(header + content)
+            gen_time = time.time() - start
+
+            ret, cc_time, cc_rss = measure_command([compiler, '-c',
+                '-o', source_path + '.o', source_path])
+            if ret != 0:
+                print('Failed to compile the %s variant with %s'
+                      % (mode, compiler))
+                return
+            results[mode] = [gen_time, cc_time, cc_rss]
+    finally:
+        fs.rmtree(work_dir)
+
+    print('Blob mode savings (%d bytes of snapshot, compiler: %s):'
+          % (len(code), compiler))
+    print('  %-18s %12s %12s %12s' % ('', 'hex array', 'blob', 'saved'))
+    for idx, label in enumerate(['js2c time (s)', 'cc time (s)',
+                                 'cc peak RSS (KB)']):
+        hex_value, blob_value = results['hex'][idx], results['blob'][idx]
+        fmt = '  %-18s %12.2f %12.2f %12.2f' if idx < 2 else \
+              '  %-18s %12d %12d %12d'
+        print(fmt % (label, hex_value, blob_value, hex_value - blob_value))
+
+
+def merge_snapshots(snapshot_infos, snapshot_tool, work_dir):
+    output_path = fs.join(work_dir, 'merged.modules')
     cmd = [snapshot_tool, "merge", "-o", output_path]
     cmd.extend([item['path'] for item in snapshot_infos])
 
@@ -184,22 +348,88 @@ def merge_snapshots(snapshot_infos, snapshot_tool):
     return code
 
 
-def get_snapshot_contents(js_path, snapshot_tool, literals=None):
-    """ Convert the given module with the snapshot generator
-        and return the resulting bytes.
+def sha1_of_file(file_path):
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(65536), b''):
+            sha1.update(chunk)
+
+    return sha1.hexdigest()
+
+
+class SnapshotCache(object):
+    """ Persistent content-addressed store of generated snapshots.
+
+        The key of an entry covers everything the snapshot tool output
+        depends on: the snapshot tool binary, the wrapped module source
+        and the literal list used for static snapshots.
+    """
+    def __init__(self, cache_dir, snapshot_tool):
+        self.cache_dir = cache_dir
+        self.tool_hash = sha1_of_file(snapshot_tool)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        fs.maybe_make_directory(cache_dir)
+
+    def key(self, wrapped_code, literals=None):
+        sha1 = hashlib.sha1()
+        sha1.update(self.tool_hash.encode('utf-8'))
+        if not isinstance(wrapped_code, bytes):
+            wrapped_code = wrapped_code.encode('utf-8')
+        sha1.update(wrapped_code)
+        if literals:
+            sha1.update(b'static:')
+            sha1.update(sha1_of_file(literals).encode('utf-8'))
+
+        return sha1.hexdigest()
+
+    def load(self, key, snapshot_path):
+        entry_path = fs.join(self.cache_dir, key + '.snapshot')
+        hit = fs.exists(entry_path)
+        if hit:
+            fs.copyfile(entry_path, snapshot_path)
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return hit
+
+    def store(self, key, snapshot_path):
+        entry_path = fs.join(self.cache_dir, key + '.snapshot')
+        # Write to a private file first so that concurrent builds never
+        # see a partially written entry.
+        temp_path = '%s.%d.%d' % (entry_path, os.getpid(),
+                                  threading.current_thread().ident)
+        fs.copyfile(snapshot_path, temp_path)
+        os.rename(temp_path, entry_path)
+
+
+def get_snapshot_contents(js_path, code, snapshot_tool, literals=None,
+                          cache=None):
+    """ Convert the given module code with the snapshot generator
+        and return the path of the resulting snapshot.
     """
     wrapped_path = js_path + ".wrapped"
     snapshot_path = js_path + ".snapshot"
     module_name = os.path.splitext(os.path.basename(js_path))[0]
 
-    with open(wrapped_path, 'w') as fwrapped, open(js_path, "r") as fmodule:
-        if module_name != "iotjs":
-            fwrapped.write("(function(exports, require, module, native) {\n")
+    wrapped_code = code
+    if module_name != "iotjs":
+        wrapped_code = ("(function(exports, require, module, native) {\n" +
+                        wrapped_code + "});\n")
+
+    if cache:
+        cache_key = cache.key(wrapped_code, literals)
+        if cache.load(cache_key, snapshot_path):
+            return snapshot_path
 
-        fwrapped.write(fmodule.read())
+    with open(wrapped_path, 'w') as fwrapped:
+        fwrapped.write(wrapped_code)
 
-        if module_name != "iotjs":
-            fwrapped.write("});\n")
     cmd = [snapshot_tool, "generate", "-o", snapshot_path]
     if literals:
         cmd.extend(["--static", "--load-literals-list-format", literals])
@@ -214,24 +444,78 @@ def get_snapshot_contents(js_path, snapshot_tool, literals=None):
         else:
             print("Unable to create static snapshot from '%s'. Falling back "
                   "to normal snapshot." % js_path)
+    elif cache:
+        cache.store(cache_key, snapshot_path)
 
     return snapshot_path
 
 
-def get_js_contents(js_path, is_debug_mode=False):
+def _snapshot_worker(args):
+    # A failing first phase calls exit(), which would silently kill the
+    # pool thread and leave map() waiting forever. Report it instead.
+    try:
+        return get_snapshot_contents(*args)
+    except SystemExit:
+        return None
+
+
+def generate_snapshots(js_paths, js_codes, snapshot_tool, literals=None,
+                       jobs=1, cache=None):
+    """ Run get_snapshot_contents on every given module using at most
+        `jobs` parallel snapshot tool processes. The returned snapshot
+        paths keep the order of the input list.
+    """
+    args = [(js_path, code, snapshot_tool, literals, cache)
+            for js_path, code in zip(js_paths, js_codes)]
+    jobs = min(jobs, len(args))
+    if jobs <= 1:
+        return [get_snapshot_contents(*arg) for arg in args]
+
+    # The work is done by external processes, so threads are enough here.
+    pool = ThreadPool(jobs)
+    try:
+        snapshot_paths = pool.map(_snapshot_worker, args)
+    finally:
+        pool.close()
+        pool.join()
+
+    if None in snapshot_paths:
+        exit(1)
+
+    return snapshot_paths
+
+
+def get_js_contents(js_path, is_debug_mode=False, wrapped=True):
     """ Read the contents of the given js module. """
     with open(js_path, "r") as f:
          code = f.read()
 
     # minimize code when in release mode
     if not is_debug_mode:
-        code = remove_comments(code)
-        code = remove_whitespaces(code)
+        try:
+            code = minify(code, wrapped)
+        except MinifyError as e:
+            print("Unable to minify '%s' (%s). Using the original source."
+                  % (js_path, e))
     return code
 
 
-def get_literals_from_snapshots(snapshot_tool, snapshot_list):
-    literals_path = fs.join(path.SRC_ROOT, 'js', 'literals.list')
+def print_minify_table(sizes):
+    """ Print the original and the minified size of the modules. """
+    print('%-32s %10s %10s %7s' % ('Module', 'Original', 'Minified', 'Ratio'))
+    total_original = total_minified = 0
+    for name, original, minified in sizes:
+        total_original += original
+        total_minified += minified
+        print('%-32s %10d %10d %6.1f%%'
+              % (name, original, minified, 100.0 * minified / max(original, 1)))
+    print('%-32s %10d %10d %6.1f%%'
+          % ('Total', total_original, total_minified,
+             100.0 * total_minified / max(total_original, 1)))
+
+
+def get_literals_from_snapshots(snapshot_tool, snapshot_list, work_dir):
+    literals_path = fs.join(work_dir, 'literals.list')
     cmd = [snapshot_tool, "litdump", "-o", literals_path]
     cmd.extend(snapshot_list)
 
@@ -245,6 +529,39 @@ def get_literals_from_snapshots(snapshot_tool, snapshot_list):
     return literals_path
 
 
+def _litdump_worker(args):
+    snapshot_tool, snapshot_path = args
+    literals_path = snapshot_path + '.literals'
+    cmd = [snapshot_tool, "litdump", "-o", literals_path, snapshot_path]
+    if subprocess.call(cmd) != 0:
+        return None
+
+    literals = read_literals(literals_path)
+    fs.remove(literals_path)
+    return literals
+
+
+def get_module_literals(snapshot_tool, snapshot_list, jobs=1):
+    """ Dump the literals of every snapshot separately. The returned sets
+        keep the order of the input list.
+    """
+    args = [(snapshot_tool, snapshot_path) for snapshot_path in snapshot_list]
+    pool = ThreadPool(max(1, jobs))
+    try:
+        module_literals = pool.map(_litdump_worker, args)
+    finally:
+        pool.close()
+        pool.join()
+
+    for snapshot_path, literals in zip(snapshot_list, module_literals):
+        if literals is None:
+            msg = "Failed to dump the literals of %s" % snapshot_path
+            print("%s%s%s" % ("\033[1;31m", msg, "\033[0m"))
+            exit(1)
+
+    return module_literals
+
+
 def read_literals(literals_path):
     literals_set = set()
     with open(literals_path, 'rb') as fin:
@@ -271,124 +588,284 @@ def write_literals_to_file(literals_set, literals_path):
             flit.write(entry.encode('utf-8'))
 
 
+def module_name(module):
+    return module.split('=', 1)[0]
+
+
 def js2c(options, js_modules):
     is_debug_mode = (options.buildtype == "debug")
     snapshot_tool = options.snapshot_tool
     no_snapshot = (snapshot_tool == None)
     verbose = options.verbose
+    jobs = options.jobs
+    output_dir = options.output_dir
+    work_dir = fs.join(output_dir, 'js')
+    fs.maybe_make_directory(work_dir)
     magic_string_set = set()
+    select_strings = (options.magic_string_budget is not None or
+                      options.magic_string_report)
+    report = None
+    if options.report:
+        report = Report(options.buildtype, not no_snapshot)
+    cache = None
+    if not no_snapshot and options.snapshot_cache:
+        cache = SnapshotCache(options.snapshot_cache, snapshot_tool)
 
     str_const_regex = re.compile('^#define IOTJS_MAGIC_STRING_\w+\s+"(\w+)"$')
-    with open(fs.join(path.SRC_ROOT, 'iotjs_magic_strings.in'), 'r') as fin_h:
+    with open(fs.join(output_dir, 'iotjs_magic_strings.in'), 'r') as fin_h:
         for line in fin_h:
             result = str_const_regex.search(line)
             if result:
                 magic_string_set.add(result.group(1))
 
     # generate the code for the modules
-    with open(fs.join(path.SRC_ROOT, 'iotjs_js.h'), 'w') as fout_h, \
-         open(fs.join(path.SRC_ROOT, 'iotjs_js.c'), 'w') as fout_c:
+    fout_h = StringIO()
+    fout_c = StringIO()
+
+    fout_h.write(LICENSE)
+    fout_h.write(HEADER1)
+    fout_c.write(LICENSE)
+    fout_c.write(HEADER2)
+
+    snapshot_infos = []
+    js_module_names = []
+    minify_sizes = []
+    split_files = {}
+    app_struct = []
+    if no_snapshot:
+        for idx, module in enumerate(sorted(js_modules, key=module_name)):
+            [name, js_path] = module.split('=', 1)
+            js_module_names.append(name)
+            if verbose:
+                print('Processing module: %s' % name)
 
-        fout_h.write(LICENSE)
-        fout_h.write(HEADER1)
-        fout_c.write(LICENSE)
-        fout_c.write(HEADER2)
+            code = get_js_contents(js_path, is_debug_mode, name != 'iotjs')
+            minify_sizes.append((name, fs.getsize(js_path), len(code)))
+            if report:
+                report.add_module(name, fs.getsize(js_path), code)
+            code_string = format_code(code, 1)
 
-        snapshot_infos = []
-        js_module_names = []
-        if no_snapshot:
-            for idx, module in enumerate(sorted(js_modules)):
-                [name, js_path] = module.split('=', 1)
-                js_module_names.append(name)
-                if verbose:
-                    print('Processing module: %s' % name)
-
-                code = get_js_contents(js_path, is_debug_mode)
-                code_string = format_code(code, 1)
-
-                fout_h.write(MODULE_VARIABLES_H.format(NAME=name))
-                fout_c.write(MODULE_VARIABLES_C.format(NAME=name,
-                                                       NAME_UPPER=name.upper(),
-                                                       SIZE=len(code),
-                                                       CODE=code_string))
-            modules_struct = [
-               '  {{ {0}_n, {0}_s, SIZE_{1} }},'.format(name, name.upper())
-               for name in sorted(js_module_names)
-            ]
-            modules_struct.append('  { NULL, NULL, 0 }')
-            native_struct_h = NATIVE_STRUCT_H
-        else:
-            # Generate snapshot files from JS files
-            for idx, module in enumerate(sorted(js_modules)):
-                [name, js_path] = module.split('=', 1)
-                js_module_names.append(name)
-                if verbose:
-                    print('Processing (1st phase) module: %s' % name)
-                code_path = get_snapshot_contents(js_path, snapshot_tool)
-                info = {'name': name, 'path': code_path, 'idx': idx}
-                snapshot_infos.append(info)
-
-            # Get the literal list from the snapshots
+            module_c = MODULE_VARIABLES_C.format(NAME=name,
+                                                 NAME_UPPER=name.upper(),
+                                                 SIZE=len(code),
+                                                 CODE=code_string)
+            fout_h.write(MODULE_VARIABLES_H.format(NAME=name))
+            if options.split:
+                # The table below still needs the size as a constant.
+                fout_c.write(MODULE_SIZE_C.format(NAME_UPPER=name.upper(),
+                                                  SIZE=len(code)))
+                split_files['iotjs_js_%s.c' % name] = \
+                    LICENSE + HEADER2 + module_c
+            else:
+                fout_c.write(module_c)
+        modules_struct = [
+           '  {{ {0}_n, {0}_s, SIZE_{1} }},'.format(name, name.upper())
+           for name in sorted(js_module_names)
+        ]
+        modules_struct.append('  { NULL, NULL, 0 }')
+        native_struct_h = NATIVE_STRUCT_H
+    else:
+        # Generate snapshot files from JS files
+        js_paths = []
+        js_codes = []
+        for idx, module in enumerate(sorted(js_modules, key=module_name)):
+            [name, js_path] = module.split('=', 1)
+            js_module_names.append(name)
+            # The snapshots are generated in the work directory, so the
+            # builds of different configurations do not interfere.
+            js_paths.append(fs.join(work_dir, name + '.js'))
+            if verbose:
+                print('Processing (1st phase) module: %s' % name)
+
+            code = get_js_contents(js_path, is_debug_mode, name != 'iotjs')
+            minify_sizes.append((name, fs.getsize(js_path), len(code)))
+            if report:
+                report.add_module(name, fs.getsize(js_path), code)
+            js_codes.append(code)
+
+        # The application files are appended after the built-in modules,
+        # their snapshots are named after their index.
+        builtin_count = len(js_module_names)
+        app_files, app_directories = [], []
+        if options.bundle_app:
+            app_files, app_directories = app_bundle(options.bundle_app,
+                                                    options.app_entry,
+                                                    js_modules)
+        app_indices = {}
+        for key, file_path in app_files:
+            idx = len(js_module_names)
+            app_indices[key] = idx
+            js_module_names.append(key)
+            js_paths.append(fs.join(work_dir, 'app_%d.js' % idx))
             if verbose:
-                print('Creating literal list file for static snapshot '
-                      'creation')
+                print('Processing (1st phase) application file: %s' % key)
+
+            code = get_js_contents(file_path, is_debug_mode)
+            minify_sizes.append((key, fs.getsize(file_path), len(code)))
+            if report:
+                report.add_module(key, fs.getsize(file_path), code)
+            js_codes.append(code)
+
+        app_entries = [(key, key) for key in app_indices] + app_directories
+        for key, file_key in sorted(app_entries):
+            app_struct.append('  {{ "{0}", "{1}", {2} }},'.format(
+                c_string(key), c_string(file_key), app_indices[file_key]))
+
+        code_paths = generate_snapshots(js_paths, js_codes, snapshot_tool,
+                                        jobs=jobs, cache=cache)
+        for idx, name in enumerate(js_module_names):
+            info = {'name': name, 'path': code_paths[idx], 'idx': idx}
+            snapshot_infos.append(info)
+
+        # Get the literal list from the snapshots
+        if verbose:
+            print('Creating literal list file for static snapshot '
+                  'creation')
+        snapshot_paths = [info['path'] for info in snapshot_infos]
+        if select_strings or report:
+            module_literals = get_module_literals(snapshot_tool,
+                                                  snapshot_paths, jobs)
+        if select_strings:
+            # Select the magic strings based on the literals of the modules
+            selection = select_magic_strings(
+                magic_string_set,
+                dict(zip(js_module_names, module_literals)),
+                dict((name, fs.getsize(snapshot_path)) for name, snapshot_path
+                     in zip(js_module_names, snapshot_paths)),
+                options.magic_string_budget)
+            magic_string_set = selection.strings()
+            literals_path = fs.join(work_dir, 'literals.list')
+        elif report:
+            for literals in module_literals:
+                magic_string_set |= literals
+            literals_path = fs.join(work_dir, 'literals.list')
+        else:
             literals_path = get_literals_from_snapshots(snapshot_tool,
-                [info['path'] for info in snapshot_infos])
+                                                        snapshot_paths,
+                                                        work_dir)
             magic_string_set |= read_literals(literals_path)
-            # Update the literals list file
-            write_literals_to_file(magic_string_set, literals_path)
-
-            # Generate static-snapshots if possible
-            for idx, module in enumerate(sorted(js_modules)):
-                [name, js_path] = module.split('=', 1)
-                if verbose:
-                    print('Processing (2nd phase) module: %s' % name)
-
-                get_snapshot_contents(js_path, snapshot_tool, literals_path)
-
-                fout_h.write(MODULE_SNAPSHOT_VARIABLES_H.format(NAME=name))
-                fout_c.write(MODULE_SNAPSHOT_VARIABLES_C.format(NAME=name,
-                                                                IDX=idx))
-            fs.remove(literals_path)
-
-            # Merge the snapshot files
-            code = merge_snapshots(snapshot_infos, snapshot_tool)
+        # Update the literals list file
+        write_literals_to_file(magic_string_set, literals_path)
+
+        # Generate static-snapshots if possible
+        if verbose:
+            for name in js_module_names:
+                print('Processing (2nd phase) module: %s' % name)
+
+        generate_snapshots(js_paths, js_codes, snapshot_tool, literals_path,
+                           jobs, cache)
+
+        if report:
+            for idx, name in enumerate(js_module_names):
+                report.set_snapshot(name, fs.getsize(snapshot_paths[idx]),
+                                    module_literals[idx], magic_string_set)
+
+        for idx, name in enumerate(js_module_names[:builtin_count]):
+            fout_h.write(MODULE_SNAPSHOT_VARIABLES_H.format(NAME=name))
+            fout_c.write(MODULE_SNAPSHOT_VARIABLES_C.format(NAME=name,
+                                                            IDX=idx))
+        fs.remove(literals_path)
+
+        if cache and verbose:
+            print('Snapshot cache: %d hit(s), %d miss(es)'
+                  % (cache.hits, cache.misses))
+
+        # Merge the snapshot files
+        code = merge_snapshots(snapshot_infos, snapshot_tool, work_dir)
+
+        name = 'iotjs_js_modules'
+        fout_h.write(MODULE_VARIABLES_H.format(NAME=name))
+        if options.blob:
+            blob_path = fs.join(output_dir, name + '.bin')
+            fout_c.write(format_blob(name, code, blob_path,
+                                     options.blob_base))
+        else:
             code_string = format_code(code, 1)
-
-            name = 'iotjs_js_modules'
-            fout_h.write(MODULE_VARIABLES_H.format(NAME=name))
             fout_c.write(MODULE_VARIABLES_C.format(NAME=name,
                                                    NAME_UPPER=name.upper(),
                                                    SIZE=len(code),
                                                    CODE=code_string))
-            modules_struct = [
-                '  {{ module_{0}, MODULE_{0}_IDX }},'.format(info['name'])
-                for info in snapshot_infos
-            ]
-            modules_struct.append('  { NULL, 0 }')
-            native_struct_h = NATIVE_SNAPSHOT_STRUCT_H
 
-        fout_h.write(native_struct_h)
-        fout_h.write(FOOTER1)
+        if report:
+            report.embedded_bytes = len(code)
 
-        fout_c.write(NATIVE_STRUCT_C.format(MODULES="\n".join(modules_struct)))
-        fout_c.write(EMPTY_LINE)
+        if options.blob_report:
+            report_blob_savings(code, options.blob_report)
+        modules_struct = [
+            '  {{ module_{0}, MODULE_{0}_IDX }},'.format(info['name'])
+            for info in snapshot_infos[:builtin_count]
+        ]
+        modules_struct.append('  { NULL, 0 }')
+        native_struct_h = NATIVE_SNAPSHOT_STRUCT_H
 
-    # Write out the external magic strings
-    magic_str_path = fs.join(path.SRC_ROOT, 'iotjs_string_ext.inl.h')
-    with open(magic_str_path, 'w') as fout_magic_str:
-        fout_magic_str.write(LICENSE)
-        fout_magic_str.write(MAGIC_STRINGS_HEADER)
+    if verbose and not is_debug_mode:
+        print_minify_table(minify_sizes)
 
-        sorted_strings = sorted(magic_string_set, key=lambda x: (len(x), x))
-        for idx, magic_string in enumerate(sorted_strings):
-            magic_text = repr(magic_string)[1:-1]
-            magic_text = magic_text.replace('"', '\\"')
+    if select_strings:
+        if no_snapshot:
+            # Only the strings of the native code are registered
+            selection = select_magic_strings(magic_string_set, {}, {},
+                                             options.magic_string_budget)
+            magic_string_set = selection.strings()
+        if options.magic_string_report:
+            write_report(selection, options.magic_string_report)
+        if verbose:
+            print('Magic strings: %d selected, %d bytes of ROM'
+                  % (len(magic_string_set), selection.rom))
+
+    fout_h.write(native_struct_h)
+    fout_h.write(APP_STRUCT_H)
+    fout_h.write(TABLE_COUNT_H.format(COUNT=len(modules_struct) - 1,
+                                      APP_COUNT=len(app_struct)))
+    fout_h.write(FOOTER1)
+
+    fout_c.write(NATIVE_STRUCT_C.format(MODULES="\n".join(modules_struct)))
+    app_struct.append('  { NULL, NULL, 0 }')
+    fout_c.write(APP_STRUCT_C.format(MODULES="\n".join(app_struct)))
+    fout_c.write(EMPTY_LINE)
 
-            fout_magic_str.write('  MAGICSTR_EX_DEF(MAGIC_STR_%d, "%s") \\\n'
-                                 % (idx, magic_text))
-        # an empty line is required to avoid compile warning
-        fout_magic_str.write(EMPTY_LINE)
+    # Write out the external magic strings
+    fout_magic_str = StringIO()
+    fout_magic_str.write(LICENSE)
+    fout_magic_str.write(MAGIC_STRINGS_HEADER)
+
+    sorted_strings = sorted(magic_string_set, key=lambda x: (len(x), x))
+    for idx, magic_string in enumerate(sorted_strings):
+        fout_magic_str.write('  MAGICSTR_EX_DEF(MAGIC_STR_%d, "%s") \\\n'
+                             % (idx, c_string(magic_string)))
+    # an empty line is required to avoid compile warning
+    fout_magic_str.write(EMPTY_LINE)
+
+    if report:
+        report.set_magic_strings(magic_string_set)
+        report_path = (options.report_output or
+                       fs.join(output_dir, 'iotjs_js_report.json'))
+        with open(report_path, 'w') as freport:
+            freport.write(report.to_json())
+        if verbose:
+            print('Size report written to %s' % report_path)
+
+    # Only touch the files whose content has changed
+    generated = {
+        fs.join(output_dir, 'iotjs_js.h'): fout_h.getvalue(),
+        fs.join(output_dir, 'iotjs_js.c'): fout_c.getvalue(),
+        fs.join(output_dir, 'iotjs_string_ext.inl.h'):
+            fout_magic_str.getvalue(),
+    }
+
+    if options.split:
+        split_dir = fs.join(output_dir, 'iotjs_js')
+        fs.maybe_make_directory(split_dir)
+        # Remove the leftovers of the modules which are not built anymore
+        for file_name in fs.listdir(split_dir):
+            if file_name not in split_files:
+                fs.remove(fs.join(split_dir, file_name))
+        for file_name, content in split_files.items():
+            generated[fs.join(split_dir, file_name)] = content
+
+    for file_path in sorted(generated):
+        if write_if_changed(file_path, generated[file_path]) and verbose:
+            print('Updated %s' % file_path)
 
 
 if __name__ == "__main__":
@@ -405,6 +882,66 @@ if __name__ == "__main__":
         help='Executable to use for generating snapshots and merging them '
              '(ex.: the JerryScript snapshot tool). '
              'If not specified the JS files will be directly processed.')
+    parser.add_argument('--blob', action='store_true', default=False,
+        help='Emit the merged snapshot as a binary file '
+             '(iotjs_js_modules.bin in the output directory) which is '
+             'linked in with the assembler .incbin directive instead of a '
+             'hex C array. Requires a GNU compatible toolchain.')
+    parser.add_argument('--blob-base', default=None, metavar='DIR',
+        help='Working directory of the compiler of the generated C file. '
+             'The --blob file is referenced relative to it instead of by '
+             'its absolute path, so the C file is the same in every build '
+             'directory (and can be reused by a compiler cache).')
+    parser.add_argument('--blob-report', default=None, metavar='CC',
+        help='Compile the merged snapshot both as hex array and as blob '
+             'with the given C compiler and report the build time and '
+             'peak compiler memory saved by --blob.')
+    parser.add_argument('--split', action='store_true', default=False,
+        help='Write every module into its own C file under iotjs_js/ in '
+             'the output directory (no-snapshot mode only)')
+    parser.add_argument('--snapshot-cache', default=None, metavar='DIR',
+        help='Directory of the persistent snapshot cache. Snapshots of '
+             'unchanged modules are reused from here instead of being '
+             'regenerated. If not specified no cache is used.')
+    parser.add_argument('--magic-string-budget', type=int, default=None,
+        metavar='BYTES',
+        help='ROM budget of the external magic strings. The literals of '
+             'the modules are selected by their estimated heap saving per '
+             'ROM byte until the budget is used up. The strings of the '
+             'native code are always kept. (default: no limit)')
+    parser.add_argument('--magic-string-report', default=None,
+        metavar='FILE',
+        help='Write the magic string selection with the estimated costs '
+             'and the reason of every decision to the given file')
+    parser.add_argument('--report', choices=['json'], default=None,
+        help='Write a size report with the source, minified and snapshot '
+             'size and the literal breakdown of every module. Two reports '
+             'can be compared with tools/js2c_report.py.')
+    parser.add_argument('--report-output', default=None, metavar='FILE',
+        help='Path of the size report '
+             '(default: iotjs_js_report.json in the output directory)')
+    parser.add_argument('--app-entry', action='append', default=[],
+        metavar='FILE',
+        help='Entry point of the application. Only the modules reachable '
+             'through the require() calls of the application are '
+             'processed (can be given multiple times)')
+    parser.add_argument('--app-root', default=None, metavar='DIR',
+        help='Root directory of the application '
+             '(default: directory of the first entry point)')
+    parser.add_argument('--bundle-app', default=None, metavar='DIR',
+        help='Embed the JS files of the application in the given directory '
+             '(only the ones reachable from --app-entry if specified) into '
+             'the snapshot. At runtime the directory is mapped to the '
+             'working directory and require() finds the embedded files '
+             'before touching the file system. Requires --snapshot-tool.')
+    parser.add_argument('--output-dir', default=path.SRC_ROOT, metavar='DIR',
+        help='Directory of the generated files and of the intermediate '
+             'snapshots, iotjs_magic_strings.in is read from here too '
+             '(default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int,
+        default=multiprocessing.cpu_count(),
+        help='Number of snapshot tool processes to run in parallel '
+             '(default: %(default)s)')
     parser.add_argument('-v', '--verbose', default=False,
         help='Enable verbose output.')
 
@@ -415,5 +952,17 @@ if __name__ == "__main__":
     else:
         print('Using "%s" as snapshot tool' % options.snapshot_tool)
 
+    if options.bundle_app and not options.snapshot_tool:
+        print('--bundle-app requires the snapshot mode')
+        exit(1)
+
     modules = options.modules.split(',')
-    js2c(options, modules)
+    try:
+        if options.app_entry:
+            modules = shake_modules(modules, options.app_entry,
+                                    options.app_root or options.bundle_app,
+                                    options.verbose)
+        js2c(options, modules)
+    except RequireError as e:
+        print('Unable to parse the require() calls: %s' % e)
+        exit(1)
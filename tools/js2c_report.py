@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Size report of the JS modules embedded by tools/js2c.py.
+#
+#  js2c.py --report=json writes the source, minified and snapshot size and
+# the literal breakdown of every module. This script compares two such
+# reports and optionally fails if the embedded image grew too much:
+#
+#   js2c_report.py old.json new.json --max-growth=1024
+
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+from js_minifier import tokenize, KEYWORDS, MinifyError
+
+
+REPORT_VERSION = 1
+
+LITERAL_CATEGORIES = ['identifier', 'string', 'number', 'regex', 'template']
+
+TOKEN_CATEGORIES = {
+    'name': 'identifier',
+    'string': 'string',
+    'number': 'number',
+    'regex': 'regex',
+    'template': 'template',
+}
+
+
+def _utf8_size(text):
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return len(text)
+
+
+def literal_breakdown(code, literals=None):
+    """ Return the number of bytes of the distinct literals of the code
+        by category. String literals are counted without the quotes and
+        keywords are not literals. If the string literals of the snapshot
+        (the litdump of the module) are given, the breakdown covers those,
+        categorized by the token they come from (a string if unknown). The
+        numbers are not in the dump and are counted from the code.
+    """
+    if isinstance(code, bytes):
+        code = code.decode('utf-8')
+
+    breakdown = dict((category, 0) for category in LITERAL_CATEGORIES)
+    try:
+        tokens = tokenize(code)
+    except MinifyError:
+        tokens = []
+
+    categories = {}
+    seen = set()
+    for token in tokens:
+        category = TOKEN_CATEGORIES.get(token.type)
+        if not category or (category == 'identifier' and
+                            token.value in KEYWORDS):
+            continue
+        value = token.value
+        if category == 'string':
+            value = value[1:-1]
+        if category == 'regex':
+            # The snapshot keeps the pattern of a regular expression
+            categories.setdefault(value[1:value.rindex('/')], category)
+        else:
+            categories.setdefault(value, category)
+        if (category, value) in seen:
+            continue
+        seen.add((category, value))
+        if literals is None or category == 'number':
+            breakdown[category] += _utf8_size(value)
+
+    for literal in literals or []:
+        breakdown[categories.get(literal, 'string')] += _utf8_size(literal)
+
+    return breakdown
+
+
+class Report(object):
+    def __init__(self, buildtype, snapshot):
+        self.buildtype = buildtype
+        self.snapshot = snapshot
+        self.modules = {}
+        self.codes = {}
+        self.embedded_bytes = 0
+        self.magic_strings = {'count': 0, 'bytes': 0}
+
+    def add_module(self, name, source_bytes, code):
+        self.codes[name] = code
+        self.modules[name] = {
+            'source_bytes': source_bytes,
+            'minified_bytes': _utf8_size(code),
+            'snapshot_bytes': None,
+            'static': None,
+            'literal_count': None,
+            'literal_bytes': literal_breakdown(code),
+        }
+
+    def set_snapshot(self, name, snapshot_bytes, literals, magic_strings):
+        module = self.modules[name]
+        module['snapshot_bytes'] = snapshot_bytes
+        module['literal_count'] = len(literals)
+        module['static'] = all(lit in magic_strings for lit in literals)
+        module['literal_bytes'] = literal_breakdown(self.codes[name],
+                                                    literals)
+
+    def set_magic_strings(self, magic_strings):
+        self.magic_strings = {
+            'count': len(magic_strings),
+            'bytes': sum(_utf8_size(string) for string in magic_strings),
+        }
+
+    def to_json(self):
+        totals = {}
+        for key in ['source_bytes', 'minified_bytes', 'snapshot_bytes',
+                    'literal_count']:
+            values = [module[key] for module in self.modules.values()]
+            totals[key] = (sum(values)
+                           if values and None not in values else None)
+
+        if not self.snapshot:
+            self.embedded_bytes = totals['minified_bytes'] or 0
+
+        report = {
+            'version': REPORT_VERSION,
+            'buildtype': self.buildtype,
+            'snapshot': self.snapshot,
+            'embedded_bytes': self.embedded_bytes,
+            'magic_strings': self.magic_strings,
+            'totals': totals,
+            'modules': self.modules,
+        }
+        return json.dumps(report, indent=2, sort_keys=True) + '\n'
+
+
+def module_size(module):
+    """ The bytes a module contributes to the embedded image. """
+    if module.get('snapshot_bytes') is not None:
+        return module['snapshot_bytes']
+    return module['minified_bytes']
+
+
+def diff_reports(old, new):
+    """ Return the per module size changes as (name, old, new) tuples.
+        Added or removed modules have None as old or new size.
+    """
+    old_modules = old['modules']
+    new_modules = new['modules']
+    rows = []
+    for name in sorted(set(old_modules) | set(new_modules)):
+        old_size = (module_size(old_modules[name])
+                    if name in old_modules else None)
+        new_size = (module_size(new_modules[name])
+                    if name in new_modules else None)
+        rows.append((name, old_size, new_size))
+    return rows
+
+
+def print_diff(old, new, show_all=False):
+    def fmt(value):
+        return '-' if value is None else str(value)
+
+    print('%-32s %10s %10s %10s' % ('Module', 'Old', 'New', 'Change'))
+    for name, old_size, new_size in diff_reports(old, new):
+        change = (new_size or 0) - (old_size or 0)
+        if not change and not show_all:
+            continue
+        print('%-32s %10s %10s %+10d'
+              % (name, fmt(old_size), fmt(new_size), change))
+
+    growth = new['embedded_bytes'] - old['embedded_bytes']
+    print('%-32s %10d %10d %+10d'
+          % ('Embedded image', old['embedded_bytes'], new['embedded_bytes'],
+             growth))
+    return growth
+
+
+def load_report(report_path):
+    with open(report_path, 'r') as report_file:
+        report = json.load(report_file)
+
+    if report.get('version') != REPORT_VERSION:
+        print('%s: unsupported report version' % report_path)
+        sys.exit(1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare two js2c size reports.')
+    parser.add_argument('old', help='report of the base version')
+    parser.add_argument('new', help='report of the changed version')
+    parser.add_argument('--max-growth', type=int, default=None,
+        metavar='BYTES',
+        help='exit with an error if the embedded image grew by more than '
+             'the given number of bytes')
+    parser.add_argument('--all', action='store_true', default=False,
+        help='list the unchanged modules too')
+    options = parser.parse_args()
+
+    old = load_report(options.old)
+    new = load_report(options.new)
+    if old['snapshot'] != new['snapshot']:
+        print('Warning: comparing a snapshot and a no-snapshot report')
+
+    growth = print_diff(old, new, options.all)
+    if options.max_growth is not None and growth > options.max_growth:
+        print('The embedded image grew by %d bytes (limit: %d bytes)'
+              % (growth, options.max_growth))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
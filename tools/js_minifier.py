@@ -0,0 +1,737 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Token based minifier for the JS modules embedded by tools/js2c.py.
+# It removes comments and every whitespace which is not needed to keep
+# the meaning of the code, shortens the local variables and parameters of
+# the functions and folds constant numeric and string expressions.
+#
+#  The renaming is conservative: function names are kept (they are visible
+# through backtraces and Function.prototype.name) and a module is not
+# renamed at all if it uses eval, with or ES2015 syntax.
+
+from __future__ import print_function
+
+import itertools
+import re
+import string
+
+
+class MinifyError(Exception):
+    pass
+
+
+KEYWORDS = set([
+    'break', 'case', 'catch', 'class', 'const', 'continue', 'debugger',
+    'default', 'delete', 'do', 'else', 'enum', 'export', 'extends', 'false',
+    'finally', 'for', 'function', 'if', 'implements', 'import', 'in',
+    'instanceof', 'interface', 'let', 'new', 'null', 'package', 'private',
+    'protected', 'public', 'return', 'static', 'super', 'switch', 'this',
+    'throw', 'true', 'try', 'typeof', 'var', 'void', 'while', 'with', 'yield'
+])
+
+# Names which must never be introduced or renamed.
+RESERVED_NAMES = KEYWORDS | set(['arguments', 'eval', 'undefined', 'NaN',
+                                 'Infinity'])
+
+# A line break after these keywords always terminates the statement.
+RESTRICTED_KEYWORDS = set(['return', 'break', 'continue', 'throw', 'yield'])
+
+# Keywords after which an expression or a statement must follow.
+PREFIX_KEYWORDS = set(['case', 'delete', 'do', 'else', 'in', 'instanceof',
+                       'new', 'typeof', 'var', 'void'])
+
+# Keywords after which a slash starts a regular expression.
+REGEX_PREFIX_KEYWORDS = set(['case', 'delete', 'do', 'else', 'in',
+                             'instanceof', 'new', 'return', 'throw',
+                             'typeof', 'void', 'yield'])
+
+# Constructs which the renamer does not understand.
+UNSUPPORTED_NAMES = set(['eval', 'with', 'let', 'const', 'class', 'import',
+                         'export'])
+UNSUPPORTED_PUNCTUATORS = set(['=>', '...'])
+
+PUNCTUATORS = [
+    '>>>=', '...', '===', '!==', '**=', '<<=', '>>=', '>>>', '=>', '==',
+    '!=', '<=', '>=', '&&', '||', '++', '--', '+=', '-=', '*=', '/=', '%=',
+    '&=', '|=', '^=', '<<', '>>', '**', '{', '}', '(', ')', '[', ']', ';',
+    ',', '<', '>', '+', '-', '*', '/', '%', '&', '|', '^', '!', '~', '?',
+    ':', '=', '.'
+]
+
+ASSIGNMENTS = set(['=', '+=', '-=', '*=', '/=', '%=', '<<=', '>>=', '>>>=',
+                   '&=', '|=', '^=', '**='])
+
+BINARY_PRECEDENCE = {
+    '||': 4, '&&': 5, '|': 6, '^': 7, '&': 8,
+    '==': 9, '!=': 9, '===': 9, '!==': 9,
+    '<': 10, '>': 10, '<=': 10, '>=': 10,
+    '<<': 11, '>>': 11, '>>>': 11,
+    '+': 12, '-': 12,
+    '*': 13, '/': 13, '%': 13
+}
+
+WHITESPACE_RE = re.compile(u'[ \t\v\f\u00a0\ufeff]+')
+NEWLINE_RE = re.compile(u'\r\n|[\n\r\u2028\u2029]')
+COMMENT_RE = re.compile(r'//[^\n\r]*|/\*[\s\S]*?\*/')
+NAME_RE = re.compile(r'(?:[^\W\d]|\$|\\u[0-9a-fA-F]{4})'
+                     r'(?:[\w$]|\\u[0-9a-fA-F]{4})*', re.UNICODE)
+NUMBER_RE = re.compile(r'0[xXoObB][0-9a-fA-F]+|'
+                       r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+STRING_RE = re.compile(r'"(?:[^"\\\n\r]|\\(?:\r\n|[\s\S]))*"|'
+                       r"'(?:[^'\\\n\r]|\\(?:\r\n|[\s\S]))*'")
+REGEX_RE = re.compile(r'/(?:[^/\\\[\n\r]|\\.|\[(?:[^\]\\\n\r]|\\.)*\])+/'
+                      r'[\w$]*')
+PUNCTUATOR_RE = re.compile('|'.join(re.escape(p) for p in PUNCTUATORS))
+INTEGER_RE = re.compile(r'^(?:0|[1-9]\d*|0[xX][0-9a-fA-F]+)$')
+
+
+class Token(object):
+    __slots__ = ['type', 'value', 'newline']
+
+    def __init__(self, type, value, newline):
+        self.type = type
+        self.value = value
+        # True if a line terminator precedes the token.
+        self.newline = newline
+
+    def is_punct(self, *values):
+        return self.type == 'punct' and (not values or self.value in values)
+
+    def is_name(self, *values):
+        return self.type == 'name' and (not values or self.value in values)
+
+
+def _regex_allowed(prev):
+    if prev is None:
+        return True
+    if prev.type == 'punct':
+        # A slash after a postfix increment or decrement is a division.
+        return prev.value not in (')', ']', '++', '--')
+    return prev.type == 'name' and prev.value in REGEX_PREFIX_KEYWORDS
+
+
+def _scan_template(code, pos):
+    """ Return the end position of the template literal starting at pos. """
+    pos += 1
+    while pos < len(code):
+        if code[pos] == '\\':
+            pos += 2
+        elif code[pos] == '`':
+            return pos + 1
+        elif code.startswith('${', pos):
+            pos = _scan_substitution(code, pos + 2)
+        else:
+            pos += 1
+
+    raise MinifyError('Unterminated template literal')
+
+
+def _scan_substitution(code, pos):
+    depth = 0
+    while pos < len(code):
+        ch = code[pos]
+        if ch in '\'"':
+            match = STRING_RE.match(code, pos)
+            if not match:
+                raise MinifyError('Unterminated string literal')
+            pos = match.end()
+        elif ch == '`':
+            pos = _scan_template(code, pos)
+        elif ch == '{':
+            depth += 1
+            pos += 1
+        elif ch == '}':
+            if depth == 0:
+                return pos + 1
+            depth -= 1
+            pos += 1
+        else:
+            pos += 1
+
+    raise MinifyError('Unterminated template substitution')
+
+
+def tokenize(code):
+    tokens = []
+    pos = 0
+    newline = False
+    prev = None
+    length = len(code)
+
+    while pos < length:
+        match = WHITESPACE_RE.match(code, pos)
+        if match:
+            pos = match.end()
+            continue
+
+        match = NEWLINE_RE.match(code, pos)
+        if match:
+            newline = True
+            pos = match.end()
+            continue
+
+        ch = code[pos]
+        if ch == '/' and code[pos + 1:pos + 2] in ('/', '*'):
+            match = COMMENT_RE.match(code, pos)
+            if not match:
+                raise MinifyError('Unterminated comment')
+            if NEWLINE_RE.search(match.group()):
+                newline = True
+            pos = match.end()
+            continue
+
+        if ch == '/' and _regex_allowed(prev):
+            match = REGEX_RE.match(code, pos)
+            if not match:
+                raise MinifyError('Invalid regular expression')
+            token = Token('regex', match.group(), newline)
+        elif ch in '\'"':
+            match = STRING_RE.match(code, pos)
+            if not match:
+                raise MinifyError('Unterminated string literal')
+            token = Token('string', match.group(), newline)
+        elif ch == '`':
+            end = _scan_template(code, pos)
+            token = Token('template', code[pos:end], newline)
+        elif ch.isdigit() or (ch == '.' and code[pos + 1:pos + 2].isdigit()):
+            match = NUMBER_RE.match(code, pos)
+            token = Token('number', match.group(), newline)
+        else:
+            match = NAME_RE.match(code, pos)
+            if match:
+                token = Token('name', match.group(), newline)
+            else:
+                match = PUNCTUATOR_RE.match(code, pos)
+                if not match:
+                    raise MinifyError('Unexpected character %r at %d'
+                                      % (ch, pos))
+                token = Token('punct', match.group(), newline)
+
+        pos += len(token.value)
+        tokens.append(token)
+        prev = token
+        newline = False
+
+    return tokens
+
+
+def _keep_newline(prev, token):
+    """ Return True if the line break between the two tokens may have
+        caused an automatic semicolon insertion.
+    """
+    if prev.is_name(*RESTRICTED_KEYWORDS):
+        return True
+    if token.is_punct('++', '--'):
+        return True
+    if prev.type == 'punct' and prev.value not in (')', ']', '}', '++', '--'):
+        return False
+    if prev.is_name(*PREFIX_KEYWORDS):
+        return False
+    if token.type == 'punct' and token.value not in ('{', '!', '~'):
+        return False
+    return True
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch in '_$\\' or ord(ch) > 127
+
+
+def _needs_space(prev, token):
+    last = prev.value[-1]
+    first = token.value[0]
+    if _is_word_char(last) and _is_word_char(first):
+        return True
+    # "1 .toString()" must not become a malformed number
+    if (prev.type == 'number' and first == '.' and
+            re.match(r'^\d+$', prev.value)):
+        return True
+    # "a + +b", "a - --b"
+    if last in '+-' and first == last:
+        return True
+    # "a / /re/", "a / *b", "/re/ in"
+    if last == '/' and first in '/*':
+        return True
+    if prev.type == 'regex' and last == '/' and _is_word_char(first):
+        return True
+    # avoid creating html-like comments: "<!--" and "-->"
+    if last == '<' and token.value.startswith('!--'):
+        return True
+    if prev.value.endswith('--') and first == '>':
+        return True
+    return False
+
+
+def _to_int32(value):
+    value &= 0xffffffff
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+def _fold_numbers(op, left, right):
+    if not (INTEGER_RE.match(left) and INTEGER_RE.match(right)):
+        return None
+
+    a = int(left, 0) if left != '0' else 0
+    b = int(right, 0) if right != '0' else 0
+
+    if op == '+':
+        result = a + b
+    elif op == '-':
+        result = a - b
+    elif op == '*':
+        result = a * b
+    elif op == '/':
+        if b == 0 or a % b:
+            return None
+        result = a // b
+    elif op == '%':
+        if b == 0:
+            return None
+        result = a % b
+    elif op == '<<':
+        result = _to_int32(a << (b & 31))
+    elif op == '>>':
+        result = _to_int32(a) >> (b & 31)
+    elif op == '>>>':
+        result = (a & 0xffffffff) >> (b & 31)
+    elif op == '&':
+        result = _to_int32(a & b)
+    elif op == '|':
+        result = _to_int32(a | b)
+    elif op == '^':
+        result = _to_int32(a ^ b)
+    else:
+        return None
+
+    if result < 0 or result >= 2 ** 53:
+        return None
+
+    folded = str(result)
+    # only fold if the result is not longer than the expression
+    if len(folded) > len(left) + len(op) + len(right):
+        return None
+
+    return folded
+
+
+def _fold_strings(op, left, right):
+    if op != '+' or left[0] != right[0]:
+        return None
+    # a trailing octal escape would be extended by a leading digit
+    if re.search(r'\\[0-7]{1,2}$', left[:-1]) and right[1:2].isdigit():
+        return None
+
+    return left[:-1] + right[1:]
+
+
+def fold_constants(tokens):
+    """ Replace the binary expressions of two literals with their value
+        where the operator precedence allows it.
+    """
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(tokens) - 2):
+            left, op, right = tokens[i], tokens[i + 1], tokens[i + 2]
+            if op.type != 'punct' or op.value not in BINARY_PRECEDENCE:
+                continue
+            if left.type != right.type or left.type not in ('number',
+                                                            'string'):
+                continue
+            if op.newline or right.newline:
+                continue
+
+            precedence = BINARY_PRECEDENCE[op.value]
+            before = tokens[i - 1] if i > 0 else None
+            after = tokens[i + 3] if i + 3 < len(tokens) else None
+
+            if before is not None:
+                if before.type != 'punct' and not before.is_name('return',
+                                                                'case'):
+                    continue
+                if (before.type == 'punct' and
+                        before.value not in ASSIGNMENTS and
+                        before.value not in '([,;{}:?' and
+                        BINARY_PRECEDENCE.get(before.value, 99) >=
+                        precedence):
+                    continue
+
+            if after is not None:
+                if after.type != 'punct':
+                    continue
+                if (after.value not in ')],;}:?' and
+                        BINARY_PRECEDENCE.get(after.value, 99) >
+                        precedence):
+                    continue
+
+            if left.type == 'number':
+                value = _fold_numbers(op.value, left.value, right.value)
+            else:
+                value = _fold_strings(op.value, left.value, right.value)
+
+            if value is not None:
+                tokens[i:i + 3] = [Token(left.type, value, left.newline)]
+                changed = True
+                break
+
+    return tokens
+
+
+class _Scope(object):
+    def __init__(self, parent, start, end):
+        self.parent = parent
+        # token index range (inclusive) covered by the scope
+        self.start = start
+        self.end = end
+        self.declared = set()
+        self.renamed = {}
+
+
+def _match_brackets(tokens):
+    pairs = {'(': ')', '[': ']', '{': '}'}
+    match = {}
+    stack = []
+    for idx, token in enumerate(tokens):
+        if token.type != 'punct':
+            continue
+        if token.value in pairs:
+            stack.append(idx)
+        elif token.value in (')', ']', '}'):
+            if not stack or pairs[tokens[stack[-1]].value] != token.value:
+                raise MinifyError('Unbalanced %r' % token.value)
+            open_idx = stack.pop()
+            match[open_idx] = idx
+            match[idx] = open_idx
+
+    if stack:
+        raise MinifyError('Unbalanced %r' % tokens[stack[-1]].value)
+
+    return match
+
+
+def _short_names():
+    first = string.ascii_letters + '_$'
+    rest = first + string.digits
+    for size in itertools.count(1):
+        for head in first:
+            for tail in itertools.product(rest, repeat=size - 1):
+                yield head + ''.join(tail)
+
+
+class _Renamer(object):
+    def __init__(self, tokens, wrapped):
+        self.tokens = tokens
+        self.match = _match_brackets(tokens)
+        self.root = _Scope(None, 0, len(tokens) - 1)
+        self.scopes = [self.root]
+        self.pinned = set()
+        if not wrapped:
+            # The top level code is global, its names are visible outside.
+            self.root.declared = None
+
+    def _prev(self, idx):
+        return self.tokens[idx - 1] if idx > 0 else None
+
+    def _next(self, idx):
+        return self.tokens[idx + 1] if idx + 1 < len(self.tokens) else None
+
+    def _is_property_key(self, idx):
+        """ Object literal keys, labels, getter/setter names and
+            member names are not variable references.
+        """
+        prev, after = self._prev(idx), self._next(idx)
+        if prev is not None and prev.is_punct('.'):
+            return True
+        if prev is not None and prev.is_name('break', 'continue'):
+            return True
+        if after is not None and after.is_punct(':'):
+            return prev is None or prev.is_punct('{', ',', ';', '}')
+        if self._is_accessor(idx - 1):
+            return True
+        if self._is_accessor(idx):
+            return True
+        return False
+
+    def _is_accessor(self, idx):
+        """ Return True if tokens[idx] is the get/set of an accessor. """
+        if idx < 0 or not self.tokens[idx].is_name('get', 'set'):
+            return False
+        prev = self._prev(idx)
+        after = self._next(idx)
+        return (prev is not None and prev.is_punct('{', ',') and
+                after is not None and after.type in ('name', 'string',
+                                                      'number'))
+
+    def _enclosing_bracket(self, idx):
+        """ Return the index of the innermost bracket around tokens[idx]. """
+        idx -= 1
+        while idx >= 0:
+            token = self.tokens[idx]
+            if token.is_punct(')', ']', '}'):
+                idx = self.match[idx]
+            elif token.is_punct('(', '[', '{'):
+                return idx
+            idx -= 1
+        return None
+
+    def _is_shorthand_property(self, idx):
+        """ Return True if tokens[idx] is an ES2015 shorthand property of an
+            object literal ({ name, ... }), which is both the key and the
+            value. Raise MinifyError if it can not be told from a block.
+        """
+        prev, after = self._prev(idx), self._next(idx)
+        if prev is None or not prev.is_punct('{', ',') or \
+                after is None or not after.is_punct('}', ','):
+            return False
+
+        brace_idx = self._enclosing_bracket(idx)
+        if brace_idx is None or not self.tokens[brace_idx].is_punct('{'):
+            return False
+
+        before = self._prev(brace_idx)
+        if before is None or before.is_punct(')', ';', '{', '}') or \
+                before.is_name('else', 'do', 'try', 'finally'):
+            # A block: { name } or { name, other } are expressions.
+            return False
+        if before.is_punct(':', ']') or \
+                (before.type == 'name' and before.value not in KEYWORDS):
+            # A label, a case or an unexpected token.
+            raise MinifyError('Ambiguous shorthand property')
+        return True
+
+    def _add_function(self, params_idx, name_idx=None):
+        tokens = self.tokens
+        params_end = self.match.get(params_idx)
+        body_idx = params_end + 1 if params_end is not None else None
+        if body_idx is None or body_idx >= len(tokens) or \
+                not tokens[body_idx].is_punct('{'):
+            raise MinifyError('Unsupported function syntax')
+
+        scope = _Scope(None, params_idx, self.match[body_idx])
+        for idx in range(params_idx + 1, params_end):
+            token = tokens[idx]
+            if token.type == 'name':
+                scope.declared.add(token.value)
+            elif not token.is_punct(','):
+                raise MinifyError('Unsupported parameter syntax')
+
+        if name_idx is not None:
+            self.pinned.add(tokens[name_idx].value)
+
+        self.scopes.append(scope)
+
+    def _find_functions(self):
+        tokens = self.tokens
+        for idx, token in enumerate(tokens):
+            if token.is_name('function'):
+                prev = self._prev(idx)
+                if prev is not None and prev.is_punct('.'):
+                    continue
+                after = self._next(idx)
+                if after is not None and after.type == 'name':
+                    self._add_function(idx + 2, idx + 1)
+                elif after is not None and after.is_punct('('):
+                    self._add_function(idx + 1)
+                else:
+                    raise MinifyError('Unsupported function syntax')
+            elif self._is_accessor(idx):
+                self._add_function(idx + 2, idx + 1)
+            elif (token.is_punct('(') and idx > 1 and
+                    tokens[idx - 1].type == 'name' and
+                    tokens[idx - 1].value not in KEYWORDS and
+                    tokens[idx - 2].is_punct('{', ',') and
+                    tokens[self.match[idx] + 1:self.match[idx] + 2] and
+                    tokens[self.match[idx] + 1].is_punct('{') and
+                    not self._is_accessor(idx - 2)):
+                # ES2015 method shorthand: { name() { ... } }
+                raise MinifyError('Unsupported method syntax')
+
+    def _assign_scopes(self):
+        self.scopes.sort(key=lambda scope: scope.start)
+        self.scope_of = [self.root] * len(self.tokens)
+        for scope in self.scopes[1:]:
+            scope.parent = self.scope_of[scope.start]
+            for idx in range(scope.start, scope.end + 1):
+                self.scope_of[idx] = scope
+
+    def _parse_var(self, idx):
+        """ Return the token indices of the names declared by the var
+            statement at idx. Missing a name is safe (it will be left
+            as is), declaring a wrong one is not, so stop when in doubt.
+        """
+        tokens = self.tokens
+        names = []
+        expect_name = True
+        idx += 1
+        while idx < len(tokens):
+            token = tokens[idx]
+            if expect_name:
+                if token.type != 'name' or token.value in KEYWORDS:
+                    raise MinifyError('Unsupported var syntax')
+                names.append(idx)
+                expect_name = False
+                idx += 1
+                continue
+
+            if token.newline and _keep_newline(tokens[idx - 1], token):
+                break
+            if token.is_punct('(', '[', '{'):
+                idx = self.match[idx] + 1
+                continue
+            if token.is_punct(','):
+                expect_name = True
+            elif token.is_punct(';', ')', ']', '}') or \
+                    token.is_name('in', 'of'):
+                break
+            idx += 1
+
+        return names
+
+    def _declare_vars(self):
+        for idx, token in enumerate(self.tokens):
+            if not token.is_name('var'):
+                continue
+            scope = self.scope_of[idx]
+            for name_idx in self._parse_var(idx):
+                if scope.declared is not None:
+                    scope.declared.add(self.tokens[name_idx].value)
+
+    def _resolve(self, idx):
+        name = self.tokens[idx].value
+        if name in self.pinned or name in RESERVED_NAMES:
+            return None
+
+        scope = self.scope_of[idx]
+        while scope is not None:
+            if scope.declared is not None and name in scope.declared:
+                return scope
+            scope = scope.parent
+
+        return None
+
+    def rename(self):
+        tokens = self.tokens
+        for token in tokens:
+            if token.is_name(*UNSUPPORTED_NAMES) or \
+                    token.is_punct(*UNSUPPORTED_PUNCTUATORS) or \
+                    token.type == 'template':
+                return tokens
+
+        self._find_functions()
+        self._assign_scopes()
+        self._declare_vars()
+
+        # Collect the references: (token index, resolved scope or None)
+        references = []
+        shorthands = set()
+        for idx, token in enumerate(tokens):
+            if token.type != 'name' or token.value in KEYWORDS:
+                continue
+            if self._is_property_key(idx):
+                continue
+            if self._is_shorthand_property(idx):
+                shorthands.add(idx)
+            references.append((idx, self._resolve(idx)))
+
+        # Parents are always before their children in self.scopes
+        for scope in self.scopes:
+            if not scope.declared:
+                continue
+
+            avoid = set(RESERVED_NAMES) | self.pinned
+            counts = dict.fromkeys(scope.declared, 0)
+            for idx, owner in references:
+                if idx < scope.start or idx > scope.end:
+                    continue
+                name = tokens[idx].value
+                if owner is scope:
+                    counts[name] += 1
+                elif owner is None:
+                    avoid.add(name)
+                elif scope.start >= owner.start and scope.end <= owner.end:
+                    # declared by an ancestor (already renamed)
+                    avoid.add(owner.renamed[name])
+
+            names = _short_names()
+            for name in sorted(counts, key=lambda n: (-counts[n], n)):
+                new_name = next(names)
+                while new_name in avoid:
+                    new_name = next(names)
+                scope.renamed[name] = new_name
+
+        for idx, owner in references:
+            if owner is None:
+                continue
+            name = tokens[idx].value
+            if idx in shorthands:
+                # Keep the key of the property: { name } -> { name: a }
+                tokens[idx].value = '%s:%s' % (name, owner.renamed[name])
+            else:
+                tokens[idx].value = owner.renamed[name]
+
+        return tokens
+
+
+def generate(tokens):
+    output = []
+    prev = None
+    for token in tokens:
+        if prev is not None:
+            if token.newline and _keep_newline(prev, token):
+                output.append('\n')
+            elif _needs_space(prev, token):
+                output.append(' ')
+        output.append(token.value)
+        prev = token
+
+    return ''.join(output)
+
+
+def minify(code, wrapped=True, rename=True):
+    """ Minify the given JS code. If wrapped is True the code is the body
+        of the module wrapper function, so its top level variables can be
+        renamed as well.
+    """
+    is_bytes = isinstance(code, bytes)
+    if is_bytes:
+        code = code.decode('utf-8')
+
+    tokens = tokenize(code)
+    tokens = fold_constants(tokens)
+    if rename:
+        try:
+            tokens = _Renamer(tokens, wrapped).rename()
+        except MinifyError:
+            # Unsupported syntax, keep the original names
+            pass
+
+    code = generate(tokens)
+    return code.encode('utf-8') if is_bytes else code
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Minify JS modules.')
+    parser.add_argument('--no-rename', action='store_true', default=False,
+        help='Do not shorten the local names')
+    parser.add_argument('--global-code', action='store_true', default=False,
+        help='The input is not wrapped into a module function')
+    parser.add_argument('file', help='JS file to minify')
+
+    options = parser.parse_args()
+    with open(options.file, 'r') as fin:
+        print(minify(fin.read(), not options.global_code,
+                     not options.no_rename))
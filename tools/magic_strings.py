@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Selects the external magic strings which are registered to JerryScript
+# by src/iotjs_string_ext.c. Every magic string costs ROM (the characters,
+# the length entry and the pointer of the string table) but saves the heap
+# which would be allocated for the string when a module is loaded. Besides
+# that a module is only stored as a static snapshot (executed directly from
+# ROM) if all of its literals are magic strings.
+#
+#  The selection is a greedy knapsack: the strings used by the native code
+# are always kept, then the string or the set of strings which completes
+# a static snapshot with the best heap / ROM ratio is taken while it fits
+# into the budget.
+
+from __future__ import print_function
+
+import re
+
+
+# Size of the entries of the string table on the (32 bit) targets.
+POINTER_SIZE = 4
+LENGTH_SIZE = 4  # jerry_length_t
+
+# Size of a heap allocated ecma string: the header is followed by the
+# characters and the allocation is rounded up to the heap alignment.
+# Every literal also takes a slot of the literal storage.
+HEAP_STRING_HEADER = 8
+HEAP_ALIGNMENT = 8
+LITERAL_STORAGE_SLOT = 4
+
+# Array index like strings are encoded directly into the value by
+# JerryScript, these never take heap space.
+DIRECT_STRING_MAX = 0x07ffffff
+INDEX_STRING_REGEX = re.compile(r'^(0|[1-9][0-9]*)$')
+
+
+def utf8_size(string):
+    if not isinstance(string, bytes):
+        string = string.encode('utf-8')
+    return len(string)
+
+
+def rom_cost(string):
+    """ ROM bytes needed to register the string as an external magic
+        string: the zero terminated characters plus its entries in the
+        length and the pointer tables.
+    """
+    return utf8_size(string) + 1 + LENGTH_SIZE + POINTER_SIZE
+
+
+def heap_cost(string):
+    """ Heap bytes allocated for the string if it is not a magic string. """
+    if (INDEX_STRING_REGEX.match(string)
+            and int(string) <= DIRECT_STRING_MAX):
+        return 0
+
+    size = HEAP_STRING_HEADER + utf8_size(string)
+    size = (size + HEAP_ALIGNMENT - 1) // HEAP_ALIGNMENT * HEAP_ALIGNMENT
+    return size + LITERAL_STORAGE_SLOT
+
+
+class Candidate(object):
+    def __init__(self, string, modules):
+        self.string = string
+        self.modules = sorted(modules)
+        self.occurrences = len(self.modules)
+        self.rom = rom_cost(string)
+        self.heap = heap_cost(string)
+        # A string is stored only once in the literal storage, but the more
+        # modules reference it the more likely it is alive at any time, so
+        # the saving is weighted by the number of referencing modules.
+        self.gain = self.heap * max(self.occurrences, 1)
+        self.selected = False
+        self.reason = None
+
+    def ratio(self):
+        return float(self.gain) / self.rom
+
+
+class Selection(object):
+    def __init__(self, budget):
+        self.budget = budget
+        self.candidates = {}
+        self.static_modules = {}
+        self.rom = 0
+        self.heap = 0
+
+    def strings(self):
+        return set(string for string, candidate in self.candidates.items()
+                   if candidate.selected)
+
+
+def select_magic_strings(native_strings, module_literals, module_sizes=None,
+                         budget=None):
+    """ Select the magic strings.
+
+        native_strings:  strings used by the native code (always selected)
+        module_literals: {module name: set of literals of its snapshot}
+        module_sizes:    {module name: size of its (non-static) snapshot},
+                         the heap saved when the module becomes static
+        budget:          ROM bytes available for the magic strings or None
+                         to select every string
+    """
+    module_sizes = module_sizes or {}
+    selection = Selection(budget)
+
+    users = {}
+    for string in native_strings:
+        users.setdefault(string, set())
+    for module, literals in module_literals.items():
+        for string in literals:
+            users.setdefault(string, set()).add(module)
+
+    for string, modules in users.items():
+        selection.candidates[string] = Candidate(string, modules)
+
+    def take(candidate, reason):
+        candidate.selected = True
+        candidate.reason = reason
+        selection.rom += candidate.rom
+        selection.heap += candidate.gain
+
+    for string in native_strings:
+        take(selection.candidates[string], 'used by native code')
+
+    singles = [candidate for candidate in selection.candidates.values()
+               if not candidate.selected]
+
+    if budget is None:
+        for candidate in singles:
+            take(candidate, 'no budget')
+    else:
+        remaining = budget - selection.rom
+        singles.sort(key=lambda c: (-c.ratio(), c.string))
+        pending = {}
+        for module, literals in module_literals.items():
+            pending[module] = set(literals)
+
+        def best_module():
+            best = None
+            for module, literals in pending.items():
+                missing = [selection.candidates[string] for string in literals
+                           if not selection.candidates[string].selected]
+                cost = sum(c.rom for c in missing)
+                if cost > remaining:
+                    continue
+                gain = (module_sizes.get(module, 0)
+                        + sum(c.gain for c in missing))
+                ratio = float(gain) / cost if cost else float('inf')
+                if best is None or ratio > best[0]:
+                    best = (ratio, module, missing)
+            return best
+
+        index = 0
+        while True:
+            # Strings which do not fit now will never fit later.
+            while index < len(singles) and (singles[index].selected or
+                                            singles[index].rom > remaining):
+                index += 1
+
+            module = best_module()
+            single = singles[index] if index < len(singles) else None
+
+            if module and (not single or module[0] >= single.ratio()):
+                ratio, name, missing = module
+                for candidate in missing:
+                    take(candidate, 'completes static snapshot of %s' % name)
+                    remaining -= candidate.rom
+                del pending[name]
+            elif single:
+                take(single, 'heap/ROM ratio %.2f' % single.ratio())
+                remaining -= single.rom
+            else:
+                break
+
+        for candidate in singles:
+            if not candidate.selected:
+                candidate.reason = 'does not fit into the budget'
+
+    for module, literals in module_literals.items():
+        if all(selection.candidates[string].selected for string in literals):
+            selection.static_modules[module] = module_sizes.get(module, 0)
+
+    if budget is not None and selection.rom > budget:
+        print('Warning: the magic strings of the native code (%d bytes) '
+              'exceed the budget of %d bytes' % (selection.rom, budget))
+
+    return selection
+
+
+def write_report(selection, report_path):
+    """ Write a human readable summary of the selection. """
+    candidates = sorted(selection.candidates.values(),
+                        key=lambda c: (not c.selected, -c.ratio(), c.string))
+    total_rom = sum(c.rom for c in candidates)
+    lines = []
+    lines.append('Magic string selection')
+    lines.append('======================')
+    lines.append('')
+    if selection.budget is None:
+        lines.append('ROM budget:          unlimited')
+    else:
+        lines.append('ROM budget:          %d bytes' % selection.budget)
+    lines.append('Selected:            %d of %d strings'
+                 % (len(selection.strings()), len(candidates)))
+    lines.append('ROM used:            %d of %d bytes'
+                 % (selection.rom, total_rom))
+    lines.append('Heap saved (est.):   %d bytes of strings, %d bytes of '
+                 'static snapshots'
+                 % (selection.heap, sum(selection.static_modules.values())))
+    lines.append('Static modules:      %s'
+                 % (', '.join(sorted(selection.static_modules)) or '-'))
+    lines.append('')
+    lines.append('%-3s %-32s %5s %5s %5s %7s  %s'
+                 % ('', 'String', 'Uses', 'ROM', 'Heap', 'Ratio', 'Reason'))
+    for c in candidates:
+        text = repr(c.string)
+        if len(text) > 32:
+            text = text[:29] + '...'
+        lines.append('%-3s %-32s %5d %5d %5d %7.2f  %s'
+                     % ('+' if c.selected else '-', text, c.occurrences,
+                        c.rom, c.heap, c.ratio(), c.reason))
+
+    with open(report_path, 'w') as report:
+        report.write('\n'.join(lines) + '\n')
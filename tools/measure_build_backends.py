@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Compares the build tools supported by tools/build.py: every generator
+# does a clean build and then a no-op build in its own build directory.
+# The arguments after '--' are passed to build.py.
+#
+#   measure_build_backends.py --rounds 3 -- --profile=test/profiles/...
+
+from __future__ import print_function
+
+import argparse
+import subprocess
+import sys
+import time
+
+from common_py import path
+from common_py.system.filesystem import FileSystem as fs
+
+
+GENERATORS = ['make', 'ninja']
+
+
+def timed_build(generator, builddir, build_args, clean):
+    cmd = [sys.executable, fs.join(path.TOOLS_ROOT, 'build.py'),
+           '--generator=%s' % generator, '--builddir=%s' % builddir,
+           '--no-init-submodule'] + build_args
+    if clean:
+        cmd.append('--clean')
+
+    log_dir = fs.join(path.PROJECT_ROOT, builddir)
+    fs.maybe_make_directory(log_dir)
+    with open(fs.join(log_dir, 'measure.log'), 'a') as log:
+        start = time.time()
+        subprocess.check_call(cmd, stdout=log, stderr=subprocess.STDOUT)
+        return time.time() - start
+
+
+def run_benchmark(generators, rounds, builddir, build_args):
+    results = []
+    for generator in generators:
+        generator_dir = fs.join(builddir, generator)
+        clean = []
+        noop = []
+        for _ in range(rounds):
+            clean.append(timed_build(generator, generator_dir, build_args,
+                                     True))
+            noop.append(timed_build(generator, generator_dir, build_args,
+                                    False))
+        results.append((generator, min(clean), min(noop)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the clean and the no-op build time of the '
+                    'build tools supported by build.py.')
+    parser.add_argument('--builddir', default=fs.join('build', 'backends'),
+        help='Directory of the measured builds (default: %(default)s)')
+    parser.add_argument('--generator', action='append',
+        choices=GENERATORS, default=[],
+        help='Generator to measure (default: all)')
+    parser.add_argument('--rounds', type=int, default=1,
+        help='Builds of every generator, the best time is printed '
+             '(default: %(default)s)')
+    parser.add_argument('build_args', nargs='*',
+        help='Arguments passed to build.py (after --)')
+    options = parser.parse_args()
+
+    results = run_benchmark(options.generator or GENERATORS, options.rounds,
+                            options.builddir, options.build_args)
+
+    print('| {0:^9} | {1:^15} | {2:^15} |'.format(
+          'Generator', 'clean (s)', 'no-op (s)'))
+    print('| {0} | {1} | {2} |'.format('-' * 9, '-' * 15, '-' * 15))
+    for generator, clean, noop in results:
+        print('| {0:<9} | {1:>15.2f} | {2:>15.2f} |'.format(
+              generator, clean, noop))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Microbenchmark of the built-in module lookup done by require(): the
+# linear strcmp scan which was used by iotjs_module_get() and CompileModule
+# against the binary search in the sorted generated tables. The tables are
+# built from the modules of src/modules.json and the benchmark is compiled
+# with the host compiler.
+
+from __future__ import print_function
+
+import argparse
+import json
+import subprocess
+
+from common_py import path
+from common_py.system.filesystem import FileSystem as fs
+
+
+BENCHMARK_C = '''
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+
+typedef struct {{
+  const char* name;
+  unsigned idx;
+}} entry_t;
+
+static const entry_t native_modules[] = {{
+{NATIVE}
+}};
+
+static const entry_t js_modules[] = {{
+{JS}
+}};
+
+#define COUNT(table) (unsigned)(sizeof(table) / sizeof(table[0]))
+
+static unsigned find_linear(const entry_t* table, unsigned count,
+                            const char* name) {{
+  for (unsigned i = 0; i < count; i++) {{
+    if (!strcmp(name, table[i].name)) {{
+      return i;
+    }}
+  }}
+  return count;
+}}
+
+static unsigned find_binary(const entry_t* table, unsigned count,
+                            const char* name) {{
+  unsigned low = 0;
+  unsigned high = count;
+  while (low < high) {{
+    unsigned i = low + (high - low) / 2;
+    int cmp = strcmp(name, table[i].name);
+    if (cmp == 0) {{
+      return i;
+    }}
+    if (cmp < 0) {{
+      high = i;
+    }} else {{
+      low = i + 1;
+    }}
+  }}
+  return count;
+}}
+
+typedef unsigned (*find_t)(const entry_t*, unsigned, const char*);
+
+/* Copies of the names, so the lookups compare the strings instead of
+ * pointers which the linker may have merged. */
+static char names[{MAX_COUNT}][64];
+
+static double measure(find_t find, const entry_t* table, unsigned count) {{
+  struct timespec start, end;
+  volatile unsigned sink = 0;
+
+  for (unsigned i = 0; i < count; i++) {{
+    strcpy(names[i], table[i].name);
+  }}
+
+  clock_gettime(CLOCK_MONOTONIC, &start);
+  for (unsigned round = 0; round < {ROUNDS}; round++) {{
+    for (unsigned i = 0; i < count; i++) {{
+      sink += find(table, count, names[i]);
+    }}
+  }}
+  clock_gettime(CLOCK_MONOTONIC, &end);
+
+  double ns = (end.tv_sec - start.tv_sec) * 1e9 +
+              (end.tv_nsec - start.tv_nsec);
+  return ns / ((double){ROUNDS} * count);
+}}
+
+int main(void) {{
+  printf("native %u %.2f %.2f\\n", COUNT(native_modules),
+         measure(find_linear, native_modules, COUNT(native_modules)),
+         measure(find_binary, native_modules, COUNT(native_modules)));
+  printf("js %u %.2f %.2f\\n", COUNT(js_modules),
+         measure(find_linear, js_modules, COUNT(js_modules)),
+         measure(find_binary, js_modules, COUNT(js_modules)));
+  return 0;
+}}
+'''
+
+
+def get_module_names():
+    with open(fs.join(path.SRC_ROOT, 'modules.json')) as modules_json:
+        modules = json.load(modules_json)['modules']
+
+    native = sorted(name for name, module in modules.items()
+                    if 'init' in module)
+    js = sorted(set(name for name, module in modules.items()
+                    if 'js_file' in module) | set(['iotjs']))
+    return native, js
+
+
+def format_table(names):
+    return '\n'.join('  { "%s", %d },' % (name, idx)
+                     for idx, name in enumerate(names))
+
+
+def run_benchmark(cc, rounds):
+    native, js = get_module_names()
+    source = BENCHMARK_C.format(NATIVE=format_table(native),
+                                JS=format_table(js),
+                                MAX_COUNT=max(len(native), len(js)),
+                                ROUNDS=rounds)
+
+    with fs.mkdtemp() as temp_dir:
+        source_path = fs.join(temp_dir, 'module_lookup.c')
+        binary_path = fs.join(temp_dir, 'module_lookup')
+        with open(source_path, 'w') as source_file:
+            source_file.write(source)
+
+        try:
+            subprocess.check_call([cc, '-O2', '-std=gnu99', '-o',
+                                   binary_path, source_path])
+            output = subprocess.check_output([binary_path])
+        finally:
+            for file_path in [source_path, binary_path]:
+                if fs.exists(file_path):
+                    fs.remove(file_path)
+
+    results = []
+    for line in output.decode('utf-8').splitlines():
+        table, count, linear, binary = line.split()
+        results.append((table, int(count), float(linear), float(binary)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the linear and the binary search lookup of the '
+                    'built-in modules.')
+    parser.add_argument('--cc', default='cc',
+        help='C compiler to build the benchmark with (default: %(default)s)')
+    parser.add_argument('--rounds', type=int, default=200000,
+        help='Lookups of every module (default: %(default)s)')
+    options = parser.parse_args()
+
+    print('| {0:^16} | {1:^7} | {2:^14} | {3:^14} |'.format(
+          'Table', 'Entries', 'linear (ns)', 'binary (ns)'))
+    print('| {0} | {1} | {2} | {3} |'.format('-' * 16, '-' * 7, '-' * 14,
+                                              '-' * 14))
+    for table, count, linear, binary in run_benchmark(options.cc,
+                                                      options.rounds):
+        print('| {0:<16} | {1:>7} | {2:>14.2f} | {3:>14.2f} |'.format(
+              table, count, linear, binary))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Resolves the module configuration of IoT.js: reads the profile and the
+# modules.json files, enables the required modules and collects their
+# sources. The result is written as a CMake include file which is loaded by
+# cmake/iotjs.cmake instead of parsing the JSON files in CMake:
+#
+#   module_resolver.py --profile profiles/default.profile \
+#                      --toolchain cmake/config/x86_64-linux.cmake \
+#                      --output build/iotjs_modules.cmake
+
+from __future__ import print_function
+
+import argparse
+import json
+import re
+import sys
+
+from common_py import path
+from common_py.system.filesystem import FileSystem as fs
+
+
+MODULE_DEFINE_PREFIX = 'ENABLE_MODULE_'
+
+SYSTEM_NAME_REGEX = re.compile(r'set\s*\(\s*CMAKE_SYSTEM_NAME\s+(\w+)\s*\)')
+CMAKE_DEFINE_REGEX = re.compile(r'^-D(\w+)(?::\w+)?=(.*)$')
+
+
+class ModuleError(Exception):
+    pass
+
+
+def cmake_true(value):
+    """ Evaluate a value the same way as the if() command of CMake. """
+    value = value.strip('\'"').upper()
+    if value in ['ON', 'YES', 'TRUE', 'Y']:
+        return True
+    try:
+        return float(value) != 0
+    except ValueError:
+        return False
+
+
+def system_os(toolchain_file):
+    """ Return the IOTJS_SYSTEM_OS of a toolchain file: the lowercase
+        CMAKE_SYSTEM_NAME which is set by it.
+    """
+    with open(toolchain_file, 'r') as toolchain:
+        match = SYSTEM_NAME_REGEX.search(toolchain.read())
+    if not match:
+        raise ModuleError('CMAKE_SYSTEM_NAME is not set in %s' % toolchain_file)
+    return match.group(1).lower()
+
+
+def read_profile(profile_path):
+    """ Return the variables which are turned on by the profile. """
+    if not fs.exists(profile_path):
+        raise ModuleError('Profile file: \'%s\' doesn\'t exist!'
+                          % profile_path)
+
+    with open(profile_path, 'r') as profile:
+        lines = [line.strip() for line in profile.read().splitlines()]
+    return [line for line in lines if line and not line.startswith('#')]
+
+
+class Module(object):
+    def __init__(self, name, descriptor, base_dir):
+        self.name = name
+        self.descriptor = descriptor
+        self.base_dir = base_dir
+
+    def get(self, key, system_os=None):
+        if system_os is None:
+            return self.descriptor.get(key, [])
+        platforms = self.descriptor.get('platforms', {})
+        return platforms.get(system_os, {}).get(key, [])
+
+    def file_path(self, file_name, kind):
+        file_path = fs.join(self.base_dir, file_name)
+        if not fs.exists(file_path):
+            raise ModuleError('%s doesn\'t exist: %s' % (kind, file_path))
+        return file_path
+
+
+class ModuleConfig(object):
+    def __init__(self, system_os):
+        self.system_os = system_os
+        self.modules = {}
+        self.include_dirs = []
+        self.inputs = []
+        self.settings = []
+        self.enabled = {}
+
+    def add_descriptor_dir(self, module_dir):
+        json_path = fs.join(module_dir, 'modules.json')
+        if not fs.exists(json_path):
+            raise ModuleError('The modules.json file doesn\'t exist in %s'
+                              % module_dir)
+
+        with open(json_path, 'r') as modules_json:
+            modules = json.load(modules_json).get('modules', {})
+
+        self.include_dirs.append(module_dir)
+        self.inputs.append(json_path)
+        # A module defined by a later descriptor overrides the former one.
+        for name, descriptor in modules.items():
+            self.modules[name] = Module(name, descriptor, module_dir)
+
+    def apply_profile(self, profile_path, cmake_params=None):
+        """ Turn on the variables of the profile and turn off the other
+            modules. Variables which are given as -D cmake parameters take
+            precedence (they are already in the cache when the profile is
+            processed by CMake).
+        """
+        self.inputs.append(profile_path)
+        self.settings = read_profile(profile_path)
+
+        overrides = {}
+        for param in cmake_params or []:
+            match = CMAKE_DEFINE_REGEX.match(param.strip('\'"'))
+            if match and match.group(1).startswith(MODULE_DEFINE_PREFIX):
+                overrides[match.group(1)] = cmake_true(match.group(2))
+
+        for setting in self.settings:
+            if setting.startswith(MODULE_DEFINE_PREFIX):
+                self.enabled[setting] = True
+        for name in self.modules:
+            self.enabled.setdefault(MODULE_DEFINE_PREFIX + name.upper(), False)
+        self.enabled.update(overrides)
+
+    def resolve_dependencies(self):
+        pending = [name for name in self.modules
+                   if self.is_enabled(name)]
+        while pending:
+            module = self.modules.get(pending.pop())
+            if not module:
+                continue
+            requires = (module.get('require')
+                        + module.get('require', self.system_os))
+            for dependency in requires:
+                define = MODULE_DEFINE_PREFIX + dependency.upper()
+                # Unknown dependencies are ignored, like in CMake where
+                # their ENABLE_MODULE_<NAME> variable is not defined.
+                if define in self.enabled and not self.enabled[define]:
+                    self.enabled[define] = True
+                    pending.append(dependency)
+
+    def is_enabled(self, name):
+        return self.enabled.get(MODULE_DEFINE_PREFIX + name.upper(), False)
+
+    def enabled_modules(self):
+        """ The names of every ENABLE_MODULE_<NAME> variable. """
+        return sorted(define[len(MODULE_DEFINE_PREFIX):]
+                      for define in self.enabled)
+
+    def collect(self):
+        """ Return the module lists and sources of the enabled modules as
+            a dictionary of CMake variables.
+        """
+        result = {
+            'IOTJS_JS_MODULES': [],
+            'IOTJS_JS_MODULE_SRC': [],
+            'IOTJS_NATIVE_MODULES': [],
+            'IOTJS_NATIVE_MODULE_SRC': [],
+            'EXTRA_CMAKE_FILES': [],
+            'EXTERNAL_LIBS': [],
+            'init': {},
+        }
+
+        def append(key, values):
+            for value in values:
+                if value not in result[key]:
+                    result[key].append(value)
+
+        for define in self.enabled_modules():
+            name = define.lower()
+            module = self.modules.get(name)
+            if not self.is_enabled(name) or not module:
+                continue
+
+            js_file = module.descriptor.get('js_file')
+            if js_file:
+                js_path = module.file_path(js_file, 'JS file')
+                append('IOTJS_JS_MODULES', ['%s=%s' % (name, js_path)])
+                append('IOTJS_JS_MODULE_SRC', [js_path])
+
+            cmake_file = module.descriptor.get('cmakefile')
+            if cmake_file:
+                append('EXTRA_CMAKE_FILES',
+                       [module.file_path(cmake_file, 'CMake file')])
+
+            init = module.descriptor.get('init')
+            if module.get('native_files') and init:
+                result['IOTJS_NATIVE_MODULES'].append(define)
+                result['init'][define] = init
+
+            append('IOTJS_NATIVE_MODULE_SRC',
+                   [module.file_path(native_file, 'C file')
+                    for native_file in module.get('native_files')])
+            result['EXTERNAL_LIBS'].extend(module.get('external_libs'))
+
+            # Platform dependent sources, the 'undefined' section is used
+            # for the platforms which are not listed.
+            platforms = module.descriptor.get('platforms')
+            if platforms is not None:
+                platform = self.system_os
+                if platform not in platforms:
+                    platform = 'undefined'
+                append('IOTJS_NATIVE_MODULE_SRC',
+                       [module.file_path(native_file, 'C file')
+                        for native_file in module.get('native_files',
+                                                      platform)])
+                result['EXTERNAL_LIBS'].extend(module.get('external_libs',
+                                                          platform))
+
+        # iotjs_module_get() looks up the native modules with a binary
+        # search, the table must be sorted by the lowercase names.
+        result['IOTJS_NATIVE_MODULES'].sort(key=lambda name: name.lower())
+        return result
+
+
+def resolve_modules(profile_path, system_os, external_modules=None,
+                    cmake_params=None):
+    """ Return the resolved ModuleConfig and the collected variables. The
+        relative paths are interpreted from the project root, as CMake does.
+    """
+    config = ModuleConfig(system_os)
+
+    module_dirs = [fs.join(path.PROJECT_ROOT, module_dir)
+                   for module_dir in external_modules or [] if module_dir]
+    module_dirs.append(path.SRC_ROOT)
+    for module_dir in module_dirs:
+        config.add_descriptor_dir(fs.normpath(fs.abspath(module_dir)))
+
+    config.apply_profile(fs.join(path.PROJECT_ROOT, profile_path),
+                         cmake_params)
+    config.resolve_dependencies()
+    return config, config.collect()
+
+
+def _cmake_quote(value):
+    value = value.replace('\\', '/').replace('"', '\\"')
+    return '"%s"' % value.replace('$', '\\$')
+
+
+def _cmake_set(name, values):
+    if not values:
+        return 'set(%s)' % name
+    if len(values) == 1:
+        return 'set(%s %s)' % (name, _cmake_quote(values[0]))
+    lines = ['set(%s' % name]
+    lines.extend('    %s' % _cmake_quote(value) for value in values)
+    lines[-1] += ')'
+    return '\n'.join(lines)
+
+
+def write_cmake(config, result, output, profile_path):
+    lines = ['# File generated by tools/module_resolver.py, do not edit.', '']
+
+    # The inputs are checked by iotjs_check_modules_cmake() in
+    # cmake/iotjs.cmake, the rest of the file is only used if they match
+    # the current configuration.
+    lines.append(_cmake_set('IOTJS_MODULES_CMAKE_INPUTS', config.inputs))
+    lines.append(_cmake_set('IOTJS_MODULES_CMAKE_PROFILE', [
+        fs.normpath(fs.join(path.PROJECT_ROOT, profile_path))]))
+    lines.append(_cmake_set('IOTJS_MODULES_CMAKE_SYSTEM_OS',
+                            [config.system_os]))
+    lines.append(_cmake_set('IOTJS_MODULES_CMAKE_EXTERNAL_MODULES',
+                            config.include_dirs[:-1]))
+    lines.append('iotjs_check_modules_cmake(IOTJS_MODULES_CMAKE_VALID)')
+    lines.append('if(NOT IOTJS_MODULES_CMAKE_VALID)')
+    lines.append('  return()')
+    lines.append('endif()')
+    lines.append('')
+
+    for setting in config.settings:
+        if not setting.startswith(MODULE_DEFINE_PREFIX):
+            lines.append('set(%s ON CACHE BOOL "ON/OFF")' % setting)
+    for define in config.enabled_modules():
+        lines.append('set(%s%s %s)' % (MODULE_DEFINE_PREFIX, define,
+                     'ON' if config.is_enabled(define) else 'OFF'))
+    lines.append('')
+
+    lines.append(_cmake_set('IOTJS_MODULES', sorted(config.modules)))
+    lines.append(_cmake_set('MODULES_INCLUDE_DIR', config.include_dirs))
+    lines.append(_cmake_set('IOTJS_ENABLED_MODULES',
+                            config.enabled_modules()))
+    lines.append(_cmake_set('IOTJS_MODULE_DEFINES',
+                            ['-D%s%s=%d' % (MODULE_DEFINE_PREFIX, define,
+                                            config.is_enabled(define))
+                             for define in config.enabled_modules()]))
+    for key in ['IOTJS_JS_MODULES', 'IOTJS_JS_MODULE_SRC',
+                'IOTJS_NATIVE_MODULES', 'IOTJS_NATIVE_MODULE_SRC',
+                'EXTRA_CMAKE_FILES']:
+        lines.append(_cmake_set(key, result[key]))
+    if result['EXTERNAL_LIBS']:
+        lines.append('list(APPEND EXTERNAL_LIBS %s)'
+                     % ' '.join(result['EXTERNAL_LIBS']))
+    lines.append('')
+
+    for define in result['IOTJS_NATIVE_MODULES']:
+        lines.append('set(IOTJS_MODULE_%s_INIT %s)'
+                     % (define, result['init'][define]))
+
+    content = '\n'.join(lines) + '\n'
+
+    # Keep the timestamp if nothing changed, so the files which depend on
+    # the configuration are not rebuilt.
+    if fs.exists(output):
+        with open(output, 'r') as cmake_file:
+            if cmake_file.read() == content:
+                return
+    with open(output, 'w') as cmake_file:
+        cmake_file.write(content)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Resolve the enabled modules of IoT.js and write them '
+                    'as a CMake include file.')
+    parser.add_argument('--profile',
+        default=fs.join('profiles', 'default.profile'),
+        help='Module profile (default: %(default)s)')
+    parser.add_argument('--toolchain', required=True,
+        help='CMake toolchain file of the target')
+    parser.add_argument('--external-modules', default='',
+        help='Directories of additional modules.json files '
+             '(format: path1,path2,...)')
+    parser.add_argument('--cmake-param', action='append', default=[],
+        help='CMake parameter, -DENABLE_MODULE_<NAME>=ON/OFF overrides the '
+             'profile (can be used multiple times)')
+    parser.add_argument('--output', required=True,
+        help='Path of the generated CMake file')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False,
+        help='Print the enabled modules')
+    options = parser.parse_args()
+
+    external_modules = options.external_modules.split(',')
+    try:
+        config, result = resolve_modules(options.profile,
+                                         system_os(options.toolchain),
+                                         external_modules,
+                                         options.cmake_param)
+    except (ModuleError, IOError, ValueError) as e:
+        print('Unable to resolve the modules: %s' % e, file=sys.stderr)
+        sys.exit(1)
+
+    write_cmake(config, result, options.output, options.profile)
+
+    if options.verbose:
+        for define in config.enabled_modules():
+            print('%s%s = %s' % (MODULE_DEFINE_PREFIX, define,
+                                 'ON' if config.is_enabled(define) else 'OFF'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Computes which built-in JS modules are reachable from an application by
+# following the require() calls of the application files and of the
+# modules under src/js. Only the reachable modules need to be embedded by
+# tools/js2c.py.
+#
+#   require_graph.py --modules 'fs=src/js/fs.js,...' --entry app/index.js
+#
+# prints the reachable modules in the format of the js2c --modules option.
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+
+from js_minifier import tokenize, MinifyError
+
+
+# Modules loaded by the runtime itself (see src/js/iotjs.js).
+ROOT_MODULES = ['iotjs']
+
+
+class RequireError(Exception):
+    pass
+
+
+def _unquote(literal):
+    # The module ids are plain names and paths, escapes are not expected.
+    return literal[1:-1]
+
+
+def find_requires(code):
+    """ Return the list of the string literal arguments of the require()
+        calls (including Module.require() and Builtin.require()) and the
+        number of calls with a non constant argument.
+    """
+    if isinstance(code, bytes):
+        code = code.decode('utf-8')
+
+    try:
+        tokens = tokenize(code)
+    except MinifyError as e:
+        raise RequireError(str(e))
+
+    requires = []
+    dynamic = 0
+    for idx, token in enumerate(tokens):
+        if not token.is_name('require'):
+            continue
+        if idx > 0 and tokens[idx - 1].is_name('function'):
+            continue
+        if idx + 1 >= len(tokens) or not tokens[idx + 1].is_punct('('):
+            continue
+        if (idx + 3 < len(tokens) and tokens[idx + 2].type == 'string'
+                and tokens[idx + 3].is_punct(')')):
+            requires.append(_unquote(tokens[idx + 2].value))
+        else:
+            dynamic += 1
+
+    return requires, dynamic
+
+
+def _try_path(file_path, ext):
+    for candidate in [file_path, file_path + ext]:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def resolve_filepath(module_id, directories):
+    """ Resolve a module id the same way as Module.resolveFilepath in
+        src/js/module.js: id[.js], the main file of id/package.json and
+        id/index[.js] are tried in every directory.
+    """
+    for directory in directories:
+        module_path = os.path.join(directory, module_id)
+
+        file_path = _try_path(module_path, '.js')
+        if file_path:
+            return os.path.normpath(file_path)
+
+        file_path = resolve_directory(module_path)
+        if file_path:
+            return file_path
+
+    return None
+
+
+def resolve_directory(dir_path):
+    """ Return the file loaded when a directory is required: the main file
+        of its package.json or its index[.js].
+    """
+    json_path = os.path.join(dir_path, 'package.json')
+    if os.path.isfile(json_path):
+        with open(json_path, 'r') as package_json:
+            main = json.load(package_json).get('main')
+        if main:
+            file_path = _try_path(os.path.join(dir_path, main), '.js')
+            if file_path:
+                return os.path.normpath(file_path)
+
+    file_path = _try_path(os.path.join(dir_path, 'index'), '.js')
+    if file_path:
+        return os.path.normpath(file_path)
+
+    return None
+
+
+def app_directories(file_path, app_root):
+    """ The lookup directories of the requires in the given file: the
+        directory of the file, then the application root (the working
+        directory at runtime) and its iotjs_modules directory.
+    """
+    return [os.path.dirname(file_path), app_root,
+            os.path.join(app_root, 'iotjs_modules')]
+
+
+def _read(file_path):
+    with open(file_path, 'r') as js_file:
+        return js_file.read()
+
+
+class RequireGraph(object):
+    def __init__(self, js_modules):
+        """ js_modules: {module name: path of the JS file} """
+        self.js_modules = js_modules
+        self.edges = {}
+        self.app_files = []
+        self.unresolved = []
+        self.dynamic = []
+
+    def _module_requires(self, name):
+        if name not in self.edges:
+            requires, _ = find_requires(_read(self.js_modules[name]))
+            # Relative requires of the built-in modules are not supported
+            # by the runtime, only the names of other modules count.
+            self.edges[name] = sorted(set(r for r in requires
+                                          if r in self.js_modules))
+        return self.edges[name]
+
+    def add_application(self, entry, app_root=None):
+        """ Walk the application files starting from the entry point and
+            return the built-in modules required by them.
+        """
+        entry = os.path.normpath(os.path.abspath(entry))
+        app_root = os.path.abspath(app_root or os.path.dirname(entry))
+        builtins = set()
+        pending = [entry]
+        seen = set(pending)
+        while pending:
+            file_path = pending.pop()
+            self.app_files.append(file_path)
+            if not file_path.endswith('.js'):
+                continue
+
+            requires, dynamic = find_requires(_read(file_path))
+            if dynamic:
+                self.dynamic.append(file_path)
+
+            for module_id in requires:
+                # Built-in modules take precedence (see Module.load).
+                if module_id in self.js_modules:
+                    builtins.add(module_id)
+                    continue
+
+                resolved = resolve_filepath(
+                    module_id, app_directories(file_path, app_root))
+                if resolved is None:
+                    # Probably a native module or a module which is not
+                    # enabled in the build.
+                    self.unresolved.append((file_path, module_id))
+                elif resolved not in seen:
+                    seen.add(resolved)
+                    pending.append(resolved)
+
+        return builtins
+
+    def reachable(self, roots):
+        """ Return the set of modules reachable from the given ones. """
+        result = set()
+        pending = [root for root in roots if root in self.js_modules]
+        while pending:
+            name = pending.pop()
+            if name in result:
+                continue
+            result.add(name)
+            pending.extend(self._module_requires(name))
+        return result
+
+
+def _bundle_key(file_path, app_root):
+    return os.path.relpath(file_path, app_root).replace(os.sep, '/')
+
+
+def app_bundle(app_root, entries, js_modules):
+    """ Return the application files to embed as (key, path) pairs and the
+        directories which resolve to one of them as (key, file key) pairs.
+        The keys are relative to the application root. Without entry points
+        every JS file under the root is embedded.
+    """
+    app_root = os.path.normpath(os.path.abspath(app_root))
+    if entries:
+        modules = dict(module.split('=', 1) for module in js_modules)
+        graph = RequireGraph(modules)
+        for entry in entries:
+            graph.add_application(entry, app_root)
+        file_paths = set(graph.app_files)
+    else:
+        file_paths = set()
+        for dir_path, dir_names, file_names in os.walk(app_root):
+            file_paths.update(os.path.join(dir_path, file_name)
+                              for file_name in file_names)
+
+    files = {}
+    for file_path in sorted(file_paths):
+        if not file_path.endswith('.js'):
+            continue
+        if not file_path.startswith(app_root + os.sep):
+            print('%s is outside of %s, it is not embedded'
+                  % (file_path, app_root), file=sys.stderr)
+            continue
+        files[_bundle_key(file_path, app_root)] = file_path
+
+    directories = []
+    for dir_path, dir_names, file_names in os.walk(app_root):
+        file_path = resolve_directory(dir_path)
+        if dir_path != app_root and file_path:
+            file_key = _bundle_key(file_path, app_root)
+            if file_key in files:
+                directories.append((_bundle_key(dir_path, app_root),
+                                    file_key))
+
+    return sorted(files.items()), sorted(directories)
+
+
+def shake_modules(js_modules, entries, app_root=None, verbose=False):
+    """ Filter the js2c module list (<name>=<path> strings) to the modules
+        reachable from the given application entry points. If the
+        application requires modules dynamically every module is kept.
+    """
+    modules = dict(module.split('=', 1) for module in js_modules)
+    graph = RequireGraph(modules)
+
+    roots = set(ROOT_MODULES)
+    for entry in entries:
+        roots |= graph.add_application(entry, app_root)
+
+    if graph.dynamic:
+        print('Dynamic require() calls found in %s, keeping every module'
+              % ', '.join(graph.dynamic), file=sys.stderr)
+        return js_modules
+
+    reachable = graph.reachable(roots)
+    if verbose:
+        for file_path, module_id in graph.unresolved:
+            print('%s: unresolved require(\'%s\')' % (file_path, module_id),
+                  file=sys.stderr)
+        removed = sorted(set(modules) - reachable)
+        print('Unreachable JS modules: %s' % (', '.join(removed) or '-'),
+              file=sys.stderr)
+
+    return [module for module in js_modules
+            if module.split('=', 1)[0] in reachable]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='List the built-in JS modules reachable from an '
+                    'application.')
+    parser.add_argument('--modules', required=True,
+        help='List of the built-in JS modules. Format: '
+             '<module_name1>=<js_file1>,<module_name2>=<js_file2>,...')
+    parser.add_argument('--entry', action='append', default=[],
+        help='Entry point of the application (can be given multiple times)')
+    parser.add_argument('--app-root', default=None,
+        help='Root directory of the application, the working directory '
+             'at runtime (default: directory of the first entry point)')
+    parser.add_argument('--graph', action='store_true', default=False,
+        help='Print the require graph of the reachable modules')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False,
+        help='Print the removed modules and the unresolved requires')
+    options = parser.parse_args()
+
+    js_modules = options.modules.split(',')
+    try:
+        if options.graph:
+            modules = dict(module.split('=', 1) for module in js_modules)
+            graph = RequireGraph(modules)
+            roots = set(ROOT_MODULES)
+            for entry in options.entry:
+                roots |= graph.add_application(entry, options.app_root)
+            for name in sorted(graph.reachable(roots)):
+                print('%s: %s' % (name, ' '.join(graph.edges[name])))
+            return
+
+        reachable = shake_modules(js_modules, options.entry,
+                                  options.app_root, options.verbose)
+    except RequireError as e:
+        print('Unable to parse the require() calls: %s' % e)
+        sys.exit(1)
+
+    print(','.join(reachable))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Size attribution of an IoT.js binary.
+#
+#  The .text, .rodata, .data and .bss bytes of the linked input sections
+# (from a GNU ld map file) or of the members of libiotjs.a (from size -A)
+# are attributed to the IoT.js modules, using the native_files of the
+# modules.json files, and to the other components: the IoT.js core, the
+# embedded JS snapshot, JerryScript, libtuv, http-parser, mbedtls and the
+# rest (libc, ...). A budget file limits the flash bytes (.text, .rodata
+# and .data) of the modules and components:
+#
+#   size_report.py --map=iotjs.map --budget=budget.json --output=size.json
+#
+#   budget.json: {"modules": {"*": 8192, "fs": 12288},
+#                 "components": {"jerry": 200000}, "total": 400000}
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from common_py import path
+from module_resolver import ModuleConfig, ModuleError
+
+
+REPORT_VERSION = 1
+
+SECTIONS = ['text', 'rodata', 'data', 'bss']
+FLASH_SECTIONS = ['text', 'rodata', 'data']
+
+SECTION_PREFIXES = [
+    ('text', ['.text']),
+    ('rodata', ['.rodata']),
+    ('data', ['.data', '.sdata']),
+    ('bss', ['.bss', '.sbss', 'COMMON']),
+]
+
+# Component of the objects of the static libraries (by name prefix).
+LIBRARY_COMPONENTS = [
+    ('libjerry', 'jerry'),
+    ('libtuv', 'libtuv'),
+    ('libhttpparser', 'http-parser'),
+    ('libmbed', 'mbedtls'),
+]
+
+# Sources generated by js2c: the snapshot (or the JS code) and the magic
+# strings of the engine.
+SNAPSHOT_SOURCES = ['iotjs_js', 'iotjs_string_ext']
+
+
+class SizeError(Exception):
+    pass
+
+
+def section_kind(name):
+    for kind, prefixes in SECTION_PREFIXES:
+        if any(name.startswith(prefix) for prefix in prefixes):
+            return kind
+    return None
+
+
+def parse_map(map_file):
+    """ Yield the (section name, size, object) of the input sections of a
+        GNU ld map file.
+    """
+    in_map = False
+    pending = None
+    for line in map_file:
+        line = line.rstrip('\n')
+        if not in_map:
+            in_map = line.startswith('Linker script and memory map')
+            continue
+
+        # Output sections, LOAD lines, ... start at the first column.
+        if not line.startswith(' '):
+            pending = None
+            continue
+
+        parts = line.split()
+        if pending is not None:
+            # The address, size and object of a long section name are
+            # in the next line.
+            name, pending = pending, None
+            if len(parts) >= 3 and parts[0].startswith('0x'):
+                yield name, int(parts[1], 16), ' '.join(parts[2:])
+            continue
+
+        if len(parts) == 1 and section_kind(parts[0]):
+            pending = parts[0]
+        elif (len(parts) >= 4 and parts[1].startswith('0x')
+              and parts[2].startswith('0x')):
+            yield parts[0], int(parts[2], 16), ' '.join(parts[3:])
+
+
+def parse_size(output):
+    """ Yield the (section name, size, object) of the members of an archive
+        from the output of size -A.
+    """
+    member = None
+    for line in output.splitlines():
+        parts = line.split()
+        if line.endswith(':'):
+            # "<member>   (ex <archive>):"
+            member = parts[0]
+            if len(parts) >= 3:
+                member = '%s(%s)' % (parts[-1].rstrip('):'), member)
+        elif member and len(parts) == 3 and parts[1].isdigit():
+            yield parts[0], int(parts[1]), member
+
+
+def _source_stem(file_name):
+    """ iotjs_module_fs.c.o, iotjs_module_fs.o -> iotjs_module_fs """
+    stem = os.path.basename(file_name)
+    for ext in ['.o', '.obj', '.c']:
+        if stem.endswith(ext):
+            stem = stem[:-len(ext)]
+    return stem
+
+
+def native_file_modules(module_dirs):
+    """ Return {source stem: [module names]} of the native_files of every
+        platform in the modules.json files of the given directories. The
+        relative directories are resolved against the project root, like
+        the --external-modules of build.py.
+    """
+    config = ModuleConfig(None)
+    for module_dir in module_dirs:
+        module_dir = os.path.join(path.PROJECT_ROOT, module_dir)
+        config.add_descriptor_dir(os.path.normpath(module_dir))
+
+    stems = {}
+    for name, module in config.modules.items():
+        descriptor = module.descriptor
+        native_files = list(descriptor.get('native_files', []))
+        for platform in descriptor.get('platforms', {}).values():
+            native_files.extend(platform.get('native_files', []))
+        for native_file in native_files:
+            users = stems.setdefault(_source_stem(native_file), [])
+            if name not in users:
+                users.append(name)
+    return stems
+
+
+def attribute(obj, stems):
+    """ Return ('modules' or 'components', name) of an object. A source of
+        several modules is reported as a module of its own, named by the
+        source.
+    """
+    archive, member = None, obj
+    if obj.endswith(')') and '(' in obj:
+        archive, member = obj[:-1].split('(', 1)
+        archive = os.path.basename(archive)
+        for prefix, component in LIBRARY_COMPONENTS:
+            if archive.startswith(prefix):
+                return 'components', component
+
+    stem = _source_stem(member)
+    users = stems.get(stem)
+    if users:
+        return 'modules', users[0] if len(users) == 1 else stem
+    if any(stem == source or stem.startswith(source + '_')
+           for source in SNAPSHOT_SOURCES):
+        return 'components', 'js-snapshot'
+    if stem.startswith('iotjs') or (archive or '').startswith('libiotjs'):
+        return 'components', 'iotjs'
+    return 'components', 'other'
+
+
+def _empty_sizes():
+    return dict((section, 0) for section in SECTIONS)
+
+
+def flash_size(sizes):
+    return sum(sizes[section] for section in FLASH_SECTIONS)
+
+
+def build_report(sections, stems):
+    """ Sum the (section name, size, object) items by module, component
+        and section kind.
+    """
+    report = {
+        'version': REPORT_VERSION,
+        'modules': {},
+        'components': {},
+        'total': _empty_sizes(),
+    }
+    for name, size, obj in sections:
+        kind = section_kind(name)
+        if not kind or not size:
+            continue
+        group, key = attribute(obj, stems)
+        sizes = report[group].setdefault(key, _empty_sizes())
+        sizes[kind] += size
+        report['total'][kind] += size
+
+    for group in ['modules', 'components']:
+        for key, sizes in report[group].items():
+            sizes['flash'] = flash_size(sizes)
+            users = stems.get(key)
+            if group == 'modules' and users and len(users) > 1:
+                sizes['shared_by'] = sorted(users)
+    report['total']['flash'] = flash_size(report['total'])
+    return report
+
+
+def check_budget(report, budget):
+    """ Return the list of (name, flash bytes, limit) which exceed the
+        budget. "*" in the modules of the budget limits every module.
+    """
+    violations = []
+    module_budget = budget.get('modules', {})
+    for name, sizes in sorted(report['modules'].items()):
+        limit = module_budget.get(name, module_budget.get('*'))
+        if limit is not None and sizes['flash'] > limit:
+            violations.append(('module %s' % name, sizes['flash'], limit))
+
+    for name, limit in sorted(budget.get('components', {}).items()):
+        sizes = report['components'].get(name)
+        if sizes and sizes['flash'] > limit:
+            violations.append(('component %s' % name, sizes['flash'], limit))
+
+    limit = budget.get('total')
+    if limit is not None and report['total']['flash'] > limit:
+        violations.append(('total', report['total']['flash'], limit))
+    return violations
+
+
+def print_report(report):
+    print('%-36s %9s %9s %9s %9s %9s'
+          % ('Module / component', '.text', '.rodata', '.data', '.bss',
+             'flash'))
+    rows = [('module ' + name, sizes)
+            for name, sizes in report['modules'].items()]
+    rows.extend(report['components'].items())
+    for name, sizes in sorted(rows, key=lambda row: -row[1]['flash']):
+        print('%-36s %9d %9d %9d %9d %9d'
+              % ((name,) + tuple(sizes[key] for key in SECTIONS + ['flash'])))
+    total = report['total']
+    print('%-36s %9d %9d %9d %9d %9d'
+          % (('Total',) + tuple(total[key] for key in SECTIONS + ['flash'])))
+
+
+def read_sections(options):
+    if options.map:
+        with open(options.map, 'r') as map_file:
+            return list(parse_map(map_file))
+
+    if not options.binary or not options.binary.endswith('.a'):
+        raise SizeError('A --map file is required to attribute a linked '
+                        'binary, only libiotjs.a can be read without it')
+    try:
+        output = subprocess.check_output([options.size_tool, '-A',
+                                          options.binary])
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise SizeError('%s failed: %s' % (options.size_tool, e))
+    return list(parse_size(output.decode('utf-8')))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Attribute the size of an IoT.js binary to its modules '
+                    'and components.')
+    parser.add_argument('binary', nargs='?', default=None,
+        help='libiotjs.a to read with size -A if no --map is given')
+    parser.add_argument('--map', default=None, metavar='FILE',
+        help='GNU ld map file of the linked binary (-Wl,-Map=FILE)')
+    parser.add_argument('--size-tool', default='size', metavar='TOOL',
+        help='size tool of the target toolchain (default: %(default)s)')
+    parser.add_argument('--external-modules', default='', metavar='DIRS',
+        help='Comma separated directories of external modules.json files '
+             '(relative to the project root)')
+    parser.add_argument('--budget', default=None, metavar='FILE',
+        help='JSON file of the flash byte limits, exit with an error if a '
+             'module or component exceeds its limit')
+    parser.add_argument('--output', default=None, metavar='FILE',
+        help='Write the JSON report into the given file')
+    parser.add_argument('-q', '--quiet', action='store_true', default=False,
+        help='Do not print the size table')
+    options = parser.parse_args()
+
+    module_dirs = [module_dir for module_dir
+                   in options.external_modules.split(',') if module_dir]
+    module_dirs.append(path.SRC_ROOT)
+    try:
+        stems = native_file_modules(module_dirs)
+        report = build_report(read_sections(options), stems)
+    except (SizeError, ModuleError, IOError) as e:
+        print('Unable to create the size report: %s' % e)
+        sys.exit(1)
+
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+            output_file.write('\n')
+    if not options.quiet:
+        print_report(report)
+
+    if options.budget:
+        with open(options.budget, 'r') as budget_file:
+            violations = check_budget(report, json.load(budget_file))
+        for name, size, limit in violations:
+            print('Size budget exceeded: %s is %d bytes (limit: %d, +%d)'
+                  % (name, size, limit, size - limit))
+        if violations:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
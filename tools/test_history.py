@@ -0,0 +1,176 @@
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Runtime history of tools/testrunner.py --history.
+#
+#  The results of every test run (wall time, CPU time, peak RSS and peak
+# JS heap of every test) are stored in a SQLite database, together with
+# the hash of the iotjs binary and the git revision of the sources. The
+# runs of the same iotjs path and valgrind mode are compared: a test
+# regresses if its runtime or memory usage exceeds the median of the
+# last runs by more than a threshold.
+
+import hashlib
+import sqlite3
+import subprocess
+import time
+
+from common_py import path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    iotjs TEXT NOT NULL,
+    binary_hash TEXT NOT NULL,
+    git_revision TEXT,
+    platform TEXT,
+    valgrind INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    testset TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    time REAL,
+    user REAL,
+    sys REAL,
+    maxrss INTEGER,
+    heap_peak INTEGER
+);
+CREATE INDEX IF NOT EXISTS results_test ON results (testset, name);
+"""
+
+# The metrics compared to the earlier runs.
+METRICS = ["time", "maxrss", "heap_peak"]
+
+# A test is compared only if it passed in this many earlier runs.
+MIN_RUNS = 3
+
+# Smaller changes of the runtime (in seconds) are considered noise.
+MIN_TIME_CHANGE = 0.1
+
+
+def file_hash(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, "rb") as binary:
+        for chunk in iter(lambda: binary.read(1 << 16), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def git_revision():
+    """ The revision of the working tree or None outside of git. """
+    try:
+        output = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                         cwd=path.PROJECT_ROOT,
+                                         stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode("utf8").strip()
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+class TestHistory(object):
+    def __init__(self, filename):
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add_run(self, iotjs, platform, valgrind, results):
+        """ Store the results of a test run and return the id of the run. """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (time, iotjs, binary_hash, git_revision, "
+                "platform, valgrind) VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), iotjs, file_hash(iotjs), git_revision(),
+                 platform, int(valgrind)))
+            run_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO results (run_id, testset, name, status, time, "
+                "user, sys, maxrss, heap_peak) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, result["testset"], result["name"],
+                  result["status"], result.get("time"), result.get("user"),
+                  result.get("sys"), result.get("maxrss"),
+                  result.get("heap_peak"))
+                 for result in results])
+        return run_id
+
+    def earlier_runs(self, run_id, count):
+        """ The ids of the last runs before the given one with the same
+            iotjs path and valgrind mode.
+        """
+        rows = self.connection.execute(
+            "SELECT earlier.id FROM runs AS earlier, runs AS current "
+            "WHERE current.id = ? AND earlier.id < current.id "
+            "AND earlier.iotjs = current.iotjs "
+            "AND earlier.valgrind = current.valgrind "
+            "ORDER BY earlier.id DESC LIMIT ?", (run_id, count))
+        return [row[0] for row in rows]
+
+    def passed_results(self, run_ids):
+        """ Return {(testset, name): [{metric: value}]} of the passed tests
+            of the given runs.
+        """
+        if not run_ids:
+            return {}
+        rows = self.connection.execute(
+            "SELECT testset, name, %s FROM results "
+            "WHERE status = 'pass' AND run_id IN (%s)"
+            % (", ".join(METRICS), ", ".join("?" * len(run_ids))),
+            run_ids)
+        results = {}
+        for row in rows:
+            results.setdefault((row[0], row[1]), []).append(
+                dict(zip(METRICS, row[2:])))
+        return results
+
+    def find_regressions(self, run_id, count, threshold):
+        """ Compare the passed tests of a run with the median of the last
+            runs. Return the (testset, name, metric, value, median) of the
+            metrics which grew by more than the threshold (0.2 for 20%).
+        """
+        history = self.passed_results(self.earlier_runs(run_id, count))
+        current = self.passed_results([run_id])
+
+        regressions = []
+        for test, results in sorted(current.items()):
+            earlier = history.get(test, [])
+            for metric in METRICS:
+                value = results[0][metric]
+                values = [result[metric] for result in earlier
+                          if result[metric] is not None]
+                if value is None or len(values) < MIN_RUNS:
+                    continue
+                baseline = median(values)
+                if not baseline:
+                    # No relative change from zero (e.g. a metric which
+                    # was not measured in the earlier runs).
+                    continue
+                if metric == "time" and value - baseline < MIN_TIME_CHANGE:
+                    continue
+                if value > baseline * (1 + threshold):
+                    regressions.append(test + (metric, value, baseline))
+        return regressions
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+# Copyright 2018-present Samsung Electronics Co., Ltd. and other contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  Unit tests of tools/js_minifier.py.
+
+import unittest
+
+from js_minifier import minify
+
+
+class RenameTest(unittest.TestCase):
+    def test_shorthand_property_keeps_key(self):
+        code = minify('var foo = 1; module.exports = {foo};')
+        self.assertEqual(code, 'var a=1;module.exports={foo:a};')
+
+    def test_shorthand_properties_in_list(self):
+        code = minify('function f(first, second) {'
+                      '  return {first, key: second, second};'
+                      '}')
+        self.assertIn('{first:', code)
+        self.assertIn(',second:', code)
+
+    def test_block_is_not_an_object(self):
+        code = minify('function f(value) { if (value) { value } }')
+        self.assertEqual(code, 'function f(a){if(a){a}}')
+
+
+class TokenizeTest(unittest.TestCase):
+    def test_division_after_postfix_increment(self):
+        code = minify('var a = 3, i = 4; var x = i++ / 2 + a / 1;'
+                      'console.log(x);')
+        self.assertEqual(code, 'var a=3,b=4;var c=b++/2+a/1;console.log(c);')
+
+    def test_division_after_postfix_decrement(self):
+        code = minify('var a = 9, b = 2; var x = a-- / b / 1;'
+                      'console.log(x, a);')
+        self.assertEqual(code, 'var a=9,b=2;var c=a--/b/1;console.log(c,a);')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,17 +18,14 @@ from __future__ import print_function
 
 import argparse
 import json
-import multiprocessing
 import os
+import re
+import signal
 import subprocess
 import sys
+import threading
 import time
-
-try:
-    import queue
-except ImportError:
-    # Backwards compatibility
-    import Queue as queue
+import xml.etree.ElementTree as ET
 
 
 from collections import OrderedDict
@@ -37,6 +34,14 @@ from common_py.system.filesystem import FileSystem as fs
 from common_py.system.executor import Executor
 from common_py.system.executor import Terminal
 from common_py.system.platform import Platform
+from test_history import TestHistory, median
+
+# The peak JS heap usage printed by the --mem-stats of JerryScript.
+HEAP_PEAK_PATTERN = re.compile(br"Peak allocated = (\d+) bytes")
+
+# The characters which are not allowed in XML 1.0 (e.g. the escape
+# sequences of the colored outputs).
+XML_INVALID_CHARS = re.compile(u"[\x00-\x08\x0b\x0c\x0e-\x1f]")
 
 # Defines the folder that will contain the coverage info.
 # The path must be consistent with the measure_coverage.sh script.
@@ -88,6 +93,94 @@ def remove_coverage_code(testfile, coverage):
         file_p.write(content[index:])
 
 
+def _kill_process_group(process):
+    """ Kill the process and the processes started by it. """
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        # The processes are already gone.
+        pass
+
+
+def _exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_process(command, timeout):
+    """ Run a test command in its own process group and return its
+        (exitcode, output, usage). The exitcode is None if the command
+        did not finish in time, the usage is the user and system CPU time
+        (in seconds) and the peak RSS (in KB) of the command or None if it
+        is unavailable on the platform.
+    """
+    kwargs = {}
+    if hasattr(os, "setsid"):
+        # Every process of a test, e.g. the iotjs run by valgrind or the
+        # children of the test, is killed with the group.
+        if sys.version_info >= (3, 2):
+            kwargs["start_new_session"] = True
+        else:
+            kwargs["preexec_fn"] = os.setsid
+
+    process = subprocess.Popen(args=command,
+                               cwd=path.TEST_ROOT,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT,
+                               **kwargs)
+
+    lock = threading.Lock()
+    timed_out = []
+    def on_timeout():
+        with lock:
+            if process.returncode is None:
+                timed_out.append(True)
+                _kill_process_group(process)
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.daemon = True
+    timer.start()
+
+    # The output ends when the test and every child holding the pipe
+    # exits or the group is killed.
+    stdout = process.stdout.read()
+    process.stdout.close()
+
+    usage = None
+    if hasattr(os, "wait4"):
+        if hasattr(os, "waitid"):
+            # Wait for the exit without reaping the test, so its pid (the
+            # id of the group) is not reused while its leftover background
+            # processes are killed.
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+            with lock:
+                timer.cancel()
+                _kill_process_group(process)
+
+        status, rusage = os.wait4(process.pid, 0)[1:]
+        with lock:
+            process.returncode = _exit_code(status)
+        usage = {
+            "user": rusage.ru_utime,
+            "sys": rusage.ru_stime,
+            # ru_maxrss is in bytes on macOS and in KB elsewhere.
+            "maxrss": (rusage.ru_maxrss // 1024
+                       if sys.platform == "darwin" else rusage.ru_maxrss),
+        }
+    else:
+        process.wait()
+    timer.cancel()
+    timer.join()
+
+    if timed_out:
+        return None, None, usage
+    return process.returncode, stdout, usage
+
+
 class Reporter(object):
     @staticmethod
     def message(msg="", color=Terminal.empty):
@@ -126,8 +219,12 @@ class Reporter(object):
         Reporter.message("  iotjs:        %s" % testrunner.iotjs)
         Reporter.message("  quiet:        %s" % testrunner.quiet)
         Reporter.message("  timeout:      %d sec" % testrunner.timeout)
+        Reporter.message("  jobs:         %d" % testrunner.jobs)
         Reporter.message("  valgrind:     %s" % testrunner.valgrind)
+        Reporter.message("  mem-stats:    %s" % testrunner.mem_stats)
         Reporter.message("  skip-modules: %s" % testrunner.skip_modules)
+        Reporter.message("  shard:        %d/%d" % (testrunner.shard_index,
+                                                   testrunner.shard_count))
 
     @staticmethod
     def report_final(results):
@@ -138,19 +235,57 @@ class Reporter(object):
         Reporter.message("  TIMEOUT: %d" % results["timeout"], Terminal.red)
         Reporter.message("  SKIP:    %d" % results["skip"], Terminal.yellow)
 
+    @staticmethod
+    def report_regressions(regressions, runs):
+        Reporter.message()
+        if not regressions:
+            Reporter.message("No regression compared to the last %d runs"
+                             % runs, Terminal.green)
+            return
+
+        Reporter.message("Regressions compared to the median of the last "
+                         "%d runs:" % runs, Terminal.red)
+        for testset, name, metric, value, baseline in regressions:
+            change = ""
+            if baseline:
+                change = ", +%d%%" % (100 * (value - baseline) / baseline)
+            Reporter.message("  %s/%s: %s %s (median: %s%s)"
+                             % (testset, name, metric, value, baseline,
+                                change), Terminal.red)
+
+
+def read_durations(filenames):
+    """ Return {(testset, name): median runtime} of the tests in the given
+        --json-output files.
+    """
+    times = {}
+    for filename in filenames:
+        with open(filename) as json_file:
+            report = json.load(json_file)
+        for result in report["tests"]:
+            if result["status"] in ["pass", "fail"] and result.get("time"):
+                times.setdefault((result["testset"], result["name"]),
+                                 []).append(result["time"])
+    return dict((test, median(values)) for test, values in times.items())
+
 
 class TestRunner(object):
     def __init__(self, options):
-        self._process_pool = multiprocessing.Pool(processes=1)
         self.iotjs = fs.abspath(options.iotjs)
         self.quiet = options.quiet
         self.platform = options.platform
         self.timeout = options.timeout
         self.valgrind = options.valgrind
         self.coverage = options.coverage
+        self.jobs = max(1, options.jobs)
+        self.mem_stats = options.mem_stats
+        self.shard_index = options.shard_index
+        self.shard_count = options.shard_count
+        self.shard_durations = options.shard_durations or []
         self.skip_modules = []
         self.results = {}
-        self._msg_queue = multiprocessing.Queue(1)
+        self.test_results = []
+        self.regressions = []
 
         if options.skip_modules:
             self.skip_modules = options.skip_modules.split(",")
@@ -174,67 +309,190 @@ class TestRunner(object):
             "skip": 0,
             "timeout": 0
         }
+        self.test_results = []
 
         with open(fs.join(path.TEST_ROOT, "testsets.json")) as testsets_file:
             testsets = json.load(testsets_file, object_pairs_hook=OrderedDict)
 
-        for testset, tests in testsets.items():
-            self.run_testset(testset, tests)
+        tests = [(testset, test)
+                 for testset, testset_tests in testsets.items()
+                 for test in testset_tests]
+        if self.shard_count > 1:
+            tests = self.select_shard(tests)
+        self.run_tests(tests)
 
         Reporter.report_final(self.results)
 
-    def run_testset(self, testset, tests):
-        Reporter.report_testset(testset)
-
-        for test in tests:
-            testfile = fs.join(path.TEST_ROOT, testset, test["name"])
-            timeout = test.get("timeout", self.timeout)
-
+    def select_shard(self, tests):
+        """ Split the tests which are not skipped between the shards, so
+            the shards take about the same time according to the runtimes
+            of the --shard-durations files. The tests without a runtime
+            count as the median runtime, without durations the tests are
+            dealt out one by one. The skipped tests are reported by the
+            first shard.
+        """
+        durations = read_durations(self.shard_durations)
+        default = median(list(durations.values())) if durations else 1.0
+
+        runnable = []
+        selected = set()
+        for idx, (testset, test) in enumerate(tests):
+            if not self.skip_test(test):
+                runtime = durations.get((testset, test["name"]), default)
+                runnable.append((-runtime, idx))
+            elif self.shard_index == 0:
+                selected.add(idx)
+
+        # Longest test first to the least loaded shard. Every shard
+        # computes the same split, the ties are broken by the order.
+        loads = [0.0] * self.shard_count
+        for runtime, idx in sorted(runnable):
+            shard = loads.index(min(loads))
+            loads[shard] -= runtime
+            if shard == self.shard_index:
+                selected.add(idx)
+
+        return [tests[idx] for idx in sorted(selected)]
+
+    def run_tests(self, tests):
+        """ Run the tests on the given number of jobs. The tests of the same
+            serialization group (which share ports or files) do not run at
+            the same time. The output of every test is buffered and the
+            results are reported in the order of the tests.
+        """
+        outcomes = [None] * len(tests)
+        pending = []
+        for idx, (testset, test) in enumerate(tests):
             if self.skip_test(test):
-                Reporter.report_skip(test["name"], test.get("reason"))
-                self.results["skip"] += 1
-                continue
-
-            append_coverage_code(testfile, self.coverage)
-
-            exitcode, output, runtime = self.run_test(testfile, timeout)
-            expected_failure = test.get("expected-failure", False)
-
-            remove_coverage_code(testfile, self.coverage)
-
-            # Timeout happened.
-            if exitcode == -1:
-                Reporter.report_timeout(test["name"])
-                self.results["timeout"] += 1
-                continue
-
-            # Show the output.
-            if not self.quiet and output:
-                print(output.decode("utf8"), end="")
-
-            is_normal_run = (not expected_failure and exitcode == 0)
-            is_expected_fail = (expected_failure and exitcode in [1, 2])
-            if is_normal_run or is_expected_fail:
-                Reporter.report_pass(test["name"], runtime)
-                self.results["pass"] += 1
+                outcomes[idx] = ({
+                    "testset": testset,
+                    "name": test["name"],
+                    "status": "skip",
+                    "reason": test.get("reason"),
+                }, None)
             else:
-                Reporter.report_fail(test["name"], runtime)
-                self.results["fail"] += 1
-
-    @staticmethod
-    def run_subprocess(parent_queue, command):
-        process = subprocess.Popen(args=command,
-                                   cwd=path.TEST_ROOT,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.STDOUT)
-
-        stdout = process.communicate()[0]
-        exitcode = process.returncode
-
-        parent_queue.put_nowait([exitcode, stdout])
+                pending.append(idx)
+
+        condition = threading.Condition()
+        running_groups = set()
+        state = {"reported": 0, "testset": None}
+
+        def next_test():
+            with condition:
+                while pending:
+                    for idx in pending:
+                        group = tests[idx][1].get("serialization-group")
+                        if group not in running_groups:
+                            pending.remove(idx)
+                            if group:
+                                running_groups.add(group)
+                            return idx
+                    condition.wait()
+                return None
+
+        def report_finished():
+            while (state["reported"] < len(tests) and
+                   outcomes[state["reported"]] is not None):
+                testset, test = tests[state["reported"]]
+                if testset != state["testset"]:
+                    Reporter.report_testset(testset)
+                    state["testset"] = testset
+                self.report_test(test, outcomes[state["reported"]])
+                state["reported"] += 1
+            sys.stdout.flush()
+
+        def worker():
+            while True:
+                idx = next_test()
+                if idx is None:
+                    return
+                testset, test = tests[idx]
+                outcome = self.execute_test(testset, test)
+                with condition:
+                    outcomes[idx] = outcome
+                    running_groups.discard(test.get("serialization-group"))
+                    condition.notify_all()
+                    report_finished()
+
+        with condition:
+            report_finished()
+
+        workers = [threading.Thread(target=worker)
+                   for _ in range(min(self.jobs, len(pending)))]
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    def execute_test(self, testset, test):
+        """ Run a test and return its result and output. The result holds
+            the wall and CPU time (in seconds), the peak RSS (in KB) and
+            the peak JS heap (in bytes, with --mem-stats) of the test.
+        """
+        testfile = fs.join(path.TEST_ROOT, testset, test["name"])
+        timeout = test.get("timeout", self.timeout)
+
+        append_coverage_code(testfile, self.coverage)
+
+        exitcode, output, runtime, usage = self.run_test(testfile, timeout)
+        expected_failure = test.get("expected-failure", False)
+
+        remove_coverage_code(testfile, self.coverage)
+
+        result = {
+            "testset": testset,
+            "name": test["name"],
+            "time": round(runtime, 3),
+            "user": round(usage["user"], 3) if usage else None,
+            "sys": round(usage["sys"], 3) if usage else None,
+            "maxrss": usage["maxrss"] if usage else None,
+            "heap_peak": None,
+        }
+        if output and self.mem_stats:
+            match = HEAP_PEAK_PATTERN.search(output)
+            if match:
+                result["heap_peak"] = int(match.group(1))
+
+        is_normal_run = (not expected_failure and exitcode == 0)
+        is_expected_fail = (expected_failure and exitcode in [1, 2])
+        # Timeout happened.
+        if exitcode is None:
+            result["status"] = "timeout"
+        elif is_normal_run or is_expected_fail:
+            result["status"] = "pass"
+        else:
+            result["status"] = "fail"
+            # Keep the output of the failed tests for the reports.
+            result["output"] = (output or b"").decode("utf8", "replace")
+        return result, output
+
+    def report_test(self, test, outcome):
+        result, output = outcome
+        self.results[result["status"]] += 1
+        self.test_results.append(result)
+
+        if result["status"] == "skip":
+            Reporter.report_skip(test["name"], test.get("reason"))
+            return
+        if result["status"] == "timeout":
+            Reporter.report_timeout(test["name"])
+            return
+
+        # Show the output.
+        if not self.quiet and output:
+            print(output.decode("utf8"), end="")
+
+        runtime = round(result["time"], 2)
+        if result["status"] == "pass":
+            Reporter.report_pass(test["name"], runtime)
+        else:
+            Reporter.report_fail(test["name"], runtime)
 
     def run_test(self, testfile, timeout):
         command = [self.iotjs, testfile]
+        if self.mem_stats:
+            command = [self.iotjs, "--mem-stats", testfile]
 
         if self.valgrind:
             valgrind_options = [
@@ -245,26 +503,101 @@ class TestRunner(object):
 
             command = ["valgrind"] + valgrind_options + command
 
-        try:
-            process = multiprocessing.Process(target=TestRunner.run_subprocess,
-                                              args=(self._msg_queue, command,))
-            start = time.time()
-            process.start()
-            process.join(timeout)
-            runtime = round((time.time() - start), 2)
-
-            if process.is_alive():
-                raise multiprocessing.TimeoutError("Test still running")
+        start = time.time()
+        exitcode, stdout, usage = run_process(command, timeout)
+        runtime = time.time() - start
 
-            # At this point the queue must have data!
-            # If not then it is also a timeout event
-            exitcode, stdout = self._msg_queue.get_nowait()
+        # The exitcode is None if the test timed out.
+        return exitcode, stdout, runtime, usage
 
-        except (multiprocessing.TimeoutError, queue.Full):
-            process.terminate()
-            return -1, None, None
-
-        return exitcode, stdout, runtime
+    def update_history(self, filename, runs, threshold):
+        """ Append the results to the history database and look for the
+            tests which became slower or use more memory.
+        """
+        history = TestHistory(filename)
+        try:
+            run_id = history.add_run(self.iotjs, self.platform, self.valgrind,
+                                     self.test_results)
+            self.regressions = history.find_regressions(run_id, runs,
+                                                        threshold / 100.0)
+        finally:
+            history.close()
+        Reporter.report_regressions(self.regressions, runs)
+
+    def write_json(self, filename):
+        """ Write the configuration, the summary and the result of every
+            test to a JSON file.
+        """
+        report = OrderedDict([
+            ("iotjs", self.iotjs),
+            ("platform", self.platform),
+            ("valgrind", self.valgrind),
+            ("mem_stats", self.mem_stats),
+            ("shard_index", self.shard_index),
+            ("shard_count", self.shard_count),
+            ("results", self.results),
+            ("tests", self.test_results),
+            ("regressions", [
+                OrderedDict(zip(["testset", "name", "metric", "value",
+                                 "median"], regression))
+                for regression in self.regressions]),
+        ])
+        with open(filename, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+            json_file.write("\n")
+
+    def write_junit(self, filename):
+        """ Write the results as JUnit XML, a testsuite for every testset.
+            The resource usage of a test is stored in its properties.
+        """
+        root = ET.Element("testsuites")
+        suites = OrderedDict()
+        for result in self.test_results:
+            testset = result["testset"]
+            if testset not in suites:
+                suites[testset] = ET.SubElement(root, "testsuite",
+                                                name=testset)
+            suite = suites[testset]
+            testcase = ET.SubElement(suite, "testcase", classname=testset,
+                                     name=result["name"])
+            if result.get("time") is not None:
+                testcase.set("time", str(result["time"]))
+
+            usage = [key for key in ["user", "sys", "maxrss", "heap_peak"]
+                     if result.get(key) is not None]
+            if usage:
+                properties = ET.SubElement(testcase, "properties")
+                for key in usage:
+                    ET.SubElement(properties, "property", name=key,
+                                  value=str(result[key]))
+
+            status = result["status"]
+            if status == "skip":
+                ET.SubElement(testcase, "skipped",
+                              message=result.get("reason") or "")
+            elif status == "timeout":
+                ET.SubElement(testcase, "error", message="timeout")
+            elif status == "fail":
+                failure = ET.SubElement(testcase, "failure",
+                                        message="test failed")
+                failure.text = XML_INVALID_CHARS.sub("", result["output"])
+
+        for name in ["tests", "failures", "errors", "skipped"]:
+            root.set(name, "0")
+        for suite in root:
+            testcases = list(suite)
+            counts = {
+                "tests": len(testcases),
+                "failures": len(suite.findall("testcase/failure")),
+                "errors": len(suite.findall("testcase/error")),
+                "skipped": len(suite.findall("testcase/skipped")),
+            }
+            for name, count in counts.items():
+                suite.set(name, str(count))
+                root.set(name, str(int(root.get(name)) + count))
+
+        ET.ElementTree(root).write(filename, encoding="utf-8",
+                                   xml_declaration=True)
 
     def skip_test(self, test):
         skip_list = set(test.get("skip", []))
@@ -310,6 +643,10 @@ def get_args():
 
     parser.add_argument("iotjs", action="store",
                         help="path to the iotjs binary file")
+    parser.add_argument("-j", "--jobs", action="store", default=1, type=int,
+                        help="number of tests to run in parallel, the tests "
+                             "of a serialization group in testsets.json "
+                             "still run one at a time (default: %(default)s)")
     parser.add_argument('--platform', default=Platform().os(),
                         help='Specify the platform (default: %(default)s)')
     parser.add_argument("--quiet", action="store_true", default=False,
@@ -322,8 +659,52 @@ def get_args():
                         help="check tests with Valgrind")
     parser.add_argument("--coverage", action="store_true", default=False,
                         help="measure JavaScript coverage")
-
-    return parser.parse_args()
+    parser.add_argument("--mem-stats", action="store_true", default=False,
+                        help="record the peak JS heap of the tests (requires "
+                             "an iotjs built with --jerry-memstat)")
+    parser.add_argument("--history", action="store", metavar="FILE",
+                        help="append the results to a SQLite database and "
+                             "report the tests which regressed")
+    parser.add_argument("--history-runs", action="store", default=10,
+                        type=int, metavar="N",
+                        help="number of earlier runs the results are "
+                             "compared to (default: %(default)s)")
+    parser.add_argument("--regression-threshold", action="store",
+                        default=20, type=float, metavar="PERCENT",
+                        help="report a test if its runtime or memory usage "
+                             "exceeds the median of the earlier runs by "
+                             "more than this (default: %(default)s%%)")
+    parser.add_argument("--shard-count", action="store", default=1,
+                        type=int, metavar="N",
+                        help="split the tests into N shards which take about "
+                             "the same time according to --shard-durations, "
+                             "which must be the same for every shard "
+                             "(default: %(default)s)")
+    parser.add_argument("--shard-index", action="store", default=0,
+                        type=int, metavar="INDEX",
+                        help="run only the shard with the given index "
+                             "(0 ... N-1) of the --shard-count shards")
+    parser.add_argument("--shard-durations", action="append", metavar="FILE",
+                        help="--json-output file of an earlier run to split "
+                             "the tests by their runtime (can be repeated). "
+                             "Every shard must get the same files, otherwise "
+                             "the shards compute different splits and tests "
+                             "run twice or not at all. Without it the tests "
+                             "are dealt out one by one")
+    parser.add_argument("--json-output", action="store", metavar="FILE",
+                        help="write the results with the time and memory "
+                             "usage of every test to a JSON file")
+    parser.add_argument("--junit-output", action="store", metavar="FILE",
+                        help="write the results to a JUnit XML file")
+
+    options = parser.parse_args()
+    if options.shard_count < 1:
+        parser.error("--shard-count must be at least 1")
+    if not 0 <= options.shard_index < options.shard_count:
+        parser.error("--shard-index must be between 0 and %d"
+                     % (options.shard_count - 1))
+
+    return options
 
 
 def main():
@@ -331,6 +712,13 @@ def main():
 
     testrunner = TestRunner(options)
     testrunner.run()
+    if options.history:
+        testrunner.update_history(options.history, options.history_runs,
+                                  options.regression_threshold)
+    if options.json_output:
+        testrunner.write_json(options.json_output)
+    if options.junit_output:
+        testrunner.write_junit(options.junit_output)
     if testrunner.results["fail"]:
         sys.exit(1)
 
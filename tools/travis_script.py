@@ -231,6 +231,7 @@ def job_tizen():
 def job_misc():
     ex.check_run_cmd('tools/check_signed_off.sh', ['--travis'])
     ex.check_run_cmd('tools/check_tidy.py')
+    ex.check_run_cmd('tools/test_js_minifier.py')
 
 @job('external-modules')
 def job_external_modules():